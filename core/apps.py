@@ -20,3 +20,13 @@ class CoreConfig(AppConfig):
     """Class representing a Django application and its configuration."""
 
     name = 'core'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        import core.checks  # pylint: disable=unused-import,import-outside-toplevel
+        from core.utils import identity_map_signal_handler, object_version_signal_handler
+        post_save.connect(object_version_signal_handler, dispatch_uid='core_object_version_save')
+        post_delete.connect(object_version_signal_handler,
+                            dispatch_uid='core_object_version_delete')
+        post_save.connect(identity_map_signal_handler, dispatch_uid='core_identity_map_save')
+        post_delete.connect(identity_map_signal_handler, dispatch_uid='core_identity_map_delete')
@@ -0,0 +1,237 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count
+
+from theories.graphs.bar_graphs import OpinionBarGraph
+from theories.graphs.venn_diagrams import OpinionVennDiagram
+from theories.models.content import Content
+from theories.models.opinions import Opinion
+from theories.models.statistics import Stats
+from theories.search import search
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+PREFIX = 'benchmark'
+NUM_OPINIONS = 20
+NUM_EVIDENCE = 10
+SEARCH_TERM = 'evidence 1'
+
+# The generate_dataset options for each dataset size.
+DATASET_SIZES = {
+    'small': {
+        'users': 20,
+        'theories': 2,
+        'subtheories': 8,
+        'depth': 3,
+        'evidence': 40,
+        'opinions': 100,
+        'followers': 0,
+        'actions': 0,
+    },
+    'medium': {
+        'users': 100,
+        'theories': 5,
+        'subtheories': 40,
+        'depth': 4,
+        'evidence': 200,
+        'opinions': 1000,
+        'followers': 0,
+        'actions': 0,
+    },
+    'large': {
+        'users': 500,
+        'theories': 10,
+        'subtheories': 200,
+        'depth': 5,
+        'evidence': 1000,
+        'opinions': 10000,
+        'followers': 0,
+        'actions': 0,
+    },
+}
+
+# The registered benchmarks (name -> setup), see benchmark.
+BENCHMARKS = {}
+
+# *******************************************************************************
+# Methods
+# *******************************************************************************
+
+
+def benchmark(name):
+    """Register a benchmark.
+
+    The decorated method is the setup, it is passed the Dataset and returns the (argument free)
+    method that is measured. The setup and the measured method run inside a transaction that is
+    rolled back, so each run starts from the same data.
+
+    Args:
+        name (str): The benchmark name (e.g., 'stats.recalculate').
+
+    Returns:
+        function: The decorator.
+    """
+
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+class Dataset():
+    """A generated dataset and the objects the benchmarks operate on.
+
+    Attributes:
+        size (str): The dataset size (a key of DATASET_SIZES).
+        seed (int): The random seed.
+        options (dict): The generate_dataset options.
+        theory_pk (int): The root theory with the most opinions.
+        subtheory_pk (int): The sub-theory with the most (flat) parent theories.
+        opinion_pk (int): The theory's opinion with the most dependencies.
+    """
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.seed = seed
+        self.options = DATASET_SIZES[size]
+        self.theory_pk = None
+        self.subtheory_pk = None
+        self.opinion_pk = None
+
+    def generate(self):
+        """Generate the dataset and select the benchmark targets."""
+        call_command('generate_dataset',
+                     prefix=PREFIX,
+                     seed=self.seed,
+                     stdout=StringIO(),
+                     **self.options)
+        theories = Content.objects.filter(title01__startswith=f'{PREFIX} theory ')
+        theory = theories.annotate(num_opinions=Count('opinions')).order_by(
+            '-num_opinions', 'pk').first()
+        subtheories = Content.objects.filter(title01__startswith=f'{PREFIX} sub-theory ')
+        subtheory = subtheories.annotate(num_parents=Count('parent_flat_theories')).order_by(
+            '-num_parents', 'pk').first()
+        opinion = theory.opinions.annotate(num_dependencies=Count('dependencies')).order_by(
+            '-num_dependencies', 'pk').first()
+        self.theory_pk = theory.pk
+        self.subtheory_pk = subtheory.pk
+        self.opinion_pk = opinion.pk
+        Stats.recalculate(theory)
+
+    def get_theory(self):
+        """A fresh (uncached) copy of the theory."""
+        return Content.objects.get(pk=self.theory_pk)
+
+    def get_subtheory(self):
+        """A fresh (uncached) copy of the sub-theory."""
+        return Content.objects.get(pk=self.subtheory_pk)
+
+    def get_opinion(self):
+        """A fresh (uncached) copy of the opinion."""
+        return Opinion.objects.select_related('content', 'user').get(pk=self.opinion_pk)
+
+    def create_evidence(self, count=NUM_EVIDENCE):
+        """Create new evidence (not yet a dependency of anything)."""
+        return [
+            Content.objects.create(content_type=Content.TYPE.EVIDENCE,
+                                   title01=f'{PREFIX} new evidence {i}') for i in range(count)
+        ]
+
+
+@benchmark('stats.recalculate')
+def stats_recalculate(dataset):
+    theory = dataset.get_theory()
+    return lambda: Stats.recalculate(theory)
+
+
+@benchmark('stats.add_remove')
+def stats_add_remove(dataset):
+    theory = dataset.get_theory()
+    opinions = list(theory.opinions.select_related('content')[:NUM_OPINIONS])
+
+    def run():
+        for opinion in opinions:
+            Stats.remove(opinion)
+            Stats.add(opinion)
+
+    return run
+
+
+@benchmark('opinion.get_flat_dependencies')
+def opinion_get_flat_dependencies(dataset):
+    opinion = dataset.get_opinion()
+    return opinion.get_flat_dependencies
+
+
+@benchmark('content.add_dependencies')
+def content_add_dependencies(dataset):
+    subtheory = dataset.get_subtheory()
+    evidence = dataset.create_evidence()
+    return lambda: subtheory.add_dependencies(evidence)
+
+
+@benchmark('content.remove_flat_dependency')
+def content_remove_flat_dependency(dataset):
+    subtheory = dataset.get_subtheory()
+    evidence = dataset.create_evidence()
+    subtheory.add_dependencies(evidence)
+    subtheory.dependencies.remove(*evidence)
+
+    def run():
+        for item in evidence:
+            subtheory.remove_flat_dependency(item)
+
+    return run
+
+
+@benchmark('graphs.venn_diagram')
+def graphs_venn_diagram(dataset):
+    opinion = dataset.get_opinion()
+    return lambda: OpinionVennDiagram(opinion)
+
+
+@benchmark('graphs.venn_diagram_flat')
+def graphs_venn_diagram_flat(dataset):
+    opinion = dataset.get_opinion()
+    return lambda: OpinionVennDiagram(opinion, flat=True)
+
+
+@benchmark('graphs.venn_diagram_svg')
+def graphs_venn_diagram_svg(dataset):
+    diagram = OpinionVennDiagram(dataset.get_opinion(), flat=True)
+    return diagram.get_svg
+
+
+@benchmark('graphs.bar_graph')
+def graphs_bar_graph(dataset):
+    opinion = dataset.get_opinion()
+    return lambda: OpinionBarGraph(opinion).get_svg()
+
+
+@benchmark('search.icontains')
+def search_icontains(dataset):
+    # The search before the index (a sequential scan, not ranked).
+    return lambda: list(Content.objects.filter(title01__icontains=SEARCH_TERM))
+
+
+@benchmark('search.fulltext')
+def search_fulltext(dataset):
+    return lambda: list(search(Content.objects.all(), SEARCH_TERM))
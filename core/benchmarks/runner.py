@@ -0,0 +1,207 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.utils import QueryCapture
+from theories.models.content import Content
+from users.models import User
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+RESULTS_VERSION = 1
+
+# *******************************************************************************
+# Methods
+# *******************************************************************************
+
+
+def measure(func):
+    """Measure the wall time and number of queries of a single call.
+
+    Args:
+        func (function): The method to measure (no arguments).
+
+    Returns:
+        tuple(float, int): The wall time (seconds) and the number of queries.
+    """
+    with QueryCapture() as capture:
+        start = time.perf_counter()
+        func()
+        duration = time.perf_counter() - start
+    return duration, capture.count
+
+
+def measure_memory(func):
+    """Measure the peak python memory allocated during a single call.
+
+    The memory is traced in a separate call because tracing slows down the code.
+
+    Args:
+        func (function): The method to measure (no arguments).
+
+    Returns:
+        int: The peak memory (bytes).
+    """
+    tracemalloc.start()
+    try:
+        func()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run_once(setup, dataset, measure_func, seed=0):
+    """Run the setup and measure the benchmark in a transaction that is rolled back.
+
+    Args:
+        setup (function): The benchmark setup (see core.benchmarks.cases.benchmark).
+        dataset (Dataset): The dataset.
+        measure_func (function): Either measure or measure_memory.
+        seed (int, optional): The random seed (the diagrams are randomized).
+
+    Returns:
+        The measure_func result.
+    """
+    with transaction.atomic():
+        func = setup(dataset)
+        random.seed(seed)
+        result = measure_func(func)
+        transaction.set_rollback(True)
+    return result
+
+
+def run_benchmark(name, setup, dataset, repeat=5, seed=0):
+    """Run a benchmark repeat times (plus once more for the memory).
+
+    Args:
+        name (str): The benchmark name.
+        setup (function): The benchmark setup.
+        dataset (Dataset): The dataset.
+        repeat (int, optional): The number of timed runs. Defaults to 5.
+        seed (int, optional): The random seed. Defaults to 0.
+
+    Returns:
+        dict: The result (wall times in seconds, memory in bytes).
+    """
+    durations = []
+    queries = []
+    for _ in range(repeat):
+        duration, num_queries = run_once(setup, dataset, measure, seed=seed)
+        durations.append(duration)
+        queries.append(num_queries)
+    peak_memory = run_once(setup, dataset, measure_memory, seed=seed)
+    return {
+        'benchmark': name,
+        'size': dataset.size,
+        'repeat': repeat,
+        'wall_time': {
+            'min': min(durations),
+            'median': statistics.median(durations),
+            'max': max(durations),
+        },
+        'queries': max(queries),
+        'peak_memory': peak_memory,
+    }
+
+
+def run_benchmarks(benchmarks, datasets, repeat=5, seed=0, callback=None):
+    """Run the benchmarks for each dataset (each dataset is rolled back when done).
+
+    Args:
+        benchmarks (dict): The benchmarks to run (name -> setup).
+        datasets (list[Dataset]): The datasets (not yet generated).
+        repeat (int, optional): The number of timed runs. Defaults to 5.
+        seed (int, optional): The random seed. Defaults to 0.
+        callback (function, optional): Called with each result as it completes.
+
+    Returns:
+        dict: The results and the environment they were measured in (json serializable).
+    """
+    results = []
+    sizes = {}
+    for dataset in datasets:
+        with transaction.atomic():
+            dataset.generate()
+            sizes[dataset.size] = dataset.options
+            for name, setup in benchmarks.items():
+                result = run_benchmark(name, setup, dataset, repeat=repeat, seed=seed)
+                results.append(result)
+                if callback is not None:
+                    callback(result)
+            transaction.set_rollback(True)
+        # The reserved objects may have been created (and rolled back) with the dataset.
+        Content.INTUITION_PK = -1
+        User.SYSTEM_USER_PK = -1
+    return {
+        'version': RESULTS_VERSION,
+        'date': timezone.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'platform': platform.platform(),
+        },
+        'seed': seed,
+        'sizes': sizes,
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold=1.25):
+    """Compare the results against a baseline.
+
+    A benchmark regresses if its median wall time grows by more than the threshold (ratio) or
+    if it makes more queries.
+
+    Args:
+        results (dict): The results (see run_benchmarks).
+        baseline (dict): The baseline results.
+        threshold (float, optional): The wall time ratio allowed. Defaults to 1.25.
+
+    Returns:
+        list[dict]: The comparison for each benchmark that is in both (benchmark, size, ratio,
+            queries, baseline_queries and regression).
+    """
+    baseline_results = {(x['benchmark'], x['size']): x for x in baseline['results']}
+    comparisons = []
+    for result in results['results']:
+        key = (result['benchmark'], result['size'])
+        if key not in baseline_results:
+            continue
+        old = baseline_results[key]
+        if old['wall_time']['median'] > 0:
+            ratio = result['wall_time']['median'] / old['wall_time']['median']
+        else:
+            ratio = 1.0
+        comparisons.append({
+            'benchmark': result['benchmark'],
+            'size': result['size'],
+            'ratio': ratio,
+            'queries': result['queries'],
+            'baseline_queries': old['queries'],
+            'regression': ratio > threshold or result['queries'] > old['queries'],
+        })
+    return comparisons
@@ -0,0 +1,46 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from core.utils import is_object_cache_shared
+
+# *******************************************************************************
+# Checks
+# *******************************************************************************
+
+
+@register()
+def check_object_cache(app_configs, **kwargs):
+    """Warn if the object versions (see core.utils.get_versioned_key) are per process.
+
+    The versioned caches and the page ETags are only consistent between the workers if the
+    OBJECT_CACHE is shared (e.g., file based or memcached).
+
+    Returns:
+        list[Warning]: The issues.
+    """
+    if is_object_cache_shared():
+        return []
+    return [
+        Warning(
+            f"The OBJECT_CACHE ('{getattr(settings, 'OBJECT_CACHE', 'default')}') is not "
+            'shared between processes, the workers will serve stale cached values and ETags.',
+            hint='Set CACHE_DIR (see wiki_o/example_env_vars.py) or point CACHES at a shared '
+            'backend (e.g., memcached).',
+            id='core.W001',
+        )
+    ]
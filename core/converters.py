@@ -13,8 +13,9 @@ LICENSE.md file in the root directory of this source tree.
 # *******************************************************************************
 # Imports
 # *******************************************************************************
-import random
 import base64
+import functools
+import random
 
 # *******************************************************************************
 # Defines
@@ -36,6 +37,13 @@ class IntegerCypher:
     Original Source: https://stackoverflow.com/a/7285459/1891461
 
     Attributes:
+        half_length (int): The number of bits in each Feistel half.
+        num_bytes (int): The number of bytes in the encrypted output.
+        low_mask (int): The bit mask for the lower half.
+        keys (list[int]): The round keys.
+        encrypt_keys (tuple[int]): The round keys in encryption order.
+        decrypt_keys (tuple[int]): The round keys in decryption order.
+        cache_size (int): The max number of recent values to memoize (per direction).
     """
 
     regex = r'([A-Za-z0-9\-_=]+)'
@@ -54,7 +62,7 @@ class IntegerCypher:
             keys.append(random.randint(mask // 2, mask) & mask)
         return keys
 
-    def __init__(self, bit_length=32, keys=None):
+    def __init__(self, bit_length=32, keys=None, cache_size=4096):
         """[summary]
 
         Returns:
@@ -73,61 +81,62 @@ class IntegerCypher:
         if keys is None:
             keys = self.generate_keys(seed=0x6CFB18E2, key_length=self.half_length)
         self.keys = keys
+        self.encrypt_keys = tuple(keys)
+        self.decrypt_keys = tuple(reversed(keys))
+        # Memoize recent values (urls are rendered over and over again).
+        self.cache_size = cache_size
+        self._to_url = functools.lru_cache(maxsize=cache_size)(self._encode)
+        self._to_python = functools.lru_cache(maxsize=cache_size)(self._decode)
 
     def __call__(self):
         return self
 
-    def encrypt(self, plain):
-        """Calculates the encrypted, i.e., the permuted value of the given integer.
+    def _permute(self, value, round_keys):
+        """Apply the Feistel rounds (encryption or decryption depending on the key order).
+
+        The F function is inlined (see feistel_round), this is the hot loop.
+
+        Args:
+            value (int): The integer to permute.
+            round_keys (tuple[int]): The round keys in the order to apply them.
 
         Returns:
-            int: The encrypted (permuted) value.
+            int: The permuted value.
         """
+        half_length = self.half_length
+        low_mask = self.low_mask
         # Step 1: Split into two halves.
-        rhs = plain & self.low_mask
-        lhs = plain >> self.half_length
-
-        # Step 2: Do 4 simple Feistel rounds.
-        for i, round_key in enumerate(self.keys):
-            if i > 0:
-                # Swap lhs <-> rhs
-                lhs, rhs = rhs, lhs
-            # Apply Feistel round function F().
-            rhs = rhs ^ self.feistel_round(lhs, round_key)
-
+        rhs = value & low_mask
+        lhs = value >> half_length
+        # Step 2: Do the Feistel rounds (there is no swap after the last round).
+        for round_key in round_keys:
+            num = lhs ^ round_key
+            num = num * num
+            lhs, rhs = rhs ^ ((num >> half_length) ^ (num & low_mask)), lhs
+        lhs, rhs = rhs, lhs
         # Step 3: Recombine the two halves and return.
-        x = (lhs << self.half_length) + (rhs & self.low_mask)
+        return (lhs << half_length) + (rhs & low_mask)
 
-        # Step 4: Integer to Ascii.
+    def encrypt(self, plain):
+        """Calculates the encrypted, i.e., the permuted value of the given integer.
+
+        Returns:
+            bytes: The encrypted (permuted) value, base64 encoded.
+        """
+        x = self._permute(plain, self.encrypt_keys)
         return base64.urlsafe_b64encode(x.to_bytes(self.num_bytes, byteorder='big'))
 
     def decrypt(self, cypher):
         """Calculates the decrypted value of the given integer.
 
         Args:
-            cypher (int): The integer to decrypt.
+            cypher (bytes or str): The base64 encoded value to decrypt.
 
         Returns:
             int: The decrypted (inverse permuted) value.
         """
-        # Step 0: Ascii to integer.
         cypher = int.from_bytes(base64.urlsafe_b64decode(cypher), byteorder='big')
-
-        # Step 1: Split into two halves.
-        rhs = cypher & self.low_mask
-        lhs = cypher >> self.half_length
-
-        # Step 2: Do 4 simple Feistel rounds.
-        n = len(self.keys)
-        for i in range(len(self.keys)):
-            if i > 0:
-                # Swap lhs <-> rhs
-                lhs, rhs = rhs, lhs
-            # Apply Feistel round function F().
-            rhs = rhs ^ self.feistel_round(lhs, self.keys[n - 1 - i])
-
-        # Step 3: Recombine the two halves and return.
-        return (lhs << self.half_length) + (rhs & self.low_mask)
+        return self._permute(cypher, self.decrypt_keys)
 
     def feistel_round(self, num, round_key):
         """The F function for the Feistel rounds.
@@ -142,8 +151,43 @@ class IntegerCypher:
         # XOR the high and low parts.
         return (num >> self.half_length) ^ (num & self.low_mask)
 
-    def to_python(self, value):
+    def _encode(self, value):
+        return self.encrypt(int(value)).decode('ascii')
+
+    def _decode(self, value):
         return self.decrypt(value)
 
+    def to_python(self, value):
+        return self._to_python(value)
+
     def to_url(self, value):
-        return str(self.encrypt(value))[2:-1]
+        return self._to_url(value)
+
+    def to_python_list(self, values):
+        """Decrypt a list of url values.
+
+        Args:
+            values (list[str]): The encrypted values.
+
+        Returns:
+            list[int]: The decrypted values.
+        """
+        to_python = self._to_python
+        return [to_python(x) for x in values]
+
+    def to_url_list(self, values):
+        """Encrypt a list of integers for use in urls.
+
+        Args:
+            values (list[int]): The integers.
+
+        Returns:
+            list[str]: The encrypted values.
+        """
+        to_url = self._to_url
+        return [to_url(x) for x in values]
+
+    def cache_clear(self):
+        """Clear the memoized values."""
+        self._to_url.cache_clear()
+        self._to_python.cache_clear()
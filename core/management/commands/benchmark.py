@@ -0,0 +1,121 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks.cases import BENCHMARKS, DATASET_SIZES, Dataset
+from core.benchmarks.runner import compare, run_benchmarks
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+
+# *******************************************************************************
+# Methods
+# *******************************************************************************
+
+
+class Command(BaseCommand):
+    """Benchmark the hot paths (stats, flattening and graphs) at several dataset sizes.
+
+    Each dataset is generated (see generate_dataset) inside a transaction that is rolled back,
+    the database is left unchanged. For each benchmark the wall time, number of queries and peak
+    python memory are reported and optionally saved as json for comparing runs.
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--benchmarks',
+            nargs='+',
+            help=f'The benchmarks to run (default all): {", ".join(BENCHMARKS)}.',
+        )
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            default=['small', 'medium'],
+            help=f'The dataset sizes (default small medium): {", ".join(DATASET_SIZES)}.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='The number of timed runs per benchmark (default 5).',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='The random seed.')
+        parser.add_argument(
+            '--output',
+            help='Save the results as json.',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Compare the results against a saved (json) baseline.',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=1.25,
+            help='The wall time ratio (vs. the baseline) that is a regression (default 1.25).',
+        )
+
+    def handle(self, *args, **options):
+        """The method that is run when the commandline is invoked."""
+        names = options['benchmarks'] or list(BENCHMARKS)
+        for name in names:
+            if name not in BENCHMARKS:
+                raise CommandError(f'Error, unknown benchmark {name}')
+        for size in options['sizes']:
+            if size not in DATASET_SIZES:
+                raise CommandError(f'Error, unknown dataset size {size}')
+        if options['repeat'] < 1:
+            raise CommandError('Error, repeat must be at least 1')
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        # Run
+        self.stdout.write(f'{"benchmark":34s} {"size":8s} {"median":>10s} {"min":>10s} '
+                          f'{"queries":>8s} {"memory":>10s}')
+        results = run_benchmarks({name: BENCHMARKS[name] for name in names},
+                                 [Dataset(size, seed=options['seed'])
+                                  for size in options['sizes']],
+                                 repeat=options['repeat'],
+                                 seed=options['seed'],
+                                 callback=self.report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f'Saved the results to {options["output"]}.')
+
+        # Compare
+        if baseline is not None:
+            comparisons = compare(results, baseline, threshold=options['threshold'])
+            for x in comparisons:
+                flag = 'REGRESSION' if x['regression'] else ''
+                self.stdout.write(f'{x["benchmark"]:34s} {x["size"]:8s} {x["ratio"]:9.2f}x '
+                                  f'{x["baseline_queries"]:>5d} -> {x["queries"]:<5d} {flag}')
+            regressions = [x for x in comparisons if x['regression']]
+            if len(regressions) > 0:
+                raise CommandError(f'{len(regressions)} benchmark(s) regressed.')
+
+    def report(self, result):
+        """Print a single result."""
+        wall_time = result['wall_time']
+        self.stdout.write(f'{result["benchmark"]:34s} {result["size"]:8s} '
+                          f'{wall_time["median"] * 1000:8.2f}ms {wall_time["min"] * 1000:8.2f}ms '
+                          f'{result["queries"]:8d} {result["peak_memory"] / 1024:8.1f}KB')
@@ -0,0 +1,112 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.converters import IntegerCypher
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+
+# *******************************************************************************
+# Methods
+# *******************************************************************************
+
+
+class Command(BaseCommand):
+    """Benchmarks the IntegerCypher (url pk encryption) round trip."""
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bit_length',
+            type=int,
+            default=72,
+            help='The cypher bit length (default 72, same as content urls).',
+        )
+
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=100000,
+            help='The number of round trips (default 100000).',
+        )
+
+        parser.add_argument(
+            '--max_value',
+            type=int,
+            default=100000,
+            help='Values are drawn from [0, max_value] '
+            '(default 100000, i.e., a realistic set of pks).',
+        )
+
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='The random seed.',
+        )
+
+    def handle(self, *args, **options):
+        """The method that is run when the commandline is invoked."""
+        bit_length = options['bit_length']
+        count = options['count']
+        max_value = min(options['max_value'], 2**bit_length - 1)
+        random.seed(options['seed'])
+        values = [random.randint(0, max_value) for _ in range(count)]
+
+        cypher = IntegerCypher(bit_length=bit_length)
+        self.run('raw', cypher, values, lambda x: cypher.decrypt(cypher.encrypt(x)))
+        self.run('cached', cypher, values, lambda x: cypher.to_python(cypher.to_url(x)))
+        cypher.cache_clear()
+        start = time.time()
+        results = cypher.to_python_list(cypher.to_url_list(values))
+        self.report('batch', count, time.time() - start)
+        if results != values:
+            raise CommandError('IntegerCypher: batch round trip failed.')
+
+    def run(self, name, cypher, values, round_trip):
+        """Time the round trip for each value.
+
+        Args:
+            name (str): The name to report.
+            cypher (IntegerCypher): The cypher (its cache is cleared first).
+            values (list[int]): The plain values.
+            round_trip (function): Maps a plain value to its encrypted then decrypted value.
+
+        Raises:
+            CommandError: If a round trip does not return the plain value.
+        """
+        cypher.cache_clear()
+        start = time.time()
+        for x in values:
+            if round_trip(x) != x:
+                raise CommandError(f'IntegerCypher: plain text -> cypher -> plain text failed: {x}')
+        self.report(name, len(values), time.time() - start)
+
+    def report(self, name, count, duration):
+        """Print the timing results.
+
+        Args:
+            name (str): The name of the benchmark.
+            count (int): The number of round trips.
+            duration (float): The time taken (seconds).
+        """
+        rate = count / duration if duration > 0 else float('inf')
+        self.stdout.write(f'{name:8s} {count} round trips in {duration:.3f}s ({rate:,.0f}/s)')
@@ -13,11 +13,16 @@ LICENSE.md file in the root directory of this source tree.
 # *******************************************************************************
 # Imports
 # *******************************************************************************
+import gzip
+import io
+import itertools
+import json
 import re
 import sys
 
 from django.core import serializers
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
 
 from theories.models.categories import Category
 from theories.models.content import Content
@@ -29,14 +34,81 @@ from users.models import User, Violation, ViolationFeedback, ViolationVote
 # Defines
 # *******************************************************************************
 VALID_MODELS = {'Content', 'Opinion', 'Stats'}
+# The models are exported in dependency order (see import_data).
+EXPORT_MODELS = (User, Category, Content, Opinion, OpinionDependency, Stats, StatsDependency,
+                 StatsFlatDependency, Violation, ViolationFeedback, ViolationVote)
+CHUNK_SIZE = 2000
 
 # *******************************************************************************
 # Methods
 # *******************************************************************************
 
 
+def iter_records(queryset, fields=None, chunk_size=CHUNK_SIZE):
+    """Serialize the queryset one chunk at a time (the queryset is never cached).
+
+    Args:
+        queryset (QuerySet): The objects to serialize.
+        fields (list[str], optional): The fields to serialize. Defaults to None (all).
+        chunk_size (int, optional): The number of objects fetched/serialized at a time.
+
+    Yields:
+        dict: The serialized object (same format as the json serializer).
+    """
+    serializer = serializers.get_serializer('python')()
+    objects = queryset.order_by('pk').iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(itertools.islice(objects, chunk_size))
+        if len(chunk) == 0:
+            return
+        yield from serializer.serialize(chunk, fields=fields)
+
+
+class RecordWriter():
+    """Writes records to a text stream as a json list or as ndjson (one record per line).
+
+    Attributes:
+        stream (file): The text stream.
+        ndjson (bool): If True, the output is newline delimited json.
+        count (int): The number of records written.
+    """
+
+    def __init__(self, stream, ndjson=False):
+        self.stream = stream
+        self.ndjson = ndjson
+        self.count = 0
+        if not self.ndjson:
+            self.stream.write('[')
+
+    def write(self, record):
+        """Write a single record."""
+        data = json.dumps(record, cls=DjangoJSONEncoder)
+        if self.ndjson:
+            self.stream.write(data + '\n')
+        elif self.count == 0:
+            self.stream.write(data)
+        else:
+            self.stream.write(',\n' + data)
+        self.count += 1
+
+    def close(self):
+        """Terminate the json list (the stream is not closed)."""
+        if not self.ndjson:
+            self.stream.write(']\n')
+
+
+class OutputStream():
+    """A file like wrapper for the command's stdout (no line endings are added)."""
+
+    def __init__(self, stdout):
+        self.stdout = stdout
+
+    def write(self, text):
+        self.stdout.write(text, ending='')
+
+
 class Command(BaseCommand):
-    """Export wiki-o data as json."""
+    """Export wiki-o data as json (streamed, memory use does not grow with the data)."""
     help = __doc__
 
     def add_arguments(self, parser):
@@ -59,93 +131,103 @@ class Command(BaseCommand):
             nargs='+',
             help='Choose the model and field to export.',
         )
+        parser.add_argument(
+            '--ndjson',
+            action='store_true',
+            help='Output newline delimited json (one object per line) instead of a json list.',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Compress the output (implied if archive_path ends with .gz).',
+        )
+        parser.add_argument(
+            '--chunk_size',
+            type=int,
+            default=CHUNK_SIZE,
+            help=f'The number of rows fetched at a time (default {CHUNK_SIZE}).',
+        )
 
     def handle(self, *args, **options):
         """The method that is run when the commandline is invoked."""
         # Get data
-        data = ""
         if options['model_fields']:
-            querry_set = {}
-            for model_field in options['model_fields']:
-                model = None
-                field = None
-                if re.match(r'^\w+$', model_field):
-                    model = model_field
-                    field = None
-                elif re.match(r'^\w+\.\w+$', model_field):
-                    model = model_field.split('.')[0]
-                    field = model_field.split('.')[1]
-                else:
-                    print('Error, model fields are formated as "model" or "model.field"')
-                    sys.exit()
-                if model in VALID_MODELS:
-                    if model in querry_set and field:
-                        querry_set[model].append(field)
-                    elif field:
-                        querry_set[model] = [field]
-                    else:
-                        querry_set[model] = []
-                else:
-                    print('Error, model not implemented', model)
-                    sys.exit()
-            if 'Content' in querry_set:
-                if querry_set['Content']:
-                    data += serializers.serialize(
-                        'json', Content.objects.all(), fields=querry_set['Content']).strip() + ','
-                else:
-                    data += serializers.serialize('json', Content.objects.all()).strip() + ','
-            if 'Opinion' in querry_set:
-                if querry_set['Opinion']:
-                    data += serializers.serialize(
-                        'json', Opinion.objects.all(), fields=querry_set['Opinion']).strip() + ','
-                else:
-                    data += serializers.serialize('json', Opinion.objects.all()).strip() + ','
-            if 'Stats' in querry_set:
-                if querry_set['Stats']:
-                    data += serializers.serialize(
-                        'json', Stats.objects.all(), fields=querry_set['Stats']).strip() + ','
-                else:
-                    data += serializers.serialize('json', Stats.objects.all()).strip() + ','
-            data = '[' + data.strip(',') + ']'
+            exports = self.get_model_fields(options['model_fields'])
         elif options['forum_sync_data']:
-            data = self.get_forum_sync_data()
+            exports = [(User.objects.all(), ['username', 'password'])]
         else:
-            data = self.get_database()
+            exports = self.get_database(options['models'])
+
         # Output data
-        if options['archive_path']:
-            with open(options['archive_path'], 'w') as f:
-                f.write(data)
+        archive_path = options['archive_path']
+        compress = options['gzip'] or (archive_path is not None and archive_path.endswith('.gz'))
+        if archive_path and compress:
+            stream = gzip.open(archive_path, 'wt', encoding='utf-8')
+        elif archive_path:
+            stream = open(archive_path, 'w', encoding='utf-8')
+        elif compress:
+            stream = io.TextIOWrapper(gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb'),
+                                      encoding='utf-8')
         else:
-            print(data)
-
-    def get_database(self):
-        data = ""
-        if Category.objects.count() > 0:
-            data += serializers.serialize('json', Category.objects.all()).strip('[]') + ','
-        if Content.objects.count() > 0:
-            data += serializers.serialize('json', Content.objects.all()).strip('[]') + ','
-        if Opinion.objects.count() > 0:
-            data += serializers.serialize('json', Opinion.objects.all()).strip('[]') + ','
-        if OpinionDependency.objects.count() > 0:
-            data += serializers.serialize('json', OpinionDependency.objects.all()).strip('[]') + ','
-        if Stats.objects.count() > 0:
-            data += serializers.serialize('json', Stats.objects.all()).strip('[]') + ','
-        if StatsDependency.objects.count() > 0:
-            data += serializers.serialize('json', StatsDependency.objects.all()).strip('[]') + ','
-        if StatsFlatDependency.objects.count() > 0:
-            data += serializers.serialize('json',
-                                          StatsFlatDependency.objects.all()).strip('[]') + ','
-        if User.objects.count() > 0:
-            data += serializers.serialize('json', User.objects.all()).strip('[]') + ','
-        if Violation.objects.count() > 0:
-            data += serializers.serialize('json', Violation.objects.all()).strip('[]') + ','
-        if ViolationFeedback.objects.count() > 0:
-            data += serializers.serialize('json', ViolationFeedback.objects.all()).strip('[]') + ','
-        if ViolationVote.objects.count() > 0:
-            data += serializers.serialize('json', ViolationVote.objects.all()).strip('[]') + ','
-        data = '[' + data.strip(',') + ']'
-        return data
-
-    def get_forum_sync_data(self):
-        data = serializers.serialize('json', User.objects.all(), fields=['username', 'password'])
-        return data
+            stream = None
+        try:
+            writer = RecordWriter(stream or OutputStream(self.stdout), ndjson=options['ndjson'])
+            for queryset, fields in exports:
+                for record in iter_records(queryset, fields, options['chunk_size']):
+                    writer.write(record)
+            writer.close()
+        finally:
+            if stream is not None:
+                stream.close()
+
+    def get_model_fields(self, model_fields):
+        """Parse the model fields.
+
+        Args:
+            model_fields (list[str]): The model fields formated as "model" or "model.field".
+
+        Returns:
+            list[tuple]: The (queryset, fields) to export.
+
+        Raises:
+            CommandError: If the model fields are malformed or the model is not supported.
+        """
+        query_set = {}
+        for model_field in model_fields:
+            if re.match(r'^\w+$', model_field):
+                model, field = model_field, None
+            elif re.match(r'^\w+\.\w+$', model_field):
+                model, field = model_field.split('.')
+            else:
+                raise CommandError('Error, model fields are formated as "model" or "model.field"')
+            if model not in VALID_MODELS:
+                raise CommandError(f'Error, model not implemented {model}')
+            query_set.setdefault(model, [])
+            if field:
+                query_set[model].append(field)
+        exports = []
+        for model in (Content, Opinion, Stats):
+            if model.__name__ in query_set:
+                exports.append((model.objects.all(), query_set[model.__name__] or None))
+        return exports
+
+    def get_database(self, model_names=None):
+        """Return the (queryset, fields) to export for the database (or the input models).
+
+        Args:
+            model_names (list[str], optional): The models to export. Defaults to None (all).
+
+        Returns:
+            list[tuple]: The (queryset, fields) to export.
+
+        Raises:
+            CommandError: If a model is not exported.
+        """
+        models = {model.__name__: model for model in EXPORT_MODELS}
+        for model_name in model_names or []:
+            if model_name not in models:
+                raise CommandError(f'Error, model not implemented {model_name}')
+        return [(model.objects.all(), None)
+                for model in EXPORT_MODELS
+                if model_names is None or model.__name__ in model_names]
+
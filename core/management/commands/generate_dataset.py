@@ -0,0 +1,385 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import collections
+import datetime
+import random
+import time
+
+from actstream.models import Action, Follow
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from theories.models.categories import Category
+from theories.models.content import Content
+from theories.models.opinions import Opinion, OpinionDependency
+from theories.models.statistics import Stats, refresh_summaries
+from theories.search import rebuild_search_index
+from theories.utils import create_categories, create_reserved_dependencies
+from users.models import User
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+BATCH_SIZE = 2000
+SHARED_SUBTHEORY_PROBABILITY = 0.3
+FACT_PROBABILITY = 0.3
+FALSE_STATEMENT_PROBABILITY = 0.3
+
+# *******************************************************************************
+# Methods
+# *******************************************************************************
+
+
+class Command(BaseCommand):
+    """Generate a large synthetic dataset for load testing (bulk inserts, reproducible by seed).
+
+    The theories form a DAG of shared sub-theories (up to depth levels deep) over a pool of
+    evidence with a long tailed popularity. The opinions have polarized point distributions and
+    the users follow and act on the popular theories. Stats are not generated unless requested.
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='The random seed.')
+        parser.add_argument('--users', type=int, default=1000, help='The number of users.')
+        parser.add_argument('--theories', type=int, default=50,
+                            help='The number of root theories.')
+        parser.add_argument('--subtheories', type=int, default=200,
+                            help='The number of sub-theories.')
+        parser.add_argument('--depth', type=int, default=5,
+                            help='The depth of the sub-theory DAG.')
+        parser.add_argument('--evidence', type=int, default=2000,
+                            help='The number of evidence.')
+        parser.add_argument('--max_evidence', type=int, default=6,
+                            help='The maximum evidence per theory.')
+        parser.add_argument('--opinions', type=int, default=5000,
+                            help='The number of opinions.')
+        parser.add_argument('--max_dependencies', type=int, default=8,
+                            help='The maximum dependencies per opinion.')
+        parser.add_argument('--followers', type=int, default=2000,
+                            help='The number of follows.')
+        parser.add_argument('--actions', type=int, default=10000,
+                            help='The number of activity log entries.')
+        parser.add_argument('--prefix', default='synthetic',
+                            help='The prefix for the usernames and titles.')
+        parser.add_argument('--password', default=None,
+                            help='The password for all users (default: unusable password).')
+        parser.add_argument('--stats', action='store_true',
+                            help='Recalculate the stats of the generated theories (slow).')
+        parser.add_argument('--batch_size', type=int, default=BATCH_SIZE,
+                            help=f'The number of rows inserted at a time (default {BATCH_SIZE}).')
+
+    def handle(self, *args, **options):
+        """The method that is run when the commandline is invoked."""
+        if options['theories'] < 1 or options['users'] < 1 or options['depth'] < 1:
+            raise CommandError('There must be at least one theory, user and level of depth.')
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.counts = collections.Counter()
+        if User.objects.filter(username__startswith=options['prefix'] + '_').exists():
+            raise CommandError(f'Users with the prefix "{options["prefix"]}" already exist.')
+
+        start = time.time()
+        create_reserved_dependencies()
+        create_categories()
+        with transaction.atomic():
+            users = self.generate_users()
+            theories, subtheories, evidence = self.generate_content(users)
+            children = self.generate_dag(theories, subtheories, evidence)
+            self.generate_opinions(users, theories + subtheories, children)
+            self.generate_activity(users, theories + subtheories)
+            self.reset_sequences()
+            rebuild_search_index()
+            refresh_summaries(Content.objects.filter(pk__in=theories + subtheories))
+        if options['stats']:
+            for theory in Content.objects.filter(pk__in=theories + subtheories):
+                Stats.recalculate(theory)
+        duration = time.time() - start
+
+        # Report
+        for label, count in self.counts.items():
+            self.stdout.write(f'{label:40s} {count} rows')
+        total = sum(self.counts.values())
+        rate = total / duration if duration > 0 else float('inf')
+        self.stdout.write(f'Generated {total} rows in {duration:.3f}s ({rate:,.0f} rows/s).')
+
+    def bulk_create(self, model, objs):
+        """Insert the objects in batches and count the rows."""
+        # The backend may limit the batch size further (e.g., sqlite's compound select limit).
+        batch_size = connection.ops.bulk_batch_size(model._meta.concrete_fields, objs)
+        batch_size = min(self.options['batch_size'], max(batch_size, 1))
+        model.objects.bulk_create(objs, batch_size=batch_size)
+        self.counts[model._meta.label] += len(objs)
+
+    def next_pk(self, model):
+        """The next free primary key (the generated rows use explicit keys)."""
+        return (model.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0) + 1
+
+    def random_date(self, days):
+        """A random datetime within the last days."""
+        return self.now - datetime.timedelta(seconds=self.rng.uniform(0, days * 24 * 3600))
+
+    def popularity(self, count):
+        """Long tailed (pareto) weights for choosing popular items more often."""
+        return [self.rng.paretovariate(1.2) for _ in range(count)]
+
+    def generate_users(self):
+        """Generate the users (all at level 1).
+
+        Returns:
+            list[int]: The user primary keys.
+        """
+        prefix = self.options['prefix']
+        password = make_password(self.options['password'])
+        pk = self.next_pk(User)
+        users = [
+            User(pk=pk + i,
+                 username=f'{prefix}_{i}',
+                 password=password,
+                 date_joined=self.random_date(3 * 365)) for i in range(self.options['users'])
+        ]
+        self.bulk_create(User, users)
+        group, _created = Group.objects.get_or_create(name='user level: 1')
+        self.bulk_create(User.groups.through,
+                         [User.groups.through(user_id=x.pk, group_id=group.pk) for x in users])
+        return [x.pk for x in users]
+
+    def generate_content(self, users):
+        """Generate the theories, sub-theories and evidence.
+
+        Returns:
+            tuple(list[int]): The theory, sub-theory and evidence primary keys.
+        """
+        prefix = self.options['prefix']
+        pk = self.next_pk(Content)
+        contents = []
+        for kind, count in (('theory', self.options['theories']),
+                            ('sub-theory', self.options['subtheories']),
+                            ('evidence', self.options['evidence'])):
+            for i in range(count):
+                if kind != 'evidence':
+                    content_type = Content.TYPE.THEORY
+                elif self.rng.random() < FACT_PROBABILITY:
+                    content_type = Content.TYPE.FACT
+                else:
+                    content_type = Content.TYPE.EVIDENCE
+                user = self.rng.choice(users)
+                contents.append(
+                    Content(pk=pk + len(contents),
+                            content_type=content_type,
+                            title01=f'{prefix} {kind} {i}',
+                            title00=f'{prefix} {kind} {i} (false)'
+                            if content_type == Content.TYPE.THEORY else None,
+                            details=f'Generated {kind} #{i}.',
+                            created_by_id=user,
+                            modified_by_id=user,
+                            modified_date=self.random_date(365)))
+        self.bulk_create(Content, contents)
+        pks = [x.pk for x in contents]
+        num_theories = self.options['theories']
+        num_subtheories = self.options['subtheories']
+        theories = pks[:num_theories]
+        subtheories = pks[num_theories:num_theories + num_subtheories]
+        evidence = pks[num_theories + num_subtheories:]
+
+        # Categories (the root theories only).
+        category_all = Category.get('All')
+        categories = list(Category.objects.exclude(pk=category_all.pk))
+        rows = []
+        for theory in theories:
+            rows.append(Category.theories.through(category_id=category_all.pk,
+                                                  content_id=theory))
+            for category in self.rng.sample(categories, min(2, len(categories))):
+                rows.append(Category.theories.through(category_id=category.pk,
+                                                      content_id=theory))
+        self.bulk_create(Category.theories.through, rows)
+        return theories, subtheories, evidence
+
+    def generate_dag(self, theories, subtheories, evidence):
+        """Connect the theories into a DAG of (shared) sub-theories and evidence.
+
+        Each sub-theory is given a level (1 to depth) and parents from the lower levels, so the
+        graph is acyclic. The flat dependencies are the transitive closure.
+
+        Returns:
+            dict: The children (direct dependencies) of each theory.
+        """
+        depth = self.options['depth']
+        levels = [list(theories)] + [[] for _ in range(depth)]
+        for i, subtheory in enumerate(subtheories):
+            levels[1 + i % depth].append(subtheory)
+
+        children = collections.defaultdict(list)
+        for level in range(1, depth + 1):
+            for subtheory in levels[level]:
+                children[self.rng.choice(levels[level - 1])].append(subtheory)
+                if self.rng.random() < SHARED_SUBTHEORY_PROBABILITY:
+                    lower = self.rng.randrange(level)
+                    parent = self.rng.choice(levels[lower])
+                    if subtheory not in children[parent]:
+                        children[parent].append(subtheory)
+        weights = self.popularity(len(evidence))
+        intuition = Content.get_intuition()
+        for theory in theories + subtheories:
+            num_evidence = self.rng.randint(1, self.options['max_evidence'])
+            for item in set(self.rng.choices(evidence, weights=weights, k=num_evidence)):
+                children[theory].append(item)
+            children[theory].append(intuition.pk)
+
+        # Flat dependencies (bottom up).
+        flat = {}
+        for level in reversed(levels):
+            for theory in level:
+                flat[theory] = set(children[theory])
+                for child in children[theory]:
+                    flat[theory] |= flat.get(child, set())
+
+        through = Content.dependencies.through
+        self.bulk_create(through, [
+            through(from_content_id=parent, to_content_id=child)
+            for parent in children
+            for child in children[parent]
+        ])
+        through = Content.flat_dependencies.through
+        self.bulk_create(through, [
+            through(from_content_id=parent, to_content_id=child)
+            for parent in flat
+            for child in flat[parent]
+        ])
+        return children
+
+    def generate_opinions(self, users, theories, children):
+        """Generate the opinions (polarized beliefs), dependencies and utilization."""
+        theory_pks = set(theories)
+        intuition_pk = Content.get_intuition().pk
+        weights = self.popularity(len(theories))
+        max_opinions = len(users) * len(theories)
+        pairs = set()
+        while len(pairs) < min(self.options['opinions'], max_opinions):
+            pairs.add((self.rng.choice(users), self.rng.choices(theories, weights=weights)[0]))
+        pairs = sorted(pairs)
+
+        pk = self.next_pk(Opinion)
+        utilized = set()
+        batch_size = self.options['batch_size']
+        for i in range(0, len(pairs), batch_size):
+            opinions = []
+            dependencies = []
+            for user, theory in pairs[i:i + batch_size]:
+                belief = self.rng.betavariate(0.6, 0.6)
+                opinion = Opinion(pk=pk, user_id=user, content_id=theory)
+                opinion.true_input = round(100 * belief)
+                opinion.false_input = 100 - opinion.true_input
+                pk += 1
+
+                # Dependencies (the points support the opinion's belief more often than not).
+                contents = children[theory]
+                contents = self.rng.sample(
+                    contents, min(len(contents),
+                                  self.rng.randint(1, self.options['max_dependencies'])))
+                opinion_dependencies = []
+                for content in contents:
+                    points = min(100, int(5 * self.rng.paretovariate(1.5)))
+                    negate = content in theory_pks and \
+                        self.rng.random() < FALSE_STATEMENT_PROBABILITY
+                    field_name = ('f' if negate else 't') + \
+                        ('t' if self.rng.random() < belief else 'f') + '_input'
+                    opinion_dependency = OpinionDependency(parent_id=opinion.pk,
+                                                           content_id=content)
+                    setattr(opinion_dependency, field_name, points)
+                    opinion_dependencies.append(opinion_dependency)
+                    utilized.add((user, content))
+                utilized.add((user, theory))
+
+                # Points (same as Opinion.update_points).
+                opinion.true_total = sum(x.tt_input + x.ft_input for x in opinion_dependencies)
+                opinion.false_total = sum(x.tf_input + x.ff_input for x in opinion_dependencies)
+                if opinion.true_total == 0 or opinion.false_total == 0:
+                    intuition = [x for x in opinion_dependencies if x.content_id == intuition_pk]
+                    if len(intuition) > 0:
+                        intuition = intuition[0]
+                    else:
+                        intuition = OpinionDependency(parent_id=opinion.pk, content_id=intuition_pk)
+                        opinion_dependencies.append(intuition)
+                        utilized.add((user, intuition_pk))
+                    if opinion.true_total == 0:
+                        intuition.tt_input = opinion.true_input
+                        opinion.true_total += opinion.true_input
+                    if opinion.false_total == 0:
+                        intuition.tf_input = opinion.false_input
+                        opinion.false_total += opinion.false_input
+                for opinion_dependency in opinion_dependencies:
+                    opinion_dependency.parent = opinion
+                    opinion_dependency.rank = opinion_dependency.total_points()
+                opinions.append(opinion)
+                dependencies += opinion_dependencies
+            self.bulk_create(Opinion, opinions)
+            self.bulk_create(OpinionDependency, dependencies)
+
+        # Utilization
+        through = User.utilized.through
+        self.bulk_create(through,
+                         [through(user_id=user, content_id=content) for user, content in utilized])
+        counts = through.objects.filter(content_id=OuterRef('pk'))
+        counts = counts.order_by().values('content_id').annotate(count=Count('pk'))
+        # The generated content has contiguous keys (starting at the first theory).
+        contents = Content.objects.filter(Q(pk__gte=min(theories)) | Q(pk=intuition_pk))
+        contents.update(utilization=Coalesce(Subquery(counts.values('count')), 0))
+
+    def generate_activity(self, users, theories):
+        """Generate the follows and activity logs (popular theories get more of both)."""
+        content_type = ContentType.objects.get_for_model(Content)
+        user_content_type = ContentType.objects.get_for_model(User)
+        weights = self.popularity(len(theories))
+        max_follows = len(users) * len(theories)
+        follows = set()
+        while len(follows) < min(self.options['followers'], max_follows):
+            follows.add((self.rng.choice(users), self.rng.choices(theories, weights=weights)[0]))
+        self.bulk_create(Follow, [
+            Follow(user_id=user,
+                   content_type=content_type,
+                   object_id=str(theory),
+                   started=self.random_date(365)) for user, theory in sorted(follows)
+        ])
+
+        verbs = ['Created.', 'Modified.', 'Modified.', 'Modified.', 'started following']
+        actions = []
+        for _ in range(self.options['actions']):
+            actions.append(
+                Action(actor_content_type=user_content_type,
+                       actor_object_id=str(self.rng.choice(users)),
+                       verb=self.rng.choice(verbs),
+                       target_content_type=content_type,
+                       target_object_id=str(self.rng.choices(theories, weights=weights)[0]),
+                       timestamp=self.random_date(365)))
+            if len(actions) >= self.options['batch_size']:
+                self.bulk_create(Action, actions)
+                actions = []
+        self.bulk_create(Action, actions)
+
+    def reset_sequences(self):
+        """Reset the primary key sequences (e.g., postgresql) after the explicit keys."""
+        for sql in connection.ops.sequence_reset_sql(no_style(), [User, Content, Opinion]):
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
@@ -13,16 +13,12 @@ LICENSE.md file in the root directory of this source tree.
 # *******************************************************************************
 # Imports
 # *******************************************************************************
-import random
-import time
-
 from actstream.models import Action
 from django.contrib.auth.models import Permission
 from django.core.management.base import BaseCommand
 from notifications.models import Notification
 from reversion.models import Version
 
-from core.converters import IntegerCypher
 from theories.models.content import Content
 from theories.models.statistics import StatsFlatDependency
 from users.models import User, Violation
@@ -51,12 +47,6 @@ class Command(BaseCommand):
             help='Change ownership of all violations.',
         )
 
-        parser.add_argument(
-            '--test01',
-            action='store_true',
-            help='Test cypher.',
-        )
-
         parser.add_argument(
             '--test02',
             action='store_true',
@@ -75,21 +65,6 @@ class Command(BaseCommand):
             self.report01(options['report01'])
         if options['report02']:
             self.report02(options['report02'])
-        if options['test01']:
-            bit_length = 24
-            cypher = IntegerCypher(bit_length=bit_length)
-            start = time.time()
-            for x00 in range(1000000):
-                x00 = random.randint(0, 2**bit_length - 1)
-                x01 = cypher.to_url(x00)
-                x02 = cypher.to_python(x01)
-                # print(x01)
-                if x00 != x02:
-                    print(
-                        f'IntegerCypher: Error, plain text -> cypher -> plain text failed: {x00}, {x01}, {x02}'
-                    )
-            end = time.time()
-            print(end - start)
         if options['test02']:
             theory = Content.objects.get(pk=10)
             print(theory.url())
@@ -0,0 +1,220 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import collections
+import gzip
+import json
+import re
+import time
+
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from theories.models.statistics import refresh_summaries
+from theories.search import rebuild_search_index
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+BATCH_SIZE = 1000
+READ_SIZE = 2**16
+RE_SEPARATORS = re.compile(r'[\s\[\],]*')
+
+# *******************************************************************************
+# Methods
+# *******************************************************************************
+
+
+def open_archive(archive_path):
+    """Open the archive as a text stream (gzipped archives are detected automatically).
+
+    Args:
+        archive_path (str): The path of the json or ndjson archive.
+
+    Returns:
+        file: The text stream.
+    """
+    with open(archive_path, 'rb') as f:
+        compressed = f.read(2) == b'\x1f\x8b'
+    if compressed:
+        return gzip.open(archive_path, 'rt', encoding='utf-8')
+    return open(archive_path, 'r', encoding='utf-8')
+
+
+def iter_json_records(stream, read_size=READ_SIZE):
+    """Parse a json list or ndjson stream one record at a time.
+
+    Only read_size characters (plus one record) are held in memory at a time.
+
+    Args:
+        stream (file): The text stream.
+        read_size (int, optional): The number of characters read at a time.
+
+    Yields:
+        dict: The record.
+
+    Raises:
+        CommandError: If the stream is not a list of json objects (or ndjson).
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    index = 0
+    eof = False
+    while True:
+        index = RE_SEPARATORS.match(buffer, index).end()
+        try:
+            record, index = decoder.raw_decode(buffer, index)
+            yield record
+            continue
+        except json.JSONDecodeError:
+            # The record is incomplete (or the buffer is empty).
+            if eof:
+                if buffer[index:].strip():
+                    raise CommandError(f'Invalid json at: {buffer[index:index + 80]}')
+                return
+        data = stream.read(read_size)
+        eof = len(data) == 0
+        buffer = buffer[index:] + data
+        index = 0
+
+
+class Command(BaseCommand):
+    """Import the data created by the export command (json or ndjson, optionally gzipped).
+
+    The objects are inserted with bulk inserts in batches, the many-to-many rows are inserted
+    directly into the through tables, and no model signals are sent.
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        # Positional arguments
+        parser.add_argument('archive_path', type=str)
+
+        # Named (optional) arguments
+        parser.add_argument(
+            '--batch_size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'The number of rows inserted at a time (default {BATCH_SIZE}).',
+        )
+        parser.add_argument(
+            '--ignore_conflicts',
+            action='store_true',
+            help='Skip the rows that already exist (by primary key) instead of failing.',
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='The database to import into.',
+        )
+
+    def handle(self, *args, **options):
+        """The method that is run when the commandline is invoked."""
+        self.batch_size = options['batch_size']
+        self.ignore_conflicts = options['ignore_conflicts']
+        self.using = options['database']
+        self.counts = collections.Counter()
+        connection = connections[self.using]
+
+        start = time.time()
+        with open_archive(options['archive_path']) as stream:
+            with transaction.atomic(using=self.using):
+                # The archive is streamed, so the foreign keys are only checked at the end.
+                with connection.constraint_checks_disabled():
+                    self.insert(serializers.deserialize('python', iter_json_records(stream),
+                                                        using=self.using,
+                                                        ignorenonexistent=True))
+                table_names = [model._meta.db_table for model in self.counts]
+                connection.check_constraints(table_names=table_names)
+                # The rows are inserted raw (no signals), so the search index and the theory
+                # summaries are rebuilt.
+                rebuild_search_index(using=self.using)
+                refresh_summaries(using=self.using)
+        self.reset_sequences(connection)
+        duration = time.time() - start
+
+        # Report
+        for model, count in self.counts.items():
+            self.stdout.write(f'{model._meta.label:40s} {count} rows')
+        total = sum(self.counts.values())
+        rate = total / duration if duration > 0 else float('inf')
+        self.stdout.write(f'Imported {total} rows in {duration:.3f}s ({rate:,.0f} rows/s).')
+
+    def insert(self, deserialized_objects):
+        """Insert the objects in batches (the batches are split by model).
+
+        Args:
+            deserialized_objects (generator): The DeserializedObjects.
+        """
+        batch = []
+        m2m_batches = collections.defaultdict(list)
+        for deserialized_object in deserialized_objects:
+            obj = deserialized_object.object
+            if len(batch) > 0 and (type(obj) is not type(batch[0]) or
+                                   len(batch) >= self.batch_size):
+                self.insert_batch(batch)
+                batch = []
+            batch.append(obj)
+            for field_name, values in (deserialized_object.m2m_data or {}).items():
+                field = obj._meta.get_field(field_name)
+                through = field.remote_field.through
+                if not through._meta.auto_created:
+                    continue
+                m2m_batch = m2m_batches[through]
+                for value in values:
+                    m2m_batch.append(
+                        through(**{
+                            field.m2m_column_name(): obj.pk,
+                            field.m2m_reverse_name(): value,
+                        }))
+                if len(m2m_batch) >= self.batch_size:
+                    self.insert_batch(m2m_batch)
+                    m2m_batch.clear()
+        if len(batch) > 0:
+            self.insert_batch(batch)
+        for m2m_batch in m2m_batches.values():
+            if len(m2m_batch) > 0:
+                self.insert_batch(m2m_batch)
+
+    def insert_batch(self, objs):
+        """Insert a batch of objects (of the same model) with a single bulk insert.
+
+        The objects are inserted raw (like loaddata), so auto_now fields keep their values.
+
+        Args:
+            objs (list[Model]): The objects.
+        """
+        model = type(objs[0])
+        fields = model._meta.local_concrete_fields
+        connection = connections[self.using]
+        batch_size = max(connection.ops.bulk_batch_size(fields, objs), 1)
+        manager = model._base_manager.db_manager(self.using)
+        for i in range(0, len(objs), batch_size):
+            manager._insert(objs[i:i + batch_size],
+                            fields=fields,
+                            raw=True,
+                            using=self.using,
+                            ignore_conflicts=self.ignore_conflicts)
+        self.counts[model] += len(objs)
+
+    def reset_sequences(self, connection):
+        """Reset the primary key sequences (e.g., postgresql) for the imported tables."""
+        sql_list = connection.ops.sequence_reset_sql(no_style(), list(self.counts))
+        if len(sql_list) > 0:
+            with connection.cursor() as cursor:
+                for sql in sql_list:
+                    cursor.execute(sql)
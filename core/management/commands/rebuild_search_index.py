@@ -0,0 +1,52 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from theories.search import get_search_backend
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+
+# *******************************************************************************
+# Methods
+# *******************************************************************************
+
+
+class Command(BaseCommand):
+    """Rebuild the search index of the theories, evidence and categories.
+
+    The index is updated on save, a rebuild is only needed after bulk inserts or updates.
+    """
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database',
+                            default=DEFAULT_DB_ALIAS,
+                            help='The database to rebuild the index for.')
+
+    def handle(self, *args, **options):
+        """The method that is run when the commandline is invoked."""
+        start = time.time()
+        backend = get_search_backend(options['database'])
+        with transaction.atomic(using=options['database']):
+            backend.create_index()
+            backend.rebuild()
+        self.stdout.write(f'Rebuilt the search index ({type(backend).__name__}) in '
+                          f'{time.time() - start:.3f}s.')
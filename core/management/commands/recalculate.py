@@ -14,9 +14,14 @@ LICENSE.md file in the root directory of this source tree.
 # Imports
 # *******************************************************************************
 from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
 from theories.models.content import Content
 from theories.models.opinions import OpinionDependency
-from theories.models.statistics import (Stats, StatsDependency, StatsFlatDependency)
+from theories.models.statistics import (Stats, StatsDependency, StatsFlatDependency,
+                                        refresh_summaries)
+from users.models import User
 
 # *******************************************************************************
 # Defines
@@ -58,4 +63,12 @@ class Command(BaseCommand):
         for dependency in OpinionDependency.objects.all():
             dependency.save()
 
+        # Recalculate utilization (one query)
+        utilized = User.utilized.through.objects.filter(content_id=OuterRef('pk'))
+        utilized = utilized.order_by().values('content_id').annotate(count=Count('pk'))
+        thoeries.update(utilization=Coalesce(Subquery(utilized.values('count')), 0))
+
+        # Recalculate the theory summaries
+        refresh_summaries(thoeries)
+
         print("Done")
@@ -0,0 +1,182 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import datetime
+import time
+
+from django.contrib.auth.models import Group
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from users.models import (LEVEL02_AGE_REQUIREMENT, LEVEL02_CONTRIBUTIONS_REQUIREMENT,
+                          LEVEL03_AGE_REQUIREMENT, LEVEL03_CONTRIBUTIONS_REQUIREMENT,
+                          RE_LEVEL_GROUP, STRIKE_EXPIRE_LENGTH, WARNING_EXPIRE_LENGTH, User,
+                          Violation)
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+DEMOTION_STRIKES = 3
+
+# *******************************************************************************
+# Methods
+# *******************************************************************************
+
+
+def get_new_level(level, account_age, num_contributions, recent_warnings, recent_strikes):
+    """Evaluate the user's new level (same rules as is_up_for_promotion/is_up_for_demotion).
+
+    Args:
+        level (int): The user's current level.
+        account_age (int): The account age in days.
+        num_contributions (int): The number of contributions.
+        recent_warnings (int): The number of recent warnings.
+        recent_strikes (int): The number of recent strikes.
+
+    Returns:
+        int: The new level (same as level if there is no change).
+    """
+    if recent_strikes >= DEMOTION_STRIKES:
+        return max(0, level - 1)
+    if recent_warnings > 0 or recent_strikes > 0:
+        return level
+    if level == 1 and account_age >= LEVEL02_AGE_REQUIREMENT and \
+            num_contributions >= LEVEL02_CONTRIBUTIONS_REQUIREMENT:
+        return 2
+    if level == 2 and account_age >= LEVEL03_AGE_REQUIREMENT and \
+            num_contributions >= LEVEL03_CONTRIBUTIONS_REQUIREMENT:
+        return 3
+    return level
+
+
+class Command(BaseCommand):
+    """Promotes and demotes all users (in bulk)."""
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry_run',
+            action='store_true',
+            help='Report the level changes without applying them.',
+        )
+
+    def handle(self, *args, **options):
+        """The method that is run when the commandline is invoked."""
+        start = time.time()
+        changes = self.evaluate()
+        if not options['dry_run']:
+            self.apply(changes)
+        duration = time.time() - start
+
+        # Report
+        for username, level, new_level in changes:
+            action = 'promote' if new_level > level else 'demote'
+            self.stdout.write(f'{action:8s} {username}: {level} -> {new_level}')
+        num_users = User.objects.count()
+        rate = num_users / duration if duration > 0 else float('inf')
+        num_promoted = len([x for x in changes if x[2] > x[1]])
+        self.stdout.write(
+            f'{"Dry run: " if options["dry_run"] else ""}evaluated {num_users} users in '
+            f'{duration:.3f}s ({rate:,.0f} users/s), {num_promoted} promoted, '
+            f'{len(changes) - num_promoted} demoted.')
+
+    def evaluate(self):
+        """Evaluate the new levels for all users.
+
+        Returns:
+            list[tuple]: The changes as (username, level, new_level).
+        """
+        now = timezone.now()
+
+        # Levels (one query).
+        levels = {}
+        memberships = User.groups.through.objects.filter(group__name__startswith='user level: ')
+        for user_pk, group_name in memberships.values_list('user_id', 'group__name'):
+            match = RE_LEVEL_GROUP.match(group_name)
+            if match:
+                levels[user_pk] = max(levels.get(user_pk, -1), int(match.group(1)))
+
+        # Violations (one query).
+        violation_counts = {}
+        content_type = ContentType.objects.get_for_model(User)
+        warning_expiry_date = now - datetime.timedelta(days=WARNING_EXPIRE_LENGTH)
+        strike_expiry_date = now - datetime.timedelta(days=STRIKE_EXPIRE_LENGTH)
+        queryset = Violation.objects.filter(content_type=content_type).values('object_id')
+        queryset = queryset.annotate(
+            recent_warnings=Count('pk',
+                                  filter=Q(status=Violation.STATUS.WARNING,
+                                           close_date__gte=warning_expiry_date)),
+            recent_strikes=Count('pk',
+                                 filter=Q(status=Violation.STATUS.STRIKE,
+                                          close_date__gte=strike_expiry_date)),
+        ).order_by()
+        for entry in queryset:
+            violation_counts[entry['object_id']] = (entry['recent_warnings'],
+                                                    entry['recent_strikes'])
+
+        # Users and contributions (one query).
+        changes = []
+        users = User.objects.annotate(num_contributions=Count('contributions')).order_by('pk')
+        for pk, username, date_joined, num_contributions in users.values_list(
+                'pk', 'username', 'date_joined', 'num_contributions'):
+            level = levels.get(pk, -1)
+            if level < 0 or level > 3:
+                # No level (e.g., the system user) or admin only levels.
+                continue
+            recent_warnings, recent_strikes = violation_counts.get(pk, (0, 0))
+            new_level = get_new_level(level, (now - date_joined).days, num_contributions,
+                                      recent_warnings, recent_strikes)
+            if new_level != level:
+                changes.append((username, level, new_level))
+        return changes
+
+    def apply(self, changes):
+        """Apply the level changes in bulk.
+
+        The changes bypass User.promote/demote (and the m2m_changed signal).
+
+        Args:
+            changes (list[tuple]): The changes as (username, level, new_level).
+        """
+        groups = {}
+        for group in Group.objects.filter(name__startswith='user level: '):
+            match = RE_LEVEL_GROUP.match(group.name)
+            if match:
+                groups[int(match.group(1))] = group
+        user_pks = dict(User.objects.filter(username__in=[x[0] for x in changes]).values_list(
+            'username', 'pk'))
+        through = User.groups.through
+        removals = Q(pk__in=[])
+        additions = []
+        for username, level, new_level in changes:
+            user_pk = user_pks[username]
+            if new_level > level:
+                additions.append(through(user_id=user_pk, group_id=groups[new_level].pk))
+            else:
+                # Remove all levels above the new level (same as demote).
+                removals |= Q(user_id=user_pk, group_id__in=[
+                    group.pk for x, group in groups.items() if x > new_level
+                ])
+                additions.append(through(user_id=user_pk, group_id=groups[new_level].pk))
+        with transaction.atomic():
+            through.objects.filter(removals).delete()
+            existing = set(
+                through.objects.filter(user_id__in=user_pks.values()).values_list(
+                    'user_id', 'group_id'))
+            through.objects.bulk_create(
+                [x for x in additions if (x.user_id, x.group_id) not in existing])
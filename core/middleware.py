@@ -0,0 +1,177 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import tempfile
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.utils import QueryCapture, identity_map, request_timings
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+LOGGER = logging.getLogger('django')
+
+# A statement repeated this many times in a request is likely an N+1 loop.
+DUPLICATE_WARNING = 10
+
+# The phases reported in the Server-Timing header (see core.utils.timed).
+TIMING_PHASES = ('diagrams', 'markdown', 'template')
+
+# The query parameter that turns on profiling (staff only) and the number of entries logged.
+PROFILE_PARAM = 'profile'
+PROFILE_NUM_ENTRIES = 30
+
+# *******************************************************************************
+# Middleware
+# *******************************************************************************
+
+
+class QueryCountMiddleware:
+    """Records the SQL queries of each request (count, total time and duplicated statements).
+
+    The capture is available to the view and later middleware as request.query_capture.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryCapture() as capture:
+            request.query_capture = capture
+            response = self.get_response(request)
+        duplicates = capture.get_duplicates(min_count=DUPLICATE_WARNING)
+        LOGGER.debug('%s %s: %d queries in %.1fms (%d duplicated).', request.method,
+                     request.path, capture.count, capture.total_time * 1000,
+                     capture.num_duplicates())
+        for sql, count in duplicates:
+            LOGGER.warning('%s %s: statement executed %d times: %s', request.method,
+                           request.path, count, sql[:200])
+        return response
+
+
+class IdentityMapMiddleware:
+    """Scopes an identity map for get_or_none lookups to each request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with identity_map():
+            return self.get_response(request)
+
+
+class ServerTimingMiddleware:
+    """Adds a Server-Timing header and a structured log line with each request's time breakdown.
+
+    The phases are: db (see QueryCountMiddleware, must come first), diagrams, markdown, template
+    (includes the markdown rendered by the templates) and total. The log line is always written,
+    the header (backend timing) is only added for staff, in DEBUG or if SERVER_TIMING_PUBLIC
+    (setting, defaults to False) is set.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with request_timings() as timings:
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        # Metrics (name, seconds, description)
+        metrics = []
+        capture = getattr(request, 'query_capture', None)
+        if capture is not None:
+            metrics.append(('db', capture.total_time, f'{capture.count} queries'))
+        for phase in TIMING_PHASES:
+            if phase in timings:
+                metrics.append((phase, timings[phase], None))
+        metrics.append(('total', total, None))
+
+        # Header
+        if self.is_public(request):
+            entries = []
+            for name, duration, description in metrics:
+                entry = f'{name};dur={duration * 1000:.1f}'
+                if description is not None:
+                    entry += f';desc="{description}"'
+                entries.append(entry)
+            response['Server-Timing'] = ', '.join(entries)
+
+        # Log
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+        }
+        for name, duration, _description in metrics:
+            record[f'{name}_ms'] = round(duration * 1000, 1)
+        if capture is not None:
+            record['queries'] = capture.count
+        LOGGER.info('request_timing %s', json.dumps(record), extra={'timing': record})
+        return response
+
+    @staticmethod
+    def is_public(request):
+        """Return True if the timing may be exposed (header) to the client."""
+        if settings.DEBUG or getattr(settings, 'SERVER_TIMING_PUBLIC', False):
+            return True
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+
+class ProfileMiddleware:
+    """Profiles a request (cProfile) when a staff member adds ?profile to the url.
+
+    The stats are dumped to PROFILE_DIR (setting, defaults to the temp directory) for use with
+    pstats/snakeviz and the top entries (by cumulative time) are logged. The file name is
+    returned in the X-Profile header. Must come after the AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user = getattr(request, 'user', None)
+        if PROFILE_PARAM not in request.GET or user is None or not user.is_staff:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        response = profiler.runcall(self.get_response, request)
+
+        # Dump
+        profile_dir = getattr(settings, 'PROFILE_DIR', None) or tempfile.gettempdir()
+        slug = re.sub(r'[^\w]+', '_', request.path).strip('_') or 'root'
+        file_name = f'profile_{timezone.now():%Y%m%d_%H%M%S_%f}_{slug[:80]}.prof'
+        profiler.dump_stats(os.path.join(profile_dir, file_name))
+        response['X-Profile'] = file_name
+
+        # Log
+        output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=output)
+        stats.sort_stats('cumulative').print_stats(PROFILE_NUM_ENTRIES)
+        LOGGER.info('profile %s %s (%s):\n%s', request.method, request.path, file_name,
+                    output.getvalue())
+        return response
@@ -15,16 +15,22 @@ LICENSE.md file in the root directory of this source tree.
 # *******************************************************************************
 import re
 import datetime
+import hashlib
+import threading
 
 from django import template
+from django.core.cache import cache
 from django.utils.safestring import mark_safe
 from django.utils.http import urlencode
 from django.utils import timezone
 from django.urls import reverse
+from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from notifications.models import Notification
 from misaka import Markdown, SaferHtmlRenderer
 
+from core.utils import get_or_set_versioned, timed
+
 # *******************************************************************************
 # Defines
 # *******************************************************************************
@@ -39,6 +45,21 @@ RE_WIKI_O_URL += r'|theory/%s/vs/\d+' % RE_STATS
 RE_WIKI_O_URL += r'|theory/\d+/%s/vs/%s)/' % (RE_STATS, RE_STATS)
 RE_WIKI_O = re.compile(RE_WIKI_O_URL)
 
+LOG_CACHE_TIMEOUT = 60 * 60 * 24
+
+DETAILS_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+DETAILS_CACHE_VERSION = 1
+DETAILS_EXTENSIONS = (
+    'strikethrough',
+    'underline',
+    'quote',
+    'superscript',
+    'math',
+    'math-explicit',
+    'fenced-code',
+    'tables',
+)
+
 # *******************************************************************************
 # Methods
 # *******************************************************************************
@@ -150,6 +171,79 @@ def interpret_log_text(log, log_text, extra=''):
     return result
 
 
+def get_log_dependencies(log, target=True, owner=False):
+    """Collect the objects that a rendered piece of a log depends on.
+
+    Args:
+        log (Log): The Action or Notification being rendered.
+        target (bool, optional): If true, include the target. Defaults to True.
+        owner (bool, optional): If true, include the target's user (see {target.get_owner}).
+            Defaults to False.
+
+    Returns:
+        list[tuple]: The (model, pk) pairs, None if the log is not cacheable.
+    """
+    pairs = [(log.action_object_content_type_id, log.action_object_object_id)]
+    if target:
+        pairs.append((log.target_content_type_id, log.target_object_id))
+    objs = []
+    for content_type_id, object_id in pairs:
+        if object_id is None:
+            continue
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None:
+            return None
+        objs.append((model, object_id))
+    if target and owner and log.target is not None:
+        user_id = getattr(log.target, 'user_id', None)
+        if user_id is not None:
+            objs.append((get_user_model(), user_id))
+    return objs
+
+
+def get_or_set_log(log, tag, args, default, target=True, owner=False):
+    """Retrieve a rendered piece of a log from the object cache (rendering it if missing).
+
+    The key depends on the log's id and the modification versions of the objects
+    it references, so editing the action object, target or owner invalidates the entry.
+
+    Args:
+        log (Log): The Action or Notification being rendered.
+        tag (str): The name of the rendering method.
+        args (list[str]): Any other inputs that change the rendered output.
+        default (function): Renders the piece (no arguments).
+        target (bool, optional): If true, the key depends on the target as well. Defaults to True.
+        owner (bool, optional): If true, the key depends on the target's user as well.
+            Defaults to False.
+
+    Returns:
+        str: The rendered piece.
+    """
+    objs = None if log.pk is None else get_log_dependencies(log, target=target, owner=owner)
+    if objs is None:
+        return default()
+    digest = hashlib.md5('\n'.join(str(x) for x in args).encode('utf-8')).hexdigest()
+    name = 'log:%s:%s:%d:%s' % (tag, log.__class__.__name__, log.pk, digest)
+    return get_or_set_versioned(name, objs, default, LOG_CACHE_TIMEOUT)
+
+
+def cached_log_text(log, log_text, extra=''):
+    """A cached version of interpret_log_text.
+
+    Args:
+        log (Log): The log to use to populate format strings.
+        log_text (str): The log text to format.
+        extra (str, optional): The extra set of params to add to url links. Defaults to ''.
+
+    Returns:
+        str: The formated text.
+    """
+    return get_or_set_log(log,
+                          'text', [log_text, extra],
+                          lambda: interpret_log_text(log, log_text, extra),
+                          owner='target.get_owner' in log_text)
+
+
 def make_safe(text):
     """Remove all unsafe http characters from the text.
 
@@ -324,7 +418,7 @@ def get_verb(log, extra=''):
         str: The formated verb output text.
     """
     extra = str(extra)
-    verb = interpret_log_text(log, log.verb, extra)
+    verb = cached_log_text(log, log.verb, extra)
     if isinstance(log, Notification):
         if log.unread:
             verb = '<strong>' + verb + '</strong>'
@@ -345,7 +439,7 @@ def get_description(log, extra=''):
         str: The formated description output text.
     """
     extra = str(extra)
-    description = interpret_log_text(log, log.description, extra)
+    description = cached_log_text(log, log.description, extra)
     return mark_safe(description)
 
 
@@ -375,14 +469,16 @@ def url_action(action, extra=''):
     Returns:
         str: The url.
     """
-    resolved_url = action.action_object.activity_url()
-    params = {'date': action.timestamp - datetime.timedelta(seconds=1)}
     extra = str(extra)
-    if len(extra) > 0:
-        extra += '&' + urlencode(params)
-    else:
-        extra += '?%s' % urlencode(params)
-    return resolved_url + extra
+
+    def render():
+        resolved_url = action.action_object.activity_url()
+        params = {'date': action.timestamp - datetime.timedelta(seconds=1)}
+        if len(extra) > 0:
+            return resolved_url + extra + '&' + urlencode(params)
+        return resolved_url + extra + '?%s' % urlencode(params)
+
+    return get_or_set_log(action, 'url', [extra], render, target=False)
 
 
 @register.filter
@@ -451,7 +547,10 @@ class CustomRendererForDetails(SaferHtmlRenderer):
     Attributes:
         bib_labels(dict): A mapping for bib labels to bib numbers.
     """
-    bib_labels = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bib_labels = {}
 
     def header(self, content, level):
         """[summary]
@@ -530,14 +629,52 @@ class CustomRendererForDetails(SaferHtmlRenderer):
                 '\n</table>')
 
 
+_markdown = threading.local()
+
+
+def get_details_markdown():
+    """Retrieve the markdown renderer for details, building it once per thread.
+
+    Misaka renderers carry state while rendering (e.g., the bib labels), so
+    each thread gets its own instance instead of sharing a global one.
+
+    Returns:
+        Markdown: The renderer.
+    """
+    md = getattr(_markdown, 'md', None)
+    if md is None:
+        md = Markdown(CustomRendererForDetails(), extensions=DETAILS_EXTENSIONS)
+        _markdown.md = md
+    return md
+
+
+@timed('markdown')
 def render_details(raw_content):
-    """[summary]
+    """Render the details markdown (cached by a hash of the raw text).
 
     Args:
-        raw_content ([type]): [description]
+        raw_content (str): The raw details text.
 
     Returns:
-        [type]: [description]
+        str: The rendered html.
+    """
+    digest = hashlib.sha1(raw_content.encode('utf-8')).hexdigest()
+    key = 'details:%d:%s' % (DETAILS_CACHE_VERSION, digest)
+    rendered_content = cache.get(key)
+    if rendered_content is None:
+        rendered_content = _render_details(raw_content)
+        cache.set(key, rendered_content, DETAILS_CACHE_TIMEOUT)
+    return rendered_content
+
+
+def _render_details(raw_content):
+    """Render the details markdown.
+
+    Args:
+        raw_content (str): The raw details text.
+
+    Returns:
+        str: The rendered html.
     """
     bib_content = ''
     if re.search(r'</bib>[\n\s]*$', raw_content):
@@ -546,22 +683,9 @@ def render_details(raw_content):
             bib_content = raw_content[i:]
             raw_content = raw_content[:i]
 
-    md = Markdown(
-        CustomRendererForDetails(),
-        extensions=(
-            'strikethrough',
-            'underline',
-            'quote',
-            'superscript',
-            'math',
-            'math-explicit',
-            'fenced-code',
-            'tables',
-        ),
-    )
-    md.renderer.bib_labels = {}
+    md = get_details_markdown()
+    md.renderer.bib_labels = bib_labels = {}
     rendered_content = md(raw_content)
-    bib_labels = md.renderer.bib_labels
 
     if len(bib_content) > 0:
         bib_entries = {}
@@ -0,0 +1,106 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import copy
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.benchmarks.cases import BENCHMARKS
+from core.benchmarks.runner import compare
+from theories.models.content import Content
+from users.maintence import create_groups_and_permissions
+from users.models import User
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+
+
+# ************************************************************
+# BenchmarkCommandTests
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class BenchmarkCommandTests(TestCase):
+
+    def setUp(self):
+        create_groups_and_permissions()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'results.json')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_benchmark(self):
+        num_users = User.objects.count()
+        num_contents = Content.objects.count()
+        out = StringIO()
+        call_command('benchmark', sizes=['small'], repeat=1, output=self.path, stdout=out)
+        with open(self.path, 'r', encoding='utf-8') as f:
+            results = json.load(f)
+        self.assertEqual([x['benchmark'] for x in results['results']], list(BENCHMARKS))
+        for result in results['results']:
+            self.assertEqual(result['size'], 'small')
+            self.assertGreater(result['wall_time']['median'], 0)
+            self.assertGreater(result['peak_memory'], 0)
+        recalculate = results['results'][0]
+        self.assertGreater(recalculate['queries'], 0)
+        # The generated data is rolled back.
+        self.assertEqual(User.objects.count(), num_users)
+        self.assertEqual(Content.objects.count(), num_contents)
+        self.assertIn('stats.recalculate', out.getvalue())
+
+        # Compare against itself.
+        call_command('benchmark',
+                     sizes=['small'],
+                     benchmarks=['graphs.bar_graph'],
+                     repeat=1,
+                     compare=self.path,
+                     threshold=1000.0,
+                     stdout=StringIO())
+
+    def test_compare(self):
+        result = {
+            'benchmark': 'stats.recalculate',
+            'size': 'small',
+            'wall_time': {'min': 1.0, 'median': 1.0, 'max': 1.0},
+            'queries': 10,
+            'peak_memory': 100,
+        }
+        baseline = {'results': [result]}
+        results = {'results': [copy.deepcopy(result)]}
+        self.assertFalse(compare(results, baseline)[0]['regression'])
+        results['results'][0]['wall_time']['median'] = 2.0
+        self.assertTrue(compare(results, baseline)[0]['regression'])
+        self.assertFalse(compare(results, baseline, threshold=3.0)[0]['regression'])
+        results['results'][0]['queries'] = 11
+        self.assertTrue(compare(results, baseline, threshold=3.0)[0]['regression'])
+
+    def test_errors(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark', benchmarks=['nope'], stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('benchmark', sizes=['huge'], stdout=StringIO())
@@ -0,0 +1,69 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import random
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from core.converters import IntegerCypher
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+
+
+# ************************************************************
+# IntegerCypherTests
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class IntegerCypherTests(SimpleTestCase):
+
+    def test_known_values(self):
+        """The urls must not change (they are bookmarked/shared)."""
+        cypher = IntegerCypher(bit_length=72)
+        self.assertEqual(cypher.to_url(0), 'kpfNdgkgszz5')
+        self.assertEqual(cypher.to_url(10), '2QtjMQKcHjut')
+        self.assertEqual(cypher.to_url(123456), '3ofL_uIHGi0L')
+        cypher = IntegerCypher(bit_length=24)
+        self.assertEqual(cypher.to_url(99), 'aD7y')
+        self.assertEqual(cypher.to_python('G5FB'), 2**24 - 1)
+
+    def test_round_trip(self):
+        random.seed(0)
+        cypher = IntegerCypher(bit_length=24, cache_size=8)
+        for _ in range(1000):
+            x = random.randint(0, 2**24 - 1)
+            self.assertEqual(cypher.to_python(cypher.to_url(x)), x)
+            self.assertEqual(cypher.decrypt(cypher.encrypt(x)), x)
+
+    def test_lists(self):
+        cypher = IntegerCypher(bit_length=72)
+        values = [3, 1, 4, 1, 5]
+        urls = cypher.to_url_list(values)
+        self.assertEqual(urls, [cypher.to_url(x) for x in values])
+        self.assertEqual(cypher.to_python_list(urls), values)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_cypher', count=100, stdout=out)
+        self.assertIn('batch', out.getvalue())
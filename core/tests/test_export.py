@@ -0,0 +1,155 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import datetime
+import gzip
+import json
+import os
+import random
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError
+from django.test import TestCase
+
+from core.management.commands.export import EXPORT_MODELS
+from core.management.commands.import_data import iter_json_records
+from theories.models.content import Content
+from theories.tests.utils import create_test_opinion, create_test_theory
+from theories.utils import create_categories, create_reserved_dependencies
+from users.maintence import create_groups_and_permissions, create_test_user
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+
+
+# ************************************************************
+# ExportCommandTests
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class ExportCommandTests(TestCase):
+
+    def setUp(self):
+
+        # Setup
+        random.seed(0)
+        create_groups_and_permissions()
+        create_reserved_dependencies()
+        create_categories()
+
+        # Create user(s)
+        self.user = create_test_user(username='not_bob', password='1234')
+
+        # Create data
+        self.theory = create_test_theory(created_by=self.user)
+        create_test_opinion(content=self.theory, user=self.user, dependencies=True)
+
+    def test_json(self):
+        out = StringIO()
+        call_command('export', chunk_size=3, stdout=out)
+        data = json.loads(out.getvalue())
+        models = [x['model'] for x in data]
+        self.assertEqual(models.count('theories.content'), Content.objects.count())
+        self.assertIn('theories.opinion', models)
+        self.assertIn('users.user', models)
+
+    def test_ndjson_gzip(self):
+        with tempfile.TemporaryDirectory() as path:
+            archive_path = os.path.join(path, 'export.ndjson.gz')
+            call_command('export', archive_path, models=['Content'], ndjson=True)
+            with gzip.open(archive_path, 'rt') as f:
+                data = [json.loads(line) for line in f]
+        self.assertEqual(len(data), Content.objects.count())
+        self.assertEqual(data[0]['pk'], Content.objects.order_by('pk').first().pk)
+
+    def test_model_fields(self):
+        out = StringIO()
+        call_command('export', model_fields=['Content.title01'], stdout=out)
+        data = json.loads(out.getvalue())
+        self.assertEqual(set(data[0]['fields'].keys()), {'title01'})
+        with self.assertRaises(CommandError):
+            call_command('export', model_fields=['User'], stdout=out)
+
+
+# ************************************************************
+# ImportDataCommandTests
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class ImportDataCommandTests(TestCase):
+
+    def setUp(self):
+
+        # Setup
+        random.seed(0)
+        create_groups_and_permissions()
+        create_reserved_dependencies()
+        create_categories()
+
+        # Create user(s)
+        self.user = create_test_user(username='not_bob', password='1234')
+
+        # Create data
+        self.theory = create_test_theory(created_by=self.user)
+        create_test_opinion(content=self.theory, user=self.user, dependencies=True)
+
+    def test_round_trip(self):
+        counts = {model: model.objects.count() for model in EXPORT_MODELS}
+        Content.objects.filter(pk=self.theory.pk).update(pub_date=datetime.date(2001, 2, 3))
+        for ndjson in (False, True):
+            with tempfile.TemporaryDirectory() as path:
+                archive_path = os.path.join(path, 'export.json.gz')
+                call_command('export', archive_path, ndjson=ndjson)
+                for model in reversed(EXPORT_MODELS):
+                    model.objects.all().delete()
+                out = StringIO()
+                call_command('import_data', archive_path, batch_size=2, stdout=out)
+            self.assertIn('rows/s', out.getvalue())
+            for model, count in counts.items():
+                self.assertEqual(model.objects.count(), count, model)
+            theory = Content.objects.get(pk=self.theory.pk)
+            self.assertEqual(theory.pub_date, datetime.date(2001, 2, 3))
+            self.assertEqual(list(theory.get_dependencies()), list(self.theory.get_dependencies()))
+
+    def test_ignore_conflicts(self):
+        with tempfile.TemporaryDirectory() as path:
+            archive_path = os.path.join(path, 'export.json')
+            call_command('export', archive_path, models=['Content'])
+            with self.assertRaises(IntegrityError):
+                call_command('import_data', archive_path, stdout=StringIO())
+            count = Content.objects.count()
+            call_command('import_data', archive_path, ignore_conflicts=True, stdout=StringIO())
+            self.assertEqual(Content.objects.count(), count)
+
+    def test_iter_json_records(self):
+        stream = StringIO('[{"a": 1},\n{"b": [2, 3]}, {"c": "]"}]\n')
+        self.assertEqual(list(iter_json_records(stream, read_size=3)),
+                         [{'a': 1}, {'b': [2, 3]}, {'c': ']'}])
+        with self.assertRaises(CommandError):
+            list(iter_json_records(StringIO('[{"a": 1}, {"b"')))
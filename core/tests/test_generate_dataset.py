@@ -0,0 +1,89 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from theories.models.content import Content
+from theories.models.opinions import Opinion
+from users.maintence import create_groups_and_permissions
+from users.models import User
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+OPTIONS = {
+    'users': 30,
+    'theories': 3,
+    'subtheories': 12,
+    'depth': 4,
+    'evidence': 40,
+    'opinions': 100,
+    'followers': 20,
+    'actions': 50,
+    'batch_size': 16,
+}
+
+
+# ************************************************************
+# GenerateDatasetCommandTests
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class GenerateDatasetCommandTests(TestCase):
+
+    def setUp(self):
+        create_groups_and_permissions()
+
+    def test_generate(self):
+        out = StringIO()
+        call_command('generate_dataset', stdout=out, **OPTIONS)
+        self.assertIn('rows/s', out.getvalue())
+        users = User.objects.filter(username__startswith='synthetic_')
+        self.assertEqual(users.count(), 30)
+        self.assertEqual(users.first().get_level(), 1)
+        theories = Content.objects.filter(title01__startswith='synthetic theory')
+        self.assertEqual(theories.count(), 3)
+        self.assertEqual(Opinion.objects.filter(user__in=users).count(), 100)
+        # The deepest sub-theories are reachable (flat dependencies) from the roots.
+        subtheory = Content.objects.get(title01='synthetic sub-theory 3')
+        self.assertTrue(subtheory.parent_flat_theories.filter(pk__in=theories).exists())
+        for theory in theories:
+            self.assertTrue(theory.assert_theory(check_dependencies=True))
+        # The opinion points are consistent (same as update_points).
+        opinion = Opinion.objects.filter(user__in=users).first()
+        true_total, false_total = opinion.true_total, opinion.false_total
+        opinion.update_points()
+        self.assertEqual((opinion.true_total, opinion.false_total), (true_total, false_total))
+
+    def test_seed(self):
+        call_command('generate_dataset', stdout=StringIO(), prefix='a', **OPTIONS)
+        call_command('generate_dataset', stdout=StringIO(), prefix='b', **OPTIONS)
+        opinions = Opinion.objects.order_by('pk')
+        a = list(opinions.filter(user__username__startswith='a_').values_list(
+            'true_input', 'true_total', 'false_total'))
+        b = list(opinions.filter(user__username__startswith='b_').values_list(
+            'true_input', 'true_total', 'false_total'))
+        self.assertEqual(a, b)
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', stdout=StringIO(), prefix='a', **OPTIONS)
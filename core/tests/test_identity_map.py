@@ -0,0 +1,108 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import random
+
+from django.test import TestCase
+
+from core.utils import clear_identity_map, get_identity_map, get_or_none, identity_map
+from theories.models.content import Content
+from theories.models.opinions import Opinion
+from theories.models.statistics import Stats
+from theories.tests.utils import create_test_theory
+from theories.utils import create_categories, create_reserved_dependencies
+from users.maintence import create_groups_and_permissions, create_test_user
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+
+
+# ************************************************************
+# IdentityMapTests
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class IdentityMapTests(TestCase):
+
+    def setUp(self):
+
+        # Setup
+        random.seed(0)
+        create_groups_and_permissions()
+        create_reserved_dependencies()
+        create_categories()
+
+        # Create user(s)
+        self.user = create_test_user(username='not_bob', password='1234')
+
+        # Create data
+        self.theory = create_test_theory(created_by=self.user)
+        Stats.initialize(self.theory)
+
+    def test_inactive(self):
+        self.assertIsNone(get_identity_map())
+        with self.assertNumQueries(2):
+            get_or_none(self.theory.stats, stats_type=Stats.TYPE.ALL)
+            get_or_none(self.theory.stats, stats_type=Stats.TYPE.ALL)
+
+    def test_hits(self):
+        with identity_map():
+            with self.assertNumQueries(1):
+                stats = get_or_none(self.theory.stats, stats_type=Stats.TYPE.ALL)
+                self.assertIs(get_or_none(self.theory.stats, stats_type=Stats.TYPE.ALL), stats)
+            with self.assertNumQueries(1):
+                self.assertIsNone(get_or_none(self.theory.opinions, user=self.user))
+                self.assertIsNone(get_or_none(self.theory.opinions, user=self.user))
+            # Different keys are different entries.
+            with self.assertNumQueries(1):
+                get_or_none(self.theory.stats, stats_type=Stats.TYPE.SUPPORTERS)
+        self.assertIsNone(get_identity_map())
+
+    def test_querysets_not_cached(self):
+        with identity_map():
+            with self.assertNumQueries(2):
+                get_or_none(Content.objects.filter(pk=self.theory.pk), pk=self.theory.pk)
+                get_or_none(Content.objects.filter(pk=self.theory.pk), pk=self.theory.pk)
+
+    def test_invalidate_on_write(self):
+        with identity_map():
+            self.assertIsNone(get_or_none(self.theory.opinions, user=self.user))
+            opinion = Opinion.objects.create(user=self.user, content=self.theory)
+            self.assertEqual(get_or_none(self.theory.opinions, user=self.user), opinion)
+            Opinion.objects.filter(pk=opinion.pk).delete()
+            self.assertIsNone(get_or_none(self.theory.opinions, user=self.user))
+
+    def test_clear(self):
+        with identity_map():
+            stats = get_or_none(self.theory.stats, stats_type=Stats.TYPE.ALL)
+            self.assertIsNone(get_or_none(self.theory.opinions, user=self.user))
+            # A bulk write bypasses the signals.
+            Opinion.objects.bulk_create([Opinion(user=self.user, content=self.theory)])
+            self.assertIsNone(get_or_none(self.theory.opinions, user=self.user))
+            clear_identity_map(Opinion)
+            self.assertIsNotNone(get_or_none(self.theory.opinions, user=self.user))
+            # The other models are kept.
+            with self.assertNumQueries(0):
+                self.assertIs(get_or_none(self.theory.stats, stats_type=Stats.TYPE.ALL), stats)
+            clear_identity_map()
+            self.assertEqual(get_identity_map(), {})
+        # Inactive is a no-op.
+        clear_identity_map()
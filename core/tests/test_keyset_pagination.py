@@ -0,0 +1,140 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import datetime
+from urllib.parse import parse_qs
+
+from actstream.models import Action
+from django.contrib.contenttypes.models import ContentType
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.utils import (CURSOR_NEXT, Parameters, QueryCapture, decode_cursor, encode_cursor,
+                        get_keyset_page)
+from theories.models.categories import Category
+from theories.utils import create_categories
+from users.maintence import create_groups_and_permissions, create_test_user
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+NUM_ACTIONS = 33
+PER_PAGE = 5
+
+
+# ************************************************************
+# KeysetPaginationTests
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        create_groups_and_permissions()
+        create_categories()
+        self.user = create_test_user(username='bob', password='1234')
+        self.category = Category.get('All')
+        user_type = ContentType.objects.get_for_model(self.user)
+        category_type = ContentType.objects.get_for_model(self.category)
+        now = timezone.now()
+        # Pairs of actions share a timestamp (the pk breaks the tie).
+        Action.objects.bulk_create([
+            Action(actor_content_type=user_type,
+                   actor_object_id=str(self.user.pk),
+                   verb=f'action {i}',
+                   target_content_type=category_type,
+                   target_object_id=str(self.category.pk),
+                   timestamp=now - datetime.timedelta(minutes=i // 2)) for i in range(NUM_ACTIONS)
+        ])
+        self.actions = self.category.target_actions.all()
+        self.expected = list(self.actions.order_by('-timestamp', '-pk'))
+
+    def get_page(self, url=''):
+        """Retrieve the page for a url (parameters)."""
+        request = RequestFactory().get('/' + url)
+        return get_keyset_page(self.actions, Parameters(request), per_page=PER_PAGE)
+
+    def test_cursor(self):
+        timestamp = timezone.now()
+        cursor = encode_cursor(CURSOR_NEXT, timestamp, 12)
+        self.assertEqual(decode_cursor(cursor), (CURSOR_NEXT, timestamp, 12))
+        self.assertIsNone(decode_cursor(None))
+        self.assertIsNone(decode_cursor('garbage'))
+        self.assertIsNone(decode_cursor(encode_cursor('x', timestamp, 12)))
+
+    def test_forward(self):
+        page = self.get_page()
+        self.assertFalse(page.has_previous)
+        self.assertIsNone(page.previous_url)
+        objs = list(page)
+        while page.has_next:
+            page = self.get_page(page.next_url)
+            self.assertTrue(page.has_previous)
+            objs += list(page)
+        self.assertEqual(objs, self.expected)
+
+    def test_backward(self):
+        page = self.get_page(self.get_page().last_url)
+        self.assertFalse(page.has_next)
+        self.assertEqual(list(page), self.expected[-PER_PAGE:])
+        objs = list(page)
+        while page.has_previous:
+            page = self.get_page(page.previous_url)
+            self.assertTrue(page.has_next)
+            objs = list(page) + objs
+        self.assertEqual(objs, self.expected)
+
+    def test_invalid_cursor(self):
+        page = self.get_page('?cursor=garbage')
+        self.assertEqual(list(page), self.expected[:PER_PAGE])
+
+    def test_params(self):
+        page = self.get_page('?path=a,b&page=3')
+        params = parse_qs(page.next_url.lstrip('?'))
+        self.assertEqual(params['path'], ['a,b'])
+        self.assertIn('cursor', params)
+        self.assertNotIn('page', params)
+        self.assertEqual(self.get_page(page.next_url).first_url, '?path=a%2Cb')
+
+    def test_deep_pages(self):
+        # A deep page costs the same number of queries as the first page.
+        with QueryCapture() as capture:
+            page = self.get_page()
+            list(page)
+        num_queries = capture.count
+        while page.has_next:
+            with QueryCapture() as capture:
+                page = self.get_page(page.next_url)
+                list(page)
+            self.assertEqual(capture.count, num_queries)
+
+    def test_views(self):
+        self.client.login(username='bob', password='1234')
+        url = reverse('theories:activity', kwargs={'category_slug': 'all'})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        actions = response.context['actions']
+        self.assertTrue(actions.has_next)
+        response = self.client.get(url + actions.next_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['actions'].has_previous)
+        response = self.client.get(reverse('users:notifications') + '?cursor=garbage')
+        self.assertEqual(response.status_code, 200)
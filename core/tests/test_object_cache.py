@@ -0,0 +1,138 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import os
+import tempfile
+
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+
+from core.checks import check_object_cache
+from core.utils import get_or_set_versioned, get_versioned_key
+from theories.model_utils import swap_true_false
+from theories.models.statistics import Stats
+from theories.tests.utils import create_test_evidence, create_test_opinion, create_test_theory
+from theories.utils import create_categories, create_reserved_dependencies
+from users.maintence import create_groups_and_permissions, create_test_user
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+
+
+# ************************************************************
+# ObjectCacheTests
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class ObjectCacheTests(TestCase):
+
+    def setUp(self):
+        create_groups_and_permissions()
+        create_reserved_dependencies()
+        create_categories()
+        self.user = create_test_user(username='bob', password='1234')
+        self.theory = create_test_theory(created_by=self.user)
+        self.evidence = create_test_evidence(parent_theory=self.theory, created_by=self.user)
+        self.opinion = create_test_opinion(content=self.theory, user=self.user,
+                                           dependencies=True)
+        Stats.initialize(self.theory)
+        self.stats = Stats.get(self.theory, Stats.TYPE.ALL)
+
+    def assertBumped(self, obj, func):
+        key = get_versioned_key('test', obj)
+        self.assertEqual(get_versioned_key('test', obj), key)
+        func()
+        self.assertNotEqual(get_versioned_key('test', obj), key)
+
+    def test_save(self):
+        self.assertBumped(self.theory, self.theory.save)
+        self.assertBumped(self.opinion, self.opinion.save)
+        self.assertBumped(self.stats, self.stats.save)
+
+    def test_dependencies(self):
+        dependency = self.opinion.dependencies.first()
+        self.assertBumped(self.opinion, dependency.save)
+        self.assertBumped(self.opinion, dependency.delete)
+        evidence = create_test_evidence(parent_theory=self.theory,
+                                        title='Evidence02',
+                                        created_by=self.user)
+        self.assertBumped(self.theory, lambda: self.theory.dependencies.remove(evidence))
+        self.assertBumped(self.theory, lambda: evidence.parents.add(self.theory))
+
+    def test_bulk(self):
+        self.theory.title00 = 'False'
+        self.assertBumped(self.opinion, lambda: swap_true_false(self.theory))
+        self.assertBumped(self.stats, lambda: swap_true_false(self.theory))
+
+    def test_get_or_set(self):
+        values = []
+
+        def compute():
+            values.append(len(values))
+            return values[-1]
+
+        self.assertEqual(get_or_set_versioned('test', [self.theory, self.opinion], compute), 0)
+        self.assertEqual(get_or_set_versioned('test', [self.theory, self.opinion], compute), 0)
+        self.opinion.save()
+        self.assertEqual(get_or_set_versioned('test', [self.theory, self.opinion], compute), 1)
+
+    def test_file_based(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            caches = {
+                'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+                },
+                'objects': {
+                    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': tmp_dir,
+                },
+            }
+            with override_settings(CACHES=caches, OBJECT_CACHE='objects'):
+                self.assertBumped(self.theory, self.theory.save)
+                self.assertGreater(len(os.listdir(tmp_dir)), 0)
+
+    def test_on_commit(self):
+        with transaction.atomic():
+            key = get_versioned_key('test', self.theory)
+            self.theory.save()
+            # bumped now (for this transaction) and again on commit (for concurrent readers)
+            uncommitted_key = get_versioned_key('test', self.theory)
+            self.assertNotEqual(uncommitted_key, key)
+            callbacks = [func for _sids, func in connection.run_on_commit]
+            self.assertGreater(len(callbacks), 0)
+        # The test case never commits, run the callbacks.
+        for func in callbacks:
+            func()
+        self.assertNotEqual(get_versioned_key('test', self.theory), uncommitted_key)
+
+    def test_check(self):
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=local, OBJECT_CACHE='default'):
+            self.assertEqual([x.id for x in check_object_cache(None)], ['core.W001'])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            shared = {
+                'default': {
+                    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': tmp_dir,
+                },
+            }
+            with override_settings(CACHES=shared, OBJECT_CACHE='default'):
+                self.assertEqual(check_object_cache(None), [])
@@ -0,0 +1,66 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from core.middleware import DUPLICATE_WARNING, QueryCountMiddleware
+from core.utils import QueryCapture
+from users.models import User
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+
+
+# ************************************************************
+# QueryCaptureTests
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class QueryCaptureTests(TestCase):
+
+    def test_capture(self):
+        with QueryCapture() as capture:
+            for username in ('a', 'b', 'c'):
+                User.objects.filter(username=username).exists()
+            User.objects.count()
+        self.assertEqual(capture.count, 4)
+        self.assertEqual(capture.num_duplicates(), 2)
+        self.assertGreaterEqual(capture.total_time, 0.0)
+        duplicates = capture.get_duplicates()
+        self.assertEqual(len(duplicates), 1)
+        self.assertEqual(duplicates[0][1], 3)
+        # Inactive outside the context.
+        User.objects.count()
+        self.assertEqual(capture.count, 4)
+
+    def test_middleware(self):
+
+        def view(request):
+            for i in range(DUPLICATE_WARNING):
+                User.objects.filter(pk=i).exists()
+            return HttpResponse('')
+
+        request = RequestFactory().get('/')
+        with self.assertLogs('django', level='WARNING') as logs:
+            QueryCountMiddleware(view)(request)
+        self.assertEqual(request.query_capture.count, DUPLICATE_WARNING)
+        self.assertIn(f'executed {DUPLICATE_WARNING} times', logs.output[0])
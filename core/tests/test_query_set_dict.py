@@ -13,6 +13,7 @@ LICENSE.md file in the root directory of this source tree.
 import copy
 import types
 
+from django.db.models import Q
 from django.test import TestCase
 
 from core.utils import QuerySetDict
@@ -75,3 +76,84 @@ class QuerySetDictTests(TestCase):
         self.assertEqual(query_set02.count(), 1)
         self.assertEqual(query_set02.get(self.content01), self.opinion01)
         self.assertIsNone(query_set02.get(self.content02))
+
+    def test_exclude_lookups(self):
+        query_set01 = QuerySetDict('content.pk')
+        query_set01.add(self.opinion01)
+        query_set01.add(self.opinion02)
+        query_set02 = query_set01.exclude(content__pk__in=[1])
+        self.assertEqual(list(query_set02), [self.opinion02])
+        query_set02 = query_set01.exclude(~Q(content__pk=1))
+        self.assertEqual(list(query_set02), [self.opinion01])
+
+
+class QuerySetDictLookupTests(TestCase):
+
+    def setUp(self):
+        self.opinions = []
+        for pk, content_type, points in [(1, 10, 0.5), (2, 20, 0.25), (3, -10, 0.75), (4, 21, 0.0)]:
+            opinion = types.SimpleNamespace(points=points)
+            opinion.content = types.SimpleNamespace(pk=pk, content_type=content_type)
+            self.opinions.append(opinion)
+        self.query_set = QuerySetDict('content.pk',
+                                      queryset=self.opinions,
+                                      indexes=['content.content_type'])
+
+    def test_indexes(self):
+        self.assertEqual(self.query_set.indexes['content.content_type'][10], {1})
+        # Replacing an object updates the index.
+        opinion = types.SimpleNamespace(points=0.0)
+        opinion.content = types.SimpleNamespace(pk=1, content_type=20)
+        self.query_set.add(opinion)
+        self.assertEqual(self.query_set.indexes['content.content_type'][10], set())
+        self.assertEqual(self.query_set.indexes['content.content_type'][20], {1, 2})
+
+    def test_filter(self):
+        query_set = self.query_set.filter(content__content_type=10)
+        self.assertEqual(list(query_set), [self.opinions[0]])
+        query_set = self.query_set.filter(content__content_type__in=[10, -10])
+        self.assertEqual(list(query_set), [self.opinions[0], self.opinions[2]])
+        query_set = self.query_set.filter(points__gte=0.5, content__pk__lt=3)
+        self.assertEqual(list(query_set), [self.opinions[0]])
+        # Filtering doesn't modify the original.
+        self.assertEqual(self.query_set.count(), 4)
+
+    def test_filter_q(self):
+        # Same as Opinion.get_theory_evidence().
+        query_set = self.query_set.filter(~Q(content__content_type=10) &
+                                          ~Q(content__content_type=-10))
+        self.assertEqual(list(query_set), [self.opinions[1], self.opinions[3]])
+        query_set = self.query_set.filter(Q(content__content_type=10) |
+                                          Q(content__content_type=-10))
+        self.assertEqual(list(query_set), [self.opinions[0], self.opinions[2]])
+        self.assertEqual(query_set.get(3), self.opinions[2])
+
+    def test_exists_and_first(self):
+        self.assertTrue(self.query_set.exists())
+        self.assertEqual(self.query_set.first(), self.opinions[0])
+        query_set = self.query_set.filter(content__content_type=30)
+        self.assertFalse(query_set.exists())
+        self.assertIsNone(query_set.first())
+
+    def test_order_by(self):
+        query_set = self.query_set.order_by('-points')
+        self.assertEqual(query_set.values_list('content__pk', flat=True), [3, 1, 2, 4])
+        query_set = self.query_set.order_by('points')
+        self.assertEqual(query_set.first(), self.opinions[3])
+        # None is the largest value.
+        self.opinions[1].points = None
+        query_set = self.query_set.order_by('points')
+        self.assertEqual(query_set.values_list('content__pk', flat=True), [4, 1, 3, 2])
+        query_set = self.query_set.order_by('-points')
+        self.assertEqual(query_set.values_list('content__pk', flat=True), [2, 3, 1, 4])
+
+    def test_unsupported_lookup(self):
+        with self.assertRaises(ValueError):
+            self.query_set.filter(content__pk__icontains=1)
+        with self.assertRaises(ValueError):
+            self.query_set.exclude(content__pk__range=(1, 2))
+
+    def test_values_list(self):
+        self.assertEqual(self.query_set.values_list('content__pk', 'points')[1], (2, 0.25))
+        with self.assertRaises(TypeError):
+            self.query_set.values_list('content__pk', 'points', flat=True)
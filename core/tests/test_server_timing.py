@@ -0,0 +1,116 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.utils import get_request_timings, request_timings, timed, timing
+from theories.tests.utils import create_test_opinion, create_test_theory
+from theories.utils import create_categories, create_reserved_dependencies
+from users.maintence import create_groups_and_permissions, create_test_user
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+
+
+@timed('outer')
+def nested_timed():
+    with timing('inner'):
+        with timing('outer'):
+            pass
+
+
+# ************************************************************
+# ServerTimingTests
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class ServerTimingTests(TestCase):
+
+    def setUp(self):
+        create_groups_and_permissions()
+        create_reserved_dependencies()
+        create_categories()
+        self.user = create_test_user(username='bob', password='1234')
+        self.theory = create_test_theory(created_by=self.user)
+        self.opinion = create_test_opinion(content=self.theory, user=self.user)
+        self.url = reverse('theories:opinion-analysis',
+                           kwargs={
+                               'content_pk': self.theory.pk,
+                               'opinion_pk': self.opinion.pk
+                           })
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_timing(self):
+        # Inactive
+        nested_timed()
+        self.assertIsNone(get_request_timings())
+        # Active (nested phases are counted once)
+        with request_timings() as timings:
+            nested_timed()
+            nested_timed()
+        self.assertEqual(set(timings), {'outer', 'inner'})
+        self.assertGreaterEqual(timings['outer'], timings['inner'])
+        self.assertIsNone(get_request_timings())
+
+    def test_header(self):
+        # The timing is logged but not exposed to the client.
+        with self.assertLogs('django', level='INFO') as logs:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+        self.assertTrue(any('request_timing' in x for x in logs.output))
+        self.client.login(username='bob', password='1234')
+        self.assertNotIn('Server-Timing', self.client.get(self.url))
+        with override_settings(SERVER_TIMING_PUBLIC=True):
+            self.assertIn('Server-Timing', self.client.get(self.url))
+
+        # Staff
+        self.user.is_staff = True
+        self.user.save()
+        with self.assertLogs('django', level='INFO') as logs:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        names = [x.split(';')[0] for x in response['Server-Timing'].split(', ')]
+        self.assertEqual(names, ['db', 'diagrams', 'markdown', 'template', 'total'])
+        self.assertIn('queries"', response['Server-Timing'])
+        self.assertTrue(any('request_timing' in x and '"diagrams_ms"' in x for x in logs.output))
+        self.assertNotIn('X-Profile', response)
+
+    def test_profile(self):
+        # Not staff.
+        self.client.login(username='bob', password='1234')
+        response = self.client.get(self.url + '?profile')
+        self.assertNotIn('X-Profile', response)
+        # Staff
+        self.user.is_staff = True
+        self.user.save()
+        with override_settings(PROFILE_DIR=self.tmp_dir.name):
+            with self.assertLogs('django', level='INFO'):
+                response = self.client.get(self.url + '?profile')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir.name, response['X-Profile'])))
@@ -0,0 +1,143 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import random
+from unittest import mock
+
+from actstream import action
+from actstream.models import Action
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.templatetags.extra import (get_description, get_verb, render_details,
+                                     url_action)
+from theories.tests.utils import create_test_opinion, create_test_theory
+from theories.utils import create_categories, create_reserved_dependencies
+from users.maintence import create_groups_and_permissions, create_test_user
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+
+
+# ************************************************************
+# LogRenderTests
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class LogRenderTests(TestCase):
+
+    def setUp(self):
+
+        # Setup
+        random.seed(0)
+        cache.clear()
+        create_groups_and_permissions()
+        create_reserved_dependencies()
+        create_categories()
+
+        # Create user(s)
+        self.user = create_test_user(username='not_bob', password='1234')
+
+        # Create data
+        self.theory = create_test_theory(title='Theory', created_by=self.user)
+        action.send(self.user,
+                    verb='<# object.a_url Modified #>',
+                    description='<# object.url {object} #>',
+                    action_object=self.theory)
+        self.log = Action.objects.get()
+
+    def test_get_verb_cached(self):
+        verb = get_verb(self.log)
+        self.assertIn(self.theory.activity_url(), verb)
+        log = Action.objects.get(pk=self.log.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_verb(log), verb)
+
+    def test_get_description_invalidated(self):
+        self.assertIn('Theory', get_description(self.log))
+        self.theory.title01 = 'Renamed'
+        self.theory.save()
+        log = Action.objects.get(pk=self.log.pk)
+        description = get_description(log)
+        self.assertIn('Renamed', description)
+        self.assertNotIn('Theory', description)
+
+    def test_url_action_cached(self):
+        url = url_action(self.log, '?page=2')
+        self.assertTrue(url.startswith(self.theory.activity_url() + '?page=2&date='))
+        log = Action.objects.get(pk=self.log.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(url_action(log, '?page=2'), url)
+        self.assertNotEqual(url_action(log), url)
+
+    def test_owner_invalidated(self):
+        opinion = create_test_opinion(content=self.theory, user=self.user)
+        action.send(self.user,
+                    verb='Commented on',
+                    description='{target.get_owner}',
+                    action_object=self.theory,
+                    target=opinion)
+        log = Action.objects.get(verb='Commented on')
+        self.assertEqual(get_description(log), 'not_bob')
+        self.user.username = 'renamed_bob'
+        self.user.save()
+        log = Action.objects.get(pk=log.pk)
+        self.assertEqual(get_description(log), 'renamed_bob')
+
+    def test_dummy_cache(self):
+        caches = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(CACHES=caches):
+            self.assertIn(self.theory.activity_url(), get_verb(self.log))
+            self.assertIn('Theory', get_description(self.log))
+
+
+# ************************************************************
+# DetailsRenderTests
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class DetailsRenderTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bib(self):
+        text = 'Claim [#](b) and [#](a, b).\n<bib>\n[a]: First\n[b]: Second\n</bib>'
+        rendered = render_details(text)
+        self.assertIn('[1]', rendered)
+        self.assertIn('[2,1]', rendered)
+        self.assertLess(rendered.find('Second'), rendered.find('First'))
+        # Labels do not leak between calls.
+        self.assertIn('[1]', render_details('Other [#](c).\n<bib>\n[c]: Third\n</bib>'))
+
+    def test_cached(self):
+        text = 'Some *details*.'
+        rendered = render_details(text)
+        with mock.patch('core.templatetags.extra._render_details') as render:
+            self.assertEqual(render_details(text), rendered)
+            render.assert_not_called()
+        cache.clear()
+        self.assertEqual(render_details(text), rendered)
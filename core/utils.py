@@ -10,20 +10,37 @@ This source code is licensed under the GPL license found in the
 LICENSE.md file in the root directory of this source tree.
 """
 
+import base64
+import collections
+import contextlib
 import copy
 import datetime
 import enum
+import functools
+import hashlib
 # *******************************************************************************
 # Imports
 # *******************************************************************************
 import re
+import threading
+import time
+import uuid
 
 from actstream import action
 from actstream.models import Action
+from actstream.registry import registry
+from django.contrib.contenttypes.models import ContentType
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connections, transaction
+from django.db.models import Q
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.http import urlencode
 from model_utils import Choices as DjangoChoices
+from notifications.models import Notification
 from notifications.signals import notify
 
 # *******************************************************************************
@@ -31,6 +48,23 @@ from notifications.signals import notify
 # *******************************************************************************
 DEBUG = False
 
+IDENTITY_MAP_MODELS = ('theories.Content', 'theories.Opinion', 'theories.Stats')
+# The models that are versioned (in addition to the actstream models), see get_versioned_key.
+VERSIONED_MODELS = ('theories.Content', 'theories.Opinion', 'theories.Stats')
+
+OBJECT_VERSION_TIMEOUT = None
+OBJECT_VERSION_KEY = 'object_version:%s:%s'
+# The cache backends that are not shared between processes (see is_object_cache_shared).
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# The keyset (cursor) directions, see get_keyset_page.
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+CURSOR_LAST = 'l'
+
 
 class LogDiffResult(enum.Enum):
     """Enum for log_is_different return result."""
@@ -103,16 +137,28 @@ def get_or_none(objects, **kwargs):
 
     Example: get_or_none(theory.opinions, user=current_user)
 
+    If the identity map is active (see IdentityMapMiddleware), lookups through a model
+    manager or related manager are served from memory after the first fetch.
+
     Args:
         objects (QuerySet): A reference to the model's objects.
 
     Returns:
         Object or None: The unique matching object, None otherwise.
     """
+    identity_map = get_identity_map()
+    key = None
+    if identity_map is not None:
+        key = get_identity_map_key(objects, kwargs)
+        if key is not None and key in identity_map:
+            return identity_map[key]
     try:
-        return objects.get(**kwargs)
+        result = objects.get(**kwargs)
     except ObjectDoesNotExist:
-        return None
+        result = None
+    if key is not None:
+        identity_map[key] = result
+    return result
 
 
 def get_first_or_none(objects, **kwargs):
@@ -188,6 +234,40 @@ def notify_if_unique(follower, log, update_unread=True, accept_time=21600):
     return False
 
 
+def bulk_notify(logs):
+    """Create the notifications for the input logs with a single insert.
+
+    Unlike notify.send, no signals are sent and the logs are not checked for uniqueness.
+
+    Args:
+        logs (list[dict]): The logs, with the same keys as notify.send ('sender', 'recipient',
+            'verb', 'description', 'action_object', 'target', 'level').
+
+    Returns:
+        list[Notification]: The created notifications.
+    """
+    timestamp = timezone.now()
+    notifications = []
+    for log in logs:
+        notification = Notification(
+            recipient=log['recipient'],
+            actor_content_type=ContentType.objects.get_for_model(log['sender']),
+            actor_object_id=log['sender'].pk,
+            verb=str(log['verb']),
+            public=log.get('public', True),
+            description=log.get('description'),
+            timestamp=timestamp,
+            level=log.get('level', Notification.LEVELS.info),
+        )
+        for key in ('target', 'action_object'):
+            obj = log.get(key)
+            if obj is not None:
+                setattr(notification, f'{key}_object_id', obj.pk)
+                setattr(notification, f'{key}_content_type', ContentType.objects.get_for_model(obj))
+        notifications.append(notification)
+    return Notification.objects.bulk_create(notifications)
+
+
 def log_is_different(old_log, new_log, update_unread=False, accept_time=21600):
     """Checks if the input log's contents are different than the input parameters.
 
@@ -241,6 +321,430 @@ def log_is_different(old_log, new_log, update_unread=False, accept_time=21600):
     return LogDiffResult.MATCH
 
 
+# *******************************************************************************
+# Identity map
+# *******************************************************************************
+_identity_map = threading.local()
+
+
+def get_identity_map():
+    """Retrieve the identity map for the current thread.
+
+    Returns:
+        dict or None: The identity map, None if it is not active.
+    """
+    return getattr(_identity_map, 'entries', None)
+
+
+@contextlib.contextmanager
+def identity_map():
+    """Activate the identity map for get_or_none lookups (nested calls are no-ops)."""
+    if get_identity_map() is not None:
+        yield get_identity_map()
+        return
+    _identity_map.entries = {}
+    try:
+        yield _identity_map.entries
+    finally:
+        _identity_map.entries = None
+
+
+def get_identity_map_key(objects, kwargs):
+    """Construct the identity map key for a get_or_none lookup.
+
+    Only managers (e.g., Content.objects or theory.opinions) for the models in
+    IDENTITY_MAP_MODELS are supported, arbitrary querysets are not.
+
+    Args:
+        objects (Manager): The manager used for the lookup.
+        kwargs (dict): The lookup arguments.
+
+    Returns:
+        tuple or None: The key, None if the lookup is not cacheable.
+    """
+    model = getattr(objects, 'model', None)
+    if model is None or model._meta.label not in IDENTITY_MAP_MODELS:
+        return None
+    if not hasattr(objects, 'get_queryset') or hasattr(objects, 'query'):
+        return None
+    lookups = dict(getattr(objects, 'core_filters', {}))
+    lookups.update(kwargs)
+    key = [model._meta.label, objects.__class__.__name__]
+    for name in sorted(lookups):
+        value = lookups[name]
+        if hasattr(value, '_meta'):
+            value = (value._meta.label, value.pk)
+        key.append((name, value))
+    key = tuple(key)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def clear_identity_map(model=None):
+    """Drop the identity map entries (e.g., after a bulk write that bypasses the signals).
+
+    Args:
+        model (Model, optional): Only drop the entries of this model. Defaults to None (all).
+    """
+    entries = get_identity_map()
+    if not entries:
+        return
+    if model is None:
+        entries.clear()
+        return
+    label = model._meta.label
+    for key in [key for key in entries if key[0] == label]:
+        del entries[key]
+
+
+def identity_map_signal_handler(sender, **kwargs):
+    """Drop the identity map entries for a model that was written to.
+
+    Args:
+        sender (Model): The model class.
+    """
+    if sender._meta.label in IDENTITY_MAP_MODELS:
+        clear_identity_map(sender)
+
+
+# *******************************************************************************
+# Query capture
+# *******************************************************************************
+
+
+class QueryCapture():
+    """Records the SQL queries executed while active (use as a context manager).
+
+    Statements are recorded without their parameters, so a statement that is repeated (e.g.,
+    an N+1 loop) shows up as a duplicate.
+
+    Attributes:
+        using (list[str]): The database aliases captured.
+        statements (Counter): The number of times each statement was executed.
+        count (int): The number of queries.
+        total_time (float): The total time spent executing the queries (seconds).
+    """
+
+    def __init__(self, using=None):
+        if using is None:
+            using = list(connections)
+        elif isinstance(using, str):
+            using = [using]
+        self.using = using
+        self.statements = collections.Counter()
+        self.count = 0
+        self.total_time = 0.0
+        self.exit_stack = None
+
+    def __enter__(self):
+        self.exit_stack = contextlib.ExitStack()
+        for alias in self.using:
+            self.exit_stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.exit_stack.close()
+        self.exit_stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.total_time += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    def get_duplicates(self, min_count=2):
+        """Return the statements that were executed at least min_count times.
+
+        Args:
+            min_count (int, optional): The minimum number of executions. Defaults to 2.
+
+        Returns:
+            list[tuple]: The (statement, count) pairs, most executed first.
+        """
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= min_count]
+
+    def num_duplicates(self):
+        """The number of queries that repeated an earlier statement."""
+        return self.count - len(self.statements)
+
+
+# *******************************************************************************
+# Request timing
+# *******************************************************************************
+_request_timings = threading.local()
+
+
+def get_request_timings():
+    """Retrieve the phase timings for the current thread.
+
+    Returns:
+        dict or None: The time spent in each phase (seconds), None if timing is not active.
+    """
+    return getattr(_request_timings, 'timings', None)
+
+
+@contextlib.contextmanager
+def request_timings():
+    """Activate the phase timings (see timed) for the current thread (nested calls are no-ops)."""
+    if get_request_timings() is not None:
+        yield get_request_timings()
+        return
+    _request_timings.timings = {}
+    _request_timings.active = set()
+    try:
+        yield _request_timings.timings
+    finally:
+        _request_timings.timings = None
+        _request_timings.active = None
+
+
+@contextlib.contextmanager
+def timing(phase):
+    """Add the time spent in the block to the phase (only if request timing is active).
+
+    Nested blocks of the same phase are only counted once.
+
+    Args:
+        phase (str): The phase name (e.g., 'diagrams').
+    """
+    timings = get_request_timings()
+    if timings is None or phase in _request_timings.active:
+        yield
+        return
+    _request_timings.active.add(phase)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
+        _request_timings.active.discard(phase)
+
+
+def timed(phase):
+    """A decorator that adds the time spent in the method to the phase (see timing).
+
+    Args:
+        phase (str): The phase name (e.g., 'diagrams').
+
+    Returns:
+        function: The decorator.
+    """
+
+    def decorator(func):
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timing(phase):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# *******************************************************************************
+# Cache methods
+# *******************************************************************************
+
+
+def get_object_cache():
+    """Return the cache that holds the object versions (and what is cached against them).
+
+    The cache alias is set by the OBJECT_CACHE setting (defaults to 'default'). It must be shared
+    by all the workers (e.g., file based or memcached) for the versions to be consistent.
+
+    Returns:
+        BaseCache: The cache.
+    """
+    return caches[getattr(settings, 'OBJECT_CACHE', DEFAULT_CACHE_ALIAS)]
+
+
+def is_object_cache_shared():
+    """Return true if the object cache is shared by all the workers (see core.checks).
+
+    Returns:
+        bool: False if the object cache is a local memory or dummy cache.
+    """
+    alias = getattr(settings, 'OBJECT_CACHE', DEFAULT_CACHE_ALIAS)
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    return backend not in LOCAL_CACHE_BACKENDS
+
+
+def get_object_version_key(content_type_id, object_id):
+    """Construct the cache key that stores an object's modification version.
+
+    Args:
+        content_type_id (int): The pk of the object's ContentType.
+        object_id (int or str): The object's pk.
+
+    Returns:
+        str: The cache key.
+    """
+    return OBJECT_VERSION_KEY % (content_type_id, object_id)
+
+
+def get_object_versions(*pairs):
+    """Retrieve the modification versions for a set of objects.
+
+    Missing versions (never set or evicted) are assigned a fresh token so that
+    anything cached against a previous version can never be matched again.
+
+    Args:
+        *pairs (tuple): (content_type_id, object_id) pairs, None entries are ignored.
+
+    Returns:
+        list[str]: The versions, in the same order as the input pairs.
+    """
+    object_cache = get_object_cache()
+    keys = [get_object_version_key(*pair) for pair in pairs if pair is not None]
+    versions = object_cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = uuid.uuid4().hex
+            object_cache.add(key, version, OBJECT_VERSION_TIMEOUT)
+            # The fresh token is used if the backend does not store it (e.g., the dummy cache).
+            versions[key] = object_cache.get(key) or version
+    return [versions[key] for key in keys]
+
+
+def set_object_versions(keys):
+    """Assign fresh versions to the keys.
+
+    Inside a transaction the versions are assigned again once it commits, otherwise a
+    concurrent reader could cache the uncommitted (old) data against the new versions.
+    The immediate assignment keeps the current transaction from reading its own stale cache.
+
+    Args:
+        keys (list[str]): The version keys (see get_object_version_key).
+    """
+    def assign():
+        get_object_cache().set_many({key: uuid.uuid4().hex for key in keys},
+                                    OBJECT_VERSION_TIMEOUT)
+
+    assign()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(assign)
+
+
+def bump_object_version(content_type_id, object_id):
+    """Invalidate everything cached against the object's current version.
+
+    Args:
+        content_type_id (int): The pk of the object's ContentType.
+        object_id (int or str): The object's pk.
+    """
+    set_object_versions([get_object_version_key(content_type_id, object_id)])
+
+
+def bump_versions(model, pks):
+    """Invalidate everything cached against a set of objects (e.g., after a bulk update).
+
+    Args:
+        model (Model): The model class.
+        pks (iterable): The objects' primary keys.
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    set_object_versions([get_object_version_key(content_type.pk, pk) for pk in set(pks)])
+
+
+def get_versioned_key(name, *objs):
+    """Construct a cache key that changes whenever one of the objects changes.
+
+    Example: get_versioned_key('venn', opinion, opinion.content)
+
+    Args:
+        name (str): The name of what is cached (e.g., the diagram).
+        *objs (Model or tuple): The objects (or (model, pk) pairs) that the cached value
+            depends on.
+
+    Returns:
+        str: The cache key.
+    """
+    objs = [x if isinstance(x, tuple) else (type(x), x.pk) for x in objs]
+    content_types = ContentType.objects.get_for_models(*set(model for model, _pk in objs))
+    versions = get_object_versions(*[(content_types[model].pk, pk) for model, pk in objs])
+    key = name
+    for (model, pk), version in zip(objs, versions):
+        key += f':{model._meta.label_lower}.{pk}.{version}'
+    return key
+
+
+def get_or_set_versioned(name, objs, default, timeout=None):
+    """Retrieve a value cached against the objects' versions (computing it if missing).
+
+    Args:
+        name (str): The name of what is cached (e.g., the diagram).
+        objs (list[Model or tuple]): The objects (or (model, pk) pairs) that the cached value
+            depends on.
+        default (function): Computes the value (no arguments).
+        timeout (int, optional): The cache timeout (seconds). Defaults to None (forever).
+
+    Returns:
+        The value.
+    """
+    object_cache = get_object_cache()
+    key = get_versioned_key(name, *objs)
+    value = object_cache.get(key)
+    if value is None:
+        value = default()
+        object_cache.set(key, value, timeout)
+    return value
+
+
+def object_version_signal_handler(sender, instance, **kwargs):
+    """Bump the version of saved/deleted objects (logged or versioned models).
+
+    Args:
+        sender (Model): The model class.
+        instance (Model): The saved or deleted object.
+    """
+    if sender not in registry and sender._meta.label not in VERSIONED_MODELS:
+        return
+    content_type = ContentType.objects.get_for_model(sender)
+    bump_object_version(content_type.pk, instance.pk)
+
+
+def dependency_version_signal_handler(sender, instance, **kwargs):
+    """Bump the version of the parent of a saved/deleted dependency (opinion or stats).
+
+    Args:
+        sender (Model): The dependency model class (has a parent field).
+        instance (Model): The saved or deleted dependency.
+    """
+    parent_model = sender._meta.get_field('parent').related_model
+    content_type = ContentType.objects.get_for_model(parent_model)
+    bump_object_version(content_type.pk, instance.parent_id)
+
+
+def dependencies_changed_signal_handler(sender, instance, action, reverse, model, pk_set,
+                                        **kwargs):
+    """Bump the version of the content (or stats) whose dependencies (or opinions) changed.
+
+    Connected to m2m_changed of the content's (flat) dependencies and the stats' opinions.
+
+    Args:
+        sender (Model): The through model.
+        instance (Model): The object whose relation changed.
+        action (str): The m2m_changed action.
+        reverse (bool): True if the change was made from the other side (the pk_set are the
+            objects to bump).
+        model (Model): The model of the pk_set.
+        pk_set (set): The primary keys added or removed (None for clear).
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        bump_versions(type(instance), [instance.pk])
+    elif pk_set:
+        bump_versions(model, pk_set)
+
+
 # *******************************************************************************
 # View methods
 # *******************************************************************************
@@ -270,6 +774,167 @@ def get_page_list(num_pages, page, max_num_pages=5):
     return range(low_index, high_index)
 
 
+def get_page_etag(request, objs, *extra):
+    """Construct the ETag of a page from the versions of the objects it displays.
+
+    The pages are personalized, so the ETag also depends on the path, the user (and their
+    version) and the CSRF cookie. Pages with pending messages are always rendered, the render
+    consumes the messages.
+
+    Args:
+        request (Request): The request.
+        objs (list[tuple]): The (model, pk) pairs of the objects the page displays.
+        *extra: Other values the page depends on (e.g., dates or counts).
+
+    Returns:
+        str: The ETag or None if the page must be rendered.
+    """
+    if len(messages.get_messages(request)) > 0:
+        return None
+    user = request.user
+    objs = list(objs)
+    if user.is_authenticated:
+        objs.append((user._meta.model, user.pk))
+    content_types = ContentType.objects.get_for_models(*set(model for model, _pk in objs))
+    versions = get_object_versions(*[(content_types[model].pk, pk) for model, pk in objs])
+    parts = [request.get_full_path(), user.pk, request.COOKIES.get(settings.CSRF_COOKIE_NAME)]
+    parts += versions + list(extra)
+    return hashlib.md5('\n'.join(str(x) for x in parts).encode('utf-8')).hexdigest()
+
+
+def encode_cursor(direction, timestamp=None, pk=None):
+    """Encode an (opaque) keyset cursor.
+
+    Args:
+        direction (str): CURSOR_NEXT (older than), CURSOR_PREVIOUS (newer than) or CURSOR_LAST.
+        timestamp (datetime, optional): The timestamp of the row the page starts after.
+        pk (int, optional): The pk of the row the page starts after.
+
+    Returns:
+        str: The cursor (url safe).
+    """
+    timestamp = '' if timestamp is None else timestamp.isoformat()
+    value = f'{direction}|{timestamp}|{"" if pk is None else pk}'
+    return base64.urlsafe_b64encode(value.encode('utf-8')).decode('utf-8').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a keyset cursor (see encode_cursor).
+
+    Args:
+        cursor (str): The cursor.
+
+    Returns:
+        tuple: The direction, timestamp and pk (None if the cursor is missing or invalid).
+    """
+    if not cursor:
+        return None
+    try:
+        value = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        direction, timestamp, pk = value.split('|')
+        if direction == CURSOR_LAST:
+            return direction, None, None
+        timestamp = parse_datetime(timestamp)
+        if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or timestamp is None:
+            return None
+        return direction, timestamp, int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage():
+    """A page of a stream (newest first) that is paginated by (timestamp, pk) cursors.
+
+    Unlike a Paginator page there is no count and no offset, so deep pages cost the same as the
+    first page. The page has the urls of its neighbours instead of page numbers (see
+    include/keyset_paginator.html).
+
+    Attributes:
+        object_list (QuerySet): The page's objects (newest first).
+        has_next (bool): True if there are older objects.
+        has_previous (bool): True if there are newer objects.
+        first_url (str): The url (parameters) of the first page.
+        last_url (str): The url (parameters) of the last page.
+        next_url (str): The url (parameters) of the next page (None if there is none).
+        previous_url (str): The url (parameters) of the previous page (None if there is none).
+    """
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.first_url = None
+        self.last_url = None
+        self.next_url = None
+        self.previous_url = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def get_keyset_page(queryset, params, key='cursor', per_page=25):
+    """Retrieve a page of a stream (e.g., actions or notifications) by its cursor.
+
+    A page costs two small queries: the (timestamp, pk) keys of the page (one more is fetched to
+    check for more) and the objects.
+
+    Args:
+        queryset (QuerySet): The stream (a model with a timestamp).
+        params (Parameters): The url parameters, the cursor is read from (and added to) them.
+        key (str, optional): The cursor's parameter name. Defaults to 'cursor'.
+        per_page (int, optional): The number of objects per page. Defaults to 25.
+
+    Returns:
+        KeysetPage: The page.
+    """
+    cursor = decode_cursor(params.get_object_key_value(key))
+    direction = None if cursor is None else cursor[0]
+    if direction == CURSOR_NEXT:
+        _direction, timestamp, pk = cursor
+        keys = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, pk__lt=pk))
+    elif direction == CURSOR_PREVIOUS:
+        _direction, timestamp, pk = cursor
+        keys = queryset.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, pk__gt=pk))
+    else:
+        keys = queryset
+    ascending = direction in (CURSOR_PREVIOUS, CURSOR_LAST)
+    keys = keys.order_by(*(('timestamp', 'pk') if ascending else ('-timestamp', '-pk')))
+    keys = list(keys.values_list('timestamp', 'pk')[:per_page + 1])
+    more = len(keys) > per_page
+    keys = keys[:per_page]
+    if ascending:
+        keys.reverse()
+        page = KeysetPage(None, has_next=direction == CURSOR_PREVIOUS, has_previous=more)
+    else:
+        page = KeysetPage(None, has_next=more, has_previous=direction == CURSOR_NEXT)
+    page.object_list = queryset.filter(pk__in=[x[1] for x in keys]).order_by('-timestamp', '-pk')
+
+    # Navigation
+    def get_url(cursor):
+        x = params.get_new()
+        for k in params.keys:
+            x.add_key_value(k, params.params[k])
+        if cursor is not None:
+            x.add_key_value(key, cursor)
+        return str(x) or '?'
+
+    page.first_url = get_url(None)
+    page.last_url = get_url(encode_cursor(CURSOR_LAST))
+    if len(keys) == 0:
+        # The rows past the cursor were removed.
+        page.next_url = page.last_url if page.has_next else None
+        page.previous_url = page.first_url if page.has_previous else None
+    else:
+        if page.has_next:
+            page.next_url = get_url(encode_cursor(CURSOR_NEXT, *keys[-1]))
+        if page.has_previous:
+            page.previous_url = get_url(encode_cursor(CURSOR_PREVIOUS, *keys[0]))
+    return page
+
+
 def get_form_data(response, verbose_level=0):
     """A helper method for parsing form data from a post response.
 
@@ -333,12 +998,26 @@ class QuerySetDict():
 
     The dictionary keys can only integers or strings.
 
+    Supported lookups (for filter/exclude) are exact, in, gt, gte, lt, lte and isnull, these
+    can be combined with Q objects. Exact lookups on an indexed attribute are served from the
+    secondary index.
+
     Attributes:
         dict (dict): The container that stores the keys/objects for the query set.
         attrib_key (str): The
+        indexes (dict): Secondary indexes, attribute path -> value -> set of keys.
     """
-
-    def __init__(self, attrib_key, queryset=None):
+    LOOKUPS = {
+        'exact': lambda x, y: x == y,
+        'in': lambda x, y: x in y,
+        'gt': lambda x, y: x is not None and x > y,
+        'gte': lambda x, y: x is not None and x >= y,
+        'lt': lambda x, y: x is not None and x < y,
+        'lte': lambda x, y: x is not None and x <= y,
+        'isnull': lambda x, y: (x is None) == y,
+    }
+
+    def __init__(self, attrib_key, queryset=None, indexes=None):
         """Initializer for QuerySetDict.
 
         Args:
@@ -347,13 +1026,19 @@ class QuerySetDict():
                 we would have attrib_key = 'content.pk'.
             queryset (QuerySet, optional): A django query set that is to be convert to QuerySetDict.
                 Defaults to None.
+            indexes (list[str], optional): Attribute paths to maintain secondary indexes for,
+                e.g., 'content.content_type'. Defaults to None.
         """
         self.dict = {}
         self.dict_iter = None
         self.attrib_key = attrib_key
+        self.indexes = {}
+        if indexes is not None:
+            for index in indexes:
+                self.indexes[index] = {}
         if queryset is not None:
             for x in queryset:
-                self.dict[self.get_object_key(x)] = x
+                self.add(x)
 
     def __str__(self):
         """Outputs a list of the stored items.
@@ -404,13 +1089,65 @@ class QuerySetDict():
             raise ValueError(f'key needs to be an int or a string, not {type(key)}.')
         return key
 
+    @staticmethod
+    def get_object_value(obj, attrib_path):
+        """A getter for an attribute (path) of the object.
+
+        Args:
+            obj (Generic): The input object.
+            attrib_path (list[str]): The attributes to follow, e.g., ['content', 'content_type'].
+
+        Returns:
+            Generic: The value, None if the path is broken by a None.
+        """
+        value = obj
+        for attrib in attrib_path:
+            if value is None:
+                return None
+            value = getattr(value, attrib)
+        return value
+
     def add(self, obj):
         """Adds the object to the dictionary.
 
         Args:
             obj (Generic): The object to add to the dictionary.
         """
-        self.dict[self.get_object_key(obj)] = obj
+        key = self.get_object_key(obj)
+        if key in self.dict:
+            self._unindex(key, self.dict[key])
+        self.dict[key] = obj
+        for index, entries in self.indexes.items():
+            value = self.get_object_value(obj, index.split('.'))
+            entries.setdefault(value, set()).add(key)
+
+    def _unindex(self, key, obj):
+        """Removes the object from the secondary indexes.
+
+        Args:
+            key (int or str): The object's key.
+            obj (Generic): The object.
+        """
+        for index, entries in self.indexes.items():
+            value = self.get_object_value(obj, index.split('.'))
+            entries.get(value, set()).discard(key)
+
+    def _copy(self, keys):
+        """Create a new QuerySetDict with a subset of the objects (in the order of keys).
+
+        Args:
+            keys (list): The keys of the objects to keep.
+
+        Returns:
+            QuerySetDict: The new query set.
+        """
+        new_query_set = copy.copy(self)
+        new_query_set.dict = {}
+        new_query_set.dict_iter = None
+        new_query_set.indexes = {index: {} for index in self.indexes}
+        for key in keys:
+            new_query_set.add(self.dict[key])
+        return new_query_set
 
     def get(self, *args, **kwargs):
         """A getter for retriving data from the dict.
@@ -448,6 +1185,14 @@ class QuerySetDict():
             return self.dict[key]
         return None
 
+    def all(self):
+        """A copy of the query set.
+
+        Returns:
+            QuerySetDict: The copy.
+        """
+        return self._copy(list(self.dict))
+
     def count(self):
         """A getter for the number of objects stored in the dict.
 
@@ -456,8 +1201,145 @@ class QuerySetDict():
         """
         return len(self.dict)
 
+    def exists(self):
+        """Test if the query set is not empty.
+
+        Returns:
+            bool: True if there is at least one object.
+        """
+        return len(self.dict) > 0
+
+    def first(self):
+        """A getter for the first object.
+
+        Returns:
+            Object: The first object, None if the query set is empty.
+        """
+        for obj in self.dict.values():
+            return obj
+        return None
+
+    def _match(self, obj, name, value):
+        """Test the object against a single lookup, e.g., content__content_type__in=[10, -10].
+
+        Args:
+            obj (Generic): The object to test.
+            name (str): The lookup, attributes separated by '__' with an optional lookup type.
+            value (Generic): The value to compare against.
+
+        Returns:
+            bool: True if the object matches.
+
+        Raises:
+            ValueError: If the lookup type is not supported.
+        """
+        attrib_path = name.split('__')
+        lookup = 'exact'
+        if len(attrib_path) > 1 and attrib_path[-1] in self.LOOKUPS:
+            lookup = attrib_path.pop()
+        if attrib_path[-1] == 'id':
+            attrib_path[-1] = 'pk'
+        try:
+            attrib_value = self.get_object_value(obj, attrib_path)
+        except AttributeError as error:
+            # E.g., an unsupported lookup type (icontains) is taken for an attribute.
+            raise ValueError(f'Unsupported lookup: {name}.') from error
+        # Allow comparing models with primary keys (like django).
+        if hasattr(attrib_value, '_meta') and lookup != 'isnull':
+            attrib_value = attrib_value.pk
+            if lookup == 'in':
+                value = [x.pk if hasattr(x, '_meta') else x for x in value]
+            elif hasattr(value, '_meta'):
+                value = value.pk
+        return self.LOOKUPS[lookup](attrib_value, value)
+
+    def _match_q(self, obj, q):
+        """Test the object against a Q object.
+
+        Args:
+            obj (Generic): The object to test.
+            q (Q): The Q object.
+
+        Returns:
+            bool: True if the object matches.
+        """
+        results = []
+        for child in q.children:
+            if isinstance(child, Q):
+                results.append(self._match_q(obj, child))
+            else:
+                results.append(self._match(obj, *child))
+        if q.connector == Q.OR:
+            result = any(results)
+        else:
+            result = all(results)
+        return not result if q.negated else result
+
+    def _get_candidate_keys(self, kwargs):
+        """Use the secondary indexes to narrow down the keys for the lookups.
+
+        Args:
+            kwargs (dict): The lookups.
+
+        Returns:
+            list: The candidate keys (in the stored order).
+        """
+        keys = None
+        for name, value in kwargs.items():
+            index = name.replace('__', '.')
+            values = [value]
+            if index.endswith('.exact'):
+                index = index[:-len('.exact')]
+            elif index.endswith('.in'):
+                index = index[:-len('.in')]
+                values = value
+            if index in self.indexes:
+                try:
+                    matches = set().union(*[self.indexes[index].get(x, set()) for x in values])
+                except TypeError:
+                    continue
+                keys = matches if keys is None else keys & matches
+        if keys is None:
+            return list(self.dict)
+        return [key for key in self.dict if key in keys]
+
+    def _lookup(self, args, kwargs, negate):
+        """Select the keys of the objects that match (or don't match) the lookups.
+
+        Args:
+            args (list[Q]): The Q objects.
+            kwargs (dict): The lookups.
+            negate (bool): If true, select the objects that do not match.
+
+        Returns:
+            list: The selected keys.
+        """
+        keys = []
+        candidates = set(self._get_candidate_keys(kwargs))
+        for key, obj in self.dict.items():
+            match = key in candidates
+            if match:
+                match = all(self._match_q(obj, q) for q in args)
+                match = match and all(
+                    self._match(obj, name, value) for name, value in kwargs.items())
+            if match != negate:
+                keys.append(key)
+        return keys
+
+    def filter(self, *args, **kwargs):
+        """Filter the objects using django style lookups and Q objects.
+
+        Example: dependencies.filter(content__content_type=Content.TYPE.THEORY)
+
+        Returns:
+            QuerySetDict: A new query set with the matching objects.
+        """
+        return self._copy(self._lookup(args, kwargs, negate=False))
+
     def exclude(self, *args, **kwargs):
-        """Not implemented yet.
+        """Exclude objects using keys/references (legacy) or django style lookups and Q objects.
+
+        Example: dependencies.exclude(content) or dependencies.exclude(content__pk__in=[1, 2])
 
         Returns:
             QuerySetDict: A reference to a QuerySetDict that does not contain the excluded objects.
@@ -465,6 +1347,9 @@ class QuerySetDict():
         Raises:
             ValueError: If self.attrib_key is ill defined.
         """
+        # Django style lookups.
+        if any(isinstance(arg, Q) for arg in args) or any('__' in x for x in kwargs):
+            return self._copy(self._lookup(args, kwargs, negate=True))
         # Setup
         if '.' in self.attrib_key:
             attrib_key = self.attrib_key[self.attrib_key.find('.') + 1:]
@@ -483,12 +1368,48 @@ class QuerySetDict():
             else:
                 keys.append(self.get_object_key(arg, attrib_key))
         # Create new QuerySetDict.
-        new_query_set = copy.copy(self)
-        new_query_set.dict = copy.copy(self.dict)
-        for pk in keys:
-            new_query_set.dict.pop(pk, None)
-        # Done
-        return new_query_set
+        keys = set(keys)
+        return self._copy([key for key in self.dict if key not in keys])
+
+    def order_by(self, *fields):
+        """Sort the objects (prefix a field with '-' for descending order).
+
+        None values are sorted as the largest (like postgres), last in ascending order and first
+        in descending order.
+
+        Returns:
+            QuerySetDict: A new, sorted, query set.
+        """
+        keys = list(self.dict)
+        for field in reversed(fields):
+            reverse = field.startswith('-')
+            attrib_path = field.lstrip('-').split('__')
+            values = {x: self.get_object_value(self.dict[x], attrib_path) for x in keys}
+            keys.sort(key=lambda x: (values[x] is None, values[x]), reverse=reverse)
+        return self._copy(keys)
+
+    def values_list(self, *fields, flat=False):
+        """Extract the field values for each object.
+
+        Args:
+            *fields (str): The attributes to extract (separated by '__').
+            flat (bool, optional): If true, return single values instead of tuples.
+                Defaults to False.
+
+        Returns:
+            list: The values.
+
+        Raises:
+            TypeError: If flat is used with more than one field.
+        """
+        if flat and len(fields) > 1:
+            raise TypeError('flat is not valid with more than one field.')
+        attrib_paths = [field.split('__') for field in fields]
+        result = []
+        for obj in self.dict.values():
+            values = tuple(self.get_object_value(obj, x) for x in attrib_paths)
+            result.append(values[0] if flat else values)
+        return result
 
 
 class Parameters():
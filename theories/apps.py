@@ -22,6 +22,60 @@ class TheoriesConfig(AppConfig):
 
     def ready(self):
         from actstream import registry
+        from django.db.models.signals import m2m_changed, post_delete, post_save
+        from core.utils import (dependencies_changed_signal_handler,
+                                dependency_version_signal_handler)
+        from theories.models.statistics import (summary_action_signal_handler,
+                                                summary_content_signal_handler,
+                                                summary_follow_signal_handler,
+                                                summary_opinion_signal_handler,
+                                                summary_stats_signal_handler)
+        from theories.search import search_index_signal_handler, search_remove_signal_handler
         registry.register(self.get_model('Opinion'))
         registry.register(self.get_model('Category'))
         registry.register(self.get_model('Content'))
+
+        # Cache versions (the parents are bumped when their dependencies change).
+        content = self.get_model('Content')
+        stats = self.get_model('Stats')
+        for name, through in (('dependencies', content.dependencies.through),
+                              ('flat_dependencies', content.flat_dependencies.through),
+                              ('stats_opinions', stats.opinions.through)):
+            m2m_changed.connect(dependencies_changed_signal_handler,
+                                sender=through,
+                                dispatch_uid=f'theories_{name}_version')
+        for name in ('OpinionDependency', 'StatsDependency', 'StatsFlatDependency'):
+            model = self.get_model(name)
+            post_save.connect(dependency_version_signal_handler,
+                              sender=model,
+                              dispatch_uid=f'theories_{name}_version_save')
+            post_delete.connect(dependency_version_signal_handler,
+                                sender=model,
+                                dispatch_uid=f'theories_{name}_version_delete')
+
+        # Search index
+        for name in ('Content', 'Category'):
+            model = self.get_model(name)
+            post_save.connect(search_index_signal_handler,
+                              sender=model,
+                              dispatch_uid=f'theories_{name}_search_save')
+            post_delete.connect(search_remove_signal_handler,
+                                sender=model,
+                                dispatch_uid=f'theories_{name}_search_delete')
+
+        # Theory summaries
+        post_save.connect(summary_content_signal_handler,
+                          sender=content,
+                          dispatch_uid='theories_Content_summary_save')
+        post_save.connect(summary_stats_signal_handler,
+                          sender=stats,
+                          dispatch_uid='theories_Stats_summary_save')
+        for label, handler in (('theories.Opinion', summary_opinion_signal_handler),
+                               ('actstream.Follow', summary_follow_signal_handler),
+                               ('actstream.Action', summary_action_signal_handler)):
+            model = self.apps.get_model(label)
+            name = model.__name__
+            post_save.connect(handler, sender=model, dispatch_uid=f'theories_{name}_summary_save')
+            post_delete.connect(handler,
+                                sender=model,
+                                dispatch_uid=f'theories_{name}_summary_delete')
@@ -635,6 +635,51 @@ class OpinionDependencyForm(forms.ModelForm):
         return opinion_dependency
 
 
+class OpinionDependencyBaseFormSet(forms.BaseModelFormSet):
+    """A formset for user opinion dependencies that writes the changed rows in bulk."""
+
+    def save(self, commit=True):
+        """Save the changed dependencies (see OpinionDependency.bulk_save).
+
+        Like BaseModelFormSet.save, new_objects, changed_objects, deleted_objects and saved_forms
+        are populated and, without commit, save_m2m is added to the formset (deletion is not
+        supported).
+
+        Args:
+            commit (bool, optional): If False, the dependencies are returned unsaved.
+                Defaults to True.
+
+        Returns:
+            list[OpinionDependency]: The new and modified dependencies.
+        """
+        self.new_objects = []
+        self.changed_objects = []
+        self.deleted_objects = []
+        self.saved_forms = []
+        dependencies = []
+        for form in self.forms:
+            if not form.has_changed():
+                continue
+            dependency = form.save(commit=False)
+            if dependency.pk is None:
+                self.new_objects.append(dependency)
+            else:
+                self.changed_objects.append((dependency, form.changed_data))
+            self.saved_forms.append(form)
+            dependencies.append(dependency)
+
+        def save_m2m():
+            for form in self.saved_forms:
+                form.save_m2m()
+
+        if commit:
+            OpinionDependency.bulk_save(dependencies)
+            save_m2m()
+        else:
+            self.save_m2m = save_m2m
+        return dependencies
+
+
 class TheoryRevisionForm(forms.ModelForm):
     """Theory Revision form.
 
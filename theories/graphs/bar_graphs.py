@@ -17,6 +17,7 @@ import math
 import random
 import numpy
 
+from core.utils import timed
 from theories.graphs.shapes import Colour, Text, Rectangle, Group
 
 # *******************************************************************************
@@ -37,6 +38,7 @@ class BarGraph():
     DEFAULT_CONFIG = {'gap': 2.0, 'width': 600, 'height': 200}
     DEFAULT_BOARDER = {'top': 60, 'bottom': 75, 'left': 200, 'right': 200}
 
+    @timed('diagrams')
     def __init__(self, data, config=None, boarder=None):
         """Create a bar graph.
 
@@ -188,6 +190,7 @@ class BarGraph():
         self.shapes.append(
             Rectangle(x01 - gap / 4, y01 - 15, x01 + gap / 4, y01, colour=Colour.BLACK))
 
+    @timed('diagrams')
     def get_svg(self):
         """Output the svg code for diagram.
 
@@ -223,6 +226,7 @@ class BarGraph():
 class OpinionBarGraph(BarGraph):
     """A class for drawing opinion bar graphs."""
 
+    @timed('diagrams')
     def __init__(self, opinion):
         """Create a bar graph for visualizing the point distribution awarded to a theory.
 
@@ -306,6 +310,7 @@ class OpinionBarGraph(BarGraph):
 class OpinionComparisionBarGraph(OpinionBarGraph):
     """A class for drawing comparison bar graphs (two highlight opinions)."""
 
+    @timed('diagrams')
     def __init__(self, opinion01, opinion02):
         """Constructor for the OpinionComparisionBarGraph class.
 
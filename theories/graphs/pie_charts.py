@@ -15,6 +15,7 @@ LICENSE.md file in the root directory of this source tree.
 # *******************************************************************************
 import random
 
+from core.utils import timed
 from theories.graphs.shapes import offset_xy
 from theories.graphs.shapes import Colour, Circle, Wedge, Text, Rectangle
 from theories.models.statistics import Stats
@@ -37,6 +38,7 @@ class PieChart():
     DEFAULT_CONFIG = {'radius': 100, 'c_offset': 4, 'gap': 4, 'stroke_width': 2.0}
     DEFAULT_BOARDER = {'top': 30, 'bottom': 30, 'left': 400, 'right': 400}
 
+    @timed('diagrams')
     def __init__(self, data, config=None, boarder=None):
         """Constructor for the PieChart class.
 
@@ -227,6 +229,7 @@ class PieChart():
         if points_text is not None:
             self.shapes.append(Text(points_text, x=x, y=y + r, size=40, colour=colour, bold=True))
 
+    @timed('diagrams')
     def get_svg(self):
         """Output the svg code for the diagram.
 
@@ -264,6 +267,7 @@ class SimpleOpinionPieChart(PieChart):
     DEFAULT_CONFIG = {'radius': 100, 'c_offset': 4, 'gap': 4, 'stroke_width': 0}
     DEFAULT_BOARDER = {'top': 0, 'bottom': 0, 'left': 0, 'right': 0}
 
+    @timed('diagrams')
     def __init__(self, theory=None):
         """Constructor for the SimpleOpinionPieChart class.
 
@@ -289,6 +293,7 @@ class SimpleOpinionPieChart(PieChart):
         """Construct the diagram."""
         self.create_graph()
 
+    @timed('diagrams')
     def get_svg(self):
         """Output the svg code for the diagram.
 
@@ -316,6 +321,7 @@ class SimpleOpinionPieChart(PieChart):
 class OpinionPieChart(PieChart):
     """A sub-class for opinion pie-charts."""
 
+    @timed('diagrams')
     def __init__(self, opinion=None):
         """Constructor for the OpinionPieChart class.
 
@@ -382,6 +388,7 @@ class OpinionPieChart(PieChart):
 class OpinionComparisionPieChart(OpinionPieChart):
     """A sub-class for side-by-side pie-charts (comparisons)."""
 
+    @timed('diagrams')
     def __init__(self, opinion01, opinion02):
         """Create a side by side pie-chart for two opinions.
 
@@ -16,6 +16,7 @@ LICENSE.md file in the root directory of this source tree.
 import math
 import random
 
+from core.utils import timed
 from theories.models.opinions import OpinionDependencyBase
 from theories.graphs.shapes import Colour, Text
 from theories.graphs.spring_shapes import Direction, Ring, EvidenceShape, SubtheoryShape, Wall
@@ -39,6 +40,7 @@ class OpinionVennDiagram():
     DEFAULT_CONFIG = {'radius': 150, 'shape_area': 0.6 * 150**2}
     DEFAULT_BOARDER = {'top': 60, 'bottom': 30, 'left': 100, 'right': 100}
 
+    @timed('diagrams')
     def __init__(self, opinion, flat=False, bottom_text=None, config=None, boarder=None):
         """Create a Venn-diagram that visualizes the opinion's dependencies."""
         self.opinion = opinion
@@ -403,6 +405,7 @@ class OpinionVennDiagram():
             return output_set
         return self.outside_set
 
+    @timed('diagrams')
     def get_svg(self):
         """Output the svg code for diagram.
 
@@ -455,6 +458,7 @@ class OpinionVennDiagram():
 class OpinionComparisionVennDiagram(OpinionVennDiagram):
     """A class for drawing relative Venn-diagrams (used for comparisons)."""
 
+    @timed('diagrams')
     def __init__(self, opinion01, opinion02, flat=False, bottom_text=None):
         """Constructor for the OpinionComparisionVennDiagram class.
 
@@ -483,12 +487,17 @@ class OpinionComparisionVennDiagram(OpinionVennDiagram):
 
         # Construct a list of dependencies.
         theory = self.opinion01.content
+        # (the opinion dependencies are cached, so the lookups below are done in memory)
         if self.flat:
             dependencies = theory.get_flat_dependencies()
+            self.opinion01.get_flat_dependencies(cache=True)
+            self.opinion02.get_flat_dependencies(cache=True)
             get_dependency01 = self.opinion01.get_flat_dependency
             get_dependency02 = self.opinion02.get_flat_dependency
         else:
             dependencies = theory.get_dependencies()
+            self.opinion01.get_dependencies(cache=True)
+            self.opinion02.get_dependencies(cache=True)
             get_dependency01 = self.opinion01.get_dependency
             get_dependency02 = self.opinion02.get_dependency
 
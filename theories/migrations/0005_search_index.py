@@ -0,0 +1,83 @@
+# The search index is a vendor specific table (see theories.search), it is not a model.
+#
+# The statements are a frozen copy of the search backends (at the time of this migration), so
+# later changes to theories.search do not change this migration.
+
+from django.db import migrations
+
+SEARCH_TABLE = 'theories_search'
+SEARCH_CONFIG = 'english'
+
+# The indexed tables: (kind, table, title columns, details columns).
+SEARCH_TABLES = (
+    (0, 'theories_content', ('title01', 'title00'), ('details',)),
+    (1, 'theories_category', ('title',), ()),
+)
+
+
+def select_text(connection, columns):
+    if len(columns) == 0:
+        return "''"
+    qn = connection.ops.quote_name
+    return " || ' ' || ".join(f"COALESCE({qn(column)}, '')" for column in columns)
+
+
+def has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in [row[0] for row in cursor.fetchall()]
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    qn = connection.ops.quote_name
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+                           'kind smallint NOT NULL, '
+                           'object_id integer NOT NULL, '
+                           'document tsvector NOT NULL, '
+                           'PRIMARY KEY (kind, object_id))')
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document '
+                           f'ON {SEARCH_TABLE} USING gin (document)')
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            for kind, table, title_columns, details_columns in SEARCH_TABLES:
+                cursor.execute(
+                    f'INSERT INTO {SEARCH_TABLE} (kind, object_id, document) '
+                    f"SELECT %s, {qn('id')}, "
+                    f"setweight(to_tsvector('{SEARCH_CONFIG}', "
+                    f"{select_text(connection, title_columns)}), 'A') || "
+                    f"setweight(to_tsvector('{SEARCH_CONFIG}', "
+                    f"{select_text(connection, details_columns)}), 'B') "
+                    f'FROM {qn(table)}', [kind])
+    elif connection.vendor == 'sqlite' and has_fts5(connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING '
+                           "fts5(kind UNINDEXED, title, details, tokenize='porter unicode61')")
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            for kind, table, title_columns, details_columns in SEARCH_TABLES:
+                cursor.execute(
+                    f'INSERT INTO {SEARCH_TABLE} (rowid, kind, title, details) '
+                    f"SELECT {qn('id')} * %s + %s, %s, "
+                    f'{select_text(connection, title_columns)}, '
+                    f'{select_text(connection, details_columns)} FROM {qn(table)}',
+                    [len(SEARCH_TABLES), kind, kind])
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql' or (connection.vendor == 'sqlite' and
+                                             has_fts5(connection)):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('theories', '0004_auto_20201230_1312'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
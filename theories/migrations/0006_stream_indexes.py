@@ -0,0 +1,26 @@
+# The activity and notification streams are paginated by (timestamp, id) cursors (see
+# core.utils.get_keyset_page), the indexes let each page seek instead of scan.
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('theories', '0005_search_index'),
+        ('actstream', '0003_add_follow_flag'),
+        ('notifications', '0006_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX actstream_action_target_stream ON actstream_action '
+            '(target_content_type_id, target_object_id, timestamp, id)',
+            'DROP INDEX actstream_action_target_stream',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX notifications_notification_recipient_stream '
+            'ON notifications_notification (recipient_id, timestamp, id)',
+            'DROP INDEX notifications_notification_recipient_stream',
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 2.2.10 on 2026-10-18 22:38
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce
+import django.db.models.deletion
+
+# A frozen copy of the summary backfill (see theories.models.statistics.refresh_summaries), so
+# later changes to the models or helpers do not change this migration.
+THEORY_TYPES = (10, -10)
+POINTS_FIELDS = {
+    0: ('all_true_points', 'all_false_points'),
+    1: ('supporters_true_points', 'supporters_false_points'),
+    2: ('moderates_true_points', 'moderates_false_points'),
+    3: ('opposers_true_points', 'opposers_false_points'),
+}
+
+
+def create_summaries(apps, schema_editor):
+    using = schema_editor.connection.alias
+    Content = apps.get_model('theories', 'Content')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Opinion = apps.get_model('theories', 'Opinion')
+    Stats = apps.get_model('theories', 'Stats')
+    TheorySummary = apps.get_model('theories', 'TheorySummary')
+    Follow = apps.get_model('actstream', 'Follow')
+    Action = apps.get_model('actstream', 'Action')
+
+    # Rows
+    theories = Content.objects.using(using).filter(content_type__in=THEORY_TYPES)
+    TheorySummary.objects.using(using).bulk_create(
+        [TheorySummary(content_id=pk) for pk in theories.values_list('pk', flat=True)])
+
+    # Values
+    content_type = ContentType.objects.db_manager(using).get_for_model(Content)
+    object_id = Cast(OuterRef('pk'), output_field=models.CharField())
+    opinions = Opinion.objects.filter(content_id=OuterRef('pk'), deleted=False).order_by()
+    opinions = opinions.values('content_id').annotate(count=Count('pk'))
+    follows = Follow.objects.filter(content_type=content_type, object_id=object_id).order_by()
+    follows = follows.values('object_id').annotate(count=Count('pk'))
+    actions = Action.objects.filter(target_content_type=content_type,
+                                    target_object_id=object_id).order_by('-timestamp')
+    values = {
+        'num_opinions': Coalesce(Subquery(opinions.values('count')), 0),
+        'num_followers': Coalesce(Subquery(follows.values('count')), 0),
+        'last_activity': Subquery(actions.values('timestamp')[:1]),
+    }
+    for stats_type, (true_field, false_field) in POINTS_FIELDS.items():
+        stats = Stats.objects.filter(content_id=OuterRef('pk'), stats_type=stats_type)
+        stats = stats.annotate(total=F('total_true_points') + F('total_false_points'))
+        for field, points in ((true_field, 'total_true_points'),
+                              (false_field, 'total_false_points')):
+            percent = Case(When(total__gt=0, then=F(points) / F('total')),
+                           default=Value(0.0),
+                           output_field=models.FloatField())
+            values[field] = Coalesce(
+                Subquery(stats.annotate(percent=percent).values('percent')[:1]), Value(0.0))
+    TheorySummary.objects.using(using).update(**values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('theories', '0006_stream_indexes'),
+        ('actstream', '0003_add_follow_flag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TheorySummary',
+            fields=[
+                ('content', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='theories.Content')),
+                ('num_opinions', models.IntegerField(default=0)),
+                ('num_followers', models.IntegerField(default=0)),
+                ('all_true_points', models.FloatField(default=0.0)),
+                ('all_false_points', models.FloatField(default=0.0)),
+                ('supporters_true_points', models.FloatField(default=0.0)),
+                ('supporters_false_points', models.FloatField(default=0.0)),
+                ('moderates_true_points', models.FloatField(default=0.0)),
+                ('moderates_false_points', models.FloatField(default=0.0)),
+                ('opposers_true_points', models.FloatField(default=0.0)),
+                ('opposers_false_points', models.FloatField(default=0.0)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Theory Summary',
+                'verbose_name_plural': 'Theory Summaries',
+                'db_table': 'theories_summary',
+            },
+        ),
+        migrations.RunPython(create_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# The theories and evidence are indexed as separate kinds (see theories.search), the index is
+# rebuilt with the new kinds (and the SQLite rowids, which encode the number of kinds).
+#
+# The statements are a frozen copy of the search backends (at the time of this migration), so
+# later changes to theories.search do not change this migration.
+
+from django.db import migrations
+
+SEARCH_TABLE = 'theories_search'
+SEARCH_CONFIG = 'english'
+
+# The indexed kinds: (kind, table, title columns, details columns, where).
+THEORY_TYPES = '(10, -10)'
+SEARCH_TABLES = (
+    (0, 'theories_content', ('title01', 'title00'), ('details',),
+     f'content_type IN {THEORY_TYPES}'),
+    (1, 'theories_category', ('title',), (), None),
+    (2, 'theories_content', ('title01', 'title00'), ('details',),
+     f'content_type NOT IN {THEORY_TYPES}'),
+)
+
+# The kinds of 0005_search_index (theories and evidence are one kind).
+PREVIOUS_SEARCH_TABLES = (
+    (0, 'theories_content', ('title01', 'title00'), ('details',), None),
+    (1, 'theories_category', ('title',), (), None),
+)
+
+
+def select_text(connection, columns):
+    if len(columns) == 0:
+        return "''"
+    qn = connection.ops.quote_name
+    return " || ' ' || ".join(f"COALESCE({qn(column)}, '')" for column in columns)
+
+
+def has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in [row[0] for row in cursor.fetchall()]
+
+
+def rebuild_search_index(connection, search_tables):
+    qn = connection.ops.quote_name
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            for kind, table, title_columns, details_columns, where in search_tables:
+                cursor.execute(
+                    f'INSERT INTO {SEARCH_TABLE} (kind, object_id, document) '
+                    f"SELECT %s, {qn('id')}, "
+                    f"setweight(to_tsvector('{SEARCH_CONFIG}', "
+                    f"{select_text(connection, title_columns)}), 'A') || "
+                    f"setweight(to_tsvector('{SEARCH_CONFIG}', "
+                    f"{select_text(connection, details_columns)}), 'B') "
+                    f'FROM {qn(table)}' + (f' WHERE {where}' if where else ''), [kind])
+    elif connection.vendor == 'sqlite' and has_fts5(connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            for kind, table, title_columns, details_columns, where in search_tables:
+                cursor.execute(
+                    f'INSERT INTO {SEARCH_TABLE} (rowid, kind, title, details) '
+                    f"SELECT {qn('id')} * %s + %s, %s, "
+                    f'{select_text(connection, title_columns)}, '
+                    f'{select_text(connection, details_columns)} FROM {qn(table)}' +
+                    (f' WHERE {where}' if where else ''), [len(search_tables), kind, kind])
+
+
+def split_kinds(apps, schema_editor):
+    rebuild_search_index(schema_editor.connection, SEARCH_TABLES)
+
+
+def merge_kinds(apps, schema_editor):
+    rebuild_search_index(schema_editor.connection, PREVIOUS_SEARCH_TABLES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('theories', '0007_theory_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_kinds, merge_kinds),
+    ]
@@ -15,13 +15,16 @@ LICENSE.md file in the root directory of this source tree.
 # *******************************************************************************
 import logging
 
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Q, Value, When
 from django.urls import reverse
 from notifications.signals import notify
 
-from core.utils import get_or_none, notify_if_unique
+from core.utils import bulk_notify, bump_versions, clear_identity_map, notify_if_unique
+from theories.models.content import Content
 from theories.models.opinions import Opinion, OpinionDependency
-from theories.models.statistics import Stats
+from theories.models.statistics import (Stats, StatsDependency, StatsFlatDependency,
+                                        TheorySummary, update_summaries)
 from users.models import User
 
 # *******************************************************************************
@@ -29,6 +32,7 @@ from users.models import User
 # *******************************************************************************
 DEBUG = False
 LOGGER = logging.getLogger('django')
+COPIED_OPINION_FIELDS = ('true_input', 'false_input', 'force', 'true_total', 'false_total', 'rank')
 
 # *******************************************************************************
 # Models
@@ -67,31 +71,30 @@ def merge_content(content01, content02, user=None):
     # Parents
     for parent in content02.parents.filter(~Q(pk=content01.pk)):
         parent.add_dependency(content01)
-    # Opinion dependencies
-    changed_theories = []
-    for opinion_dependency02 in content02.opinion_dependencies.all():
-        opinion = opinion_dependency02.parent
-        opinion_dependency01 = get_or_none(opinion.get_dependencies(), content=content01)
-        if opinion_dependency01 is None:
-            Stats.remove(opinion, cache=True, save=False)
-            opinion_dependency02.content = content01
-            opinion_dependency02.save()
-            Stats.add(opinion, cache=True, save=False)
-            changed_theories.append(opinion.content)
-        else:
-            # notifications
-            log = {}
-            log['sender'] = user
-            log['recipient'] = opinion.user
-            log['verb'] = '<# object.url "{{ object }}" has gone through a merge that affects your opinion. #>'
-            log['description'] = 'We apologize for the inconvenience. Please review your <# target.url opinion #> and adjust as necessary.'
-            log['action_object'] = content01
-            log['target'] = opinion
-            log['level'] = 'warning'
-            notify_if_unique(opinion.user, log)
-    # Save changes
-    for theory in changed_theories:
-        theory.save_stats()
+    # Opinion dependencies (re-point the rows without a conflict in one query)
+    conflicts = OpinionDependency.objects.filter(content=content01).values('parent')
+    moved = content02.opinion_dependencies.exclude(parent__in=conflicts)
+    moved_parents = list(moved.values_list('parent', 'parent__content'))
+    changed_theories = Content.objects.filter(pk__in=set(x[1] for x in moved_parents))
+    moved.update(content=content01)
+    bump_versions(Opinion, [x[0] for x in moved_parents])
+    clear_identity_map(Opinion)
+    # Opinion dependencies (the remaining rows conflict, notify the owners once per opinion)
+    opinions = Opinion.objects.filter(dependencies__content=content02).select_related('user')
+    for opinion in opinions.distinct():
+        log = {}
+        log['sender'] = user
+        log['recipient'] = opinion.user
+        log['verb'] = '<# object.url "{{ object }}" has gone through a merge that affects your opinion. #>'
+        log['description'] = 'We apologize for the inconvenience. Please review your <# target.url opinion #> and adjust as necessary.'
+        log['action_object'] = content01
+        log['target'] = opinion
+        log['level'] = 'warning'
+        notify_if_unique(opinion.user, log)
+    # Stats (recalculate the affected theories)
+    with transaction.atomic():
+        for theory in changed_theories:
+            Stats.recalculate(theory)
     # Delete
     content02.delete(user)
     return True
@@ -107,7 +110,6 @@ def swap_true_false(content, user=None):
         [type]: [description]
 
     Todo:
-        * Improve stats calculation.
         * Add assert.
     """
     # Error checking
@@ -119,22 +121,43 @@ def swap_true_false(content, user=None):
     # Theory dependency
     content.title00, content.title01 = content.title01, content.title00
     content.save()
-    # Opinions
-    verb = """<# object.url The theory, "{{ object }}" has had its true and false titles swapped. #>"""
-    for opinion in content.get_opinions():
-        opinion.swap_true_false()
-        notify.send(
-            sender=user,
-            recipient=opinion.user,
-            verb=verb,
-            description='This should not effect your <# target.url opinion #> in anyway.',
-            action_object=content,
-            target=opinion,
-            level='warning',
-        )
+    # Opinions (the columns are exchanged with F(), one update per table)
+    content.opinions.update(true_input=F('false_input'),
+                            false_input=F('true_input'),
+                            true_total=F('false_total'),
+                            false_total=F('true_total'))
+    OpinionDependency.objects.filter(parent__content=content).update(tt_input=F('tf_input'),
+                                                                     tf_input=F('tt_input'),
+                                                                     ft_input=F('ff_input'),
+                                                                     ff_input=F('ft_input'))
     # Stats
-    for stats in Stats.get(content):
-        stats.swap_true_false()
+    swapped_points = {
+        'total_true_points': F('total_false_points'),
+        'total_false_points': F('total_true_points'),
+    }
+    content.stats.update(**swapped_points)
+    StatsDependency.objects.filter(parent__content=content).update(**swapped_points)
+    StatsFlatDependency.objects.filter(parent__content=content).update(**swapped_points)
+    # Summary (the stats update bypasses the signals)
+    update_summaries([content.pk],
+                     fields=[x for fields in TheorySummary.POINTS_FIELDS.values() for x in fields])
+    # Cache versions and the identity map (the updates bypass the signals)
+    clear_identity_map(Opinion)
+    clear_identity_map(Stats)
+    opinions = list(content.get_opinions().select_related('user'))
+    bump_versions(Opinion, [x.pk for x in opinions])
+    bump_versions(Stats, content.stats.values_list('pk', flat=True))
+    # Notifications (one insert)
+    verb = """<# object.url The theory, "{{ object }}" has had its true and false titles swapped. #>"""
+    bulk_notify([{
+        'sender': user,
+        'recipient': opinion.user,
+        'verb': verb,
+        'description': 'This should not effect your <# target.url opinion #> in anyway.',
+        'action_object': content,
+        'target': opinion,
+        'level': 'warning',
+    } for opinion in opinions])
     return True
 
 
@@ -266,56 +289,151 @@ def get_compare_url(opinion01, opinion02=None):
 
 
 def copy_opinion(opinion, user, recursive=False, path=None, verbose_level=0):
-    """Copy opinion to user's opinion"""
+    """Copy opinion to user's opinion (and optionally, the owner's sub-theory opinions).
+
+    The opinion tree is collected up front (one query per level), the opinions and dependencies
+    are written in bulk, and the stats of the affected theories are updated in one batched pass.
+
+    Args:
+        opinion (Opinion): The opinion to copy.
+        user (User): The user that receives the copy.
+        recursive (bool, optional): If True, the owner's opinions of the sub-theories are copied
+            as well (all the way down). Defaults to False.
+        path (list[int], optional): The theory primary keys to skip. Defaults to None.
+        verbose_level (int, optional): The debug level. Defaults to 0.
+
+    Returns:
+        Opinion: The user's copy of the opinion.
+    """
     # Debug
     if verbose_level > 0:
         print("opinion.copy()")
 
-    # setup
-    if path is None:
-        path = []
-    path.append(opinion.content.pk)
-    theory = opinion.content
-
-    # delete existing opinion
-    user_opinion = get_or_none(theory.get_opinions(), user=user)
-    if user_opinion is not None:
+    # copying onto itself is a no-op
+    if opinion.user == user:
+        return opinion
+
+    # collect the opinion tree
+    visited = set(path or []) | {opinion.content.pk}
+    sources = [opinion]
+    level = [opinion]
+    while recursive and len(level) > 0:
+        subtheory_pks = OpinionDependency.objects.filter(
+            parent__in=level,
+            content__content_type__in=[Content.TYPE.THEORY, -Content.TYPE.THEORY],
+        ).exclude(content__in=visited).values('content')
+        level = list(
+            Opinion.objects.filter(user=opinion.user, content__in=subtheory_pks,
+                                   deleted=False).select_related('content'))
+        visited.update(x.content.pk for x in level)
+        sources += level
+    theories = {x.content.pk: x.content for x in sources}
+
+    # remove the existing opinions from the stats (before they are overwritten)
+    user_opinions = {}
+    for user_opinion in Opinion.objects.filter(user=user, content__in=theories.keys()):
+        user_opinion.content = theories[user_opinion.content_id]
         Stats.remove(user_opinion, cache=True, save=False)
-        user_opinion.delete()
-
-    # new opinion
-    user_opinion, _created = theory.opinions.get_or_create(user=user)
-    user_opinion.true_input = opinion.true_input
-    user_opinion.false_input = opinion.false_input
-    user_opinion.force = opinion.force
-    user_opinion.save()
-
-    # populate dependencies
-    for opinion_dependency in opinion.get_dependencies():
-        OpinionDependency.objects.get_or_create(
-            parent=user_opinion,
-            content=opinion_dependency.content,
-            tt_input=opinion_dependency.tt_input,
-            tf_input=opinion_dependency.tf_input,
-            ft_input=opinion_dependency.ft_input,
-            ff_input=opinion_dependency.ff_input,
-        )
-
-    # points
-    user_opinion.update_points()
-
-    # recursive
-    if recursive:
-        for subtheory in opinion.get_theory_subtheories():
-            root_opinion = subtheory.get_root()
-            if root_opinion is not None and root_opinion.content.pk not in path:
-                copy_opinion(root_opinion, user, recursive=True)
-
-    # stats
-    Stats.add(user_opinion, cache=True, save=False)
-    Stats.save(user_opinion)
+        user_opinions[user_opinion.content_id] = user_opinion
+
+    with transaction.atomic():
+        # opinions
+        OpinionDependency.objects.filter(parent__in=user_opinions.values()).delete()
+        created = []
+        for source in sources:
+            user_opinion = user_opinions.get(source.content.pk)
+            if user_opinion is None:
+                user_opinion = Opinion(user=user, content=source.content)
+                created.append(user_opinion)
+            for field_name in COPIED_OPINION_FIELDS:
+                setattr(user_opinion, field_name, getattr(source, field_name))
+            user_opinion.deleted = False
+            user_opinion.saved_dependencies = None
+            user_opinion.saved_flat_dependencies = None
+            user_opinions[source.content.pk] = user_opinion
+        Opinion.objects.bulk_create(created)
+        Opinion.objects.bulk_update([x for x in user_opinions.values() if x.pk is not None],
+                                    COPIED_OPINION_FIELDS + ('deleted',))
+        if any(x.pk is None for x in created):
+            # Not all backends return the primary keys from a bulk insert.
+            pks = dict(
+                Opinion.objects.filter(user=user, content__in=[x.content for x in created
+                                                               ]).values_list('content', 'pk'))
+            for user_opinion in created:
+                user_opinion.pk = pks[user_opinion.content.pk]
+
+        # dependencies
+        user_opinion_pks = {x.pk: user_opinions[x.content.pk].pk for x in sources}
+        OpinionDependency.objects.bulk_create([
+            OpinionDependency(parent_id=user_opinion_pks[x.parent_id],
+                              content_id=x.content_id,
+                              tt_input=x.tt_input,
+                              tf_input=x.tf_input,
+                              ft_input=x.ft_input,
+                              ff_input=x.ff_input,
+                              rank=x.rank)
+            for x in OpinionDependency.objects.filter(parent__in=sources)
+        ])
+        # The bulk writes bypass the signals, drop the stale opinions (e.g., the sub-theory
+        # opinions that were looked up as missing by Stats.remove).
+        clear_identity_map(Opinion)
+
+        # stats
+        for source in sources:
+            Stats.add(user_opinions[source.content.pk], cache=True, save=False)
+    bump_versions(Opinion, [x.pk for x in user_opinions.values()])
+    # The opinions were bulk saved (no signals).
+    update_summaries(theories.keys(), fields=['num_opinions'])
+
+    # utilization
+    dependency_pks = Content.dependencies.through.objects.filter(
+        from_content__in=theories.keys()).values_list('to_content', flat=True)
+    update_utilization(user, list(theories.keys()) + list(dependency_pks))
 
     # Debug
     if verbose_level > 0:
         print("opinion.copy()")
-    return user_opinion
+    return user_opinions[opinion.content.pk]
+
+
+def update_utilization(user, contents):
+    """Synchronize the user's utilized set and the content utilization counters.
+
+    The before set comes from the user's utilized relation and the after set from the user's
+    opinions (two queries total), the net changes are applied with a single F() update.
+
+    Args:
+        user (User): The user that modified their opinion(s).
+        contents (list[Content or int]): The touched content (or primary keys).
+
+    Returns:
+        tuple(set, set): The primary keys of the content added to and removed from the user's
+            utilized set.
+    """
+    content_pks = set(x if isinstance(x, int) else x.pk for x in contents)
+    if len(content_pks) == 0:
+        return set(), set()
+    before = set(user.utilized.filter(pk__in=content_pks).values_list('pk', flat=True))
+    opinions = Opinion.objects.filter(content=OuterRef('pk'), user=user, deleted=False)
+    dependencies = OpinionDependency.objects.filter(content=OuterRef('pk'),
+                                                    parent__user=user,
+                                                    parent__deleted=False)
+    after = Content.objects.filter(pk__in=content_pks).annotate(
+        has_opinion=Exists(opinions),
+        has_dependency=Exists(dependencies),
+    ).filter(Q(has_opinion=True) | Q(has_dependency=True))
+    after = set(after.values_list('pk', flat=True))
+    added = after - before
+    removed = before - after
+    if len(added) > 0:
+        user.utilized.add(*added)
+    if len(removed) > 0:
+        user.utilized.remove(*removed)
+    if len(added) > 0 or len(removed) > 0:
+        Content.objects.filter(pk__in=added | removed).update(utilization=F('utilization') + Case(
+            When(pk__in=added, then=Value(1)),
+            default=Value(-1),
+            output_field=IntegerField(),
+        ))
+        clear_identity_map(Content)
+    return added, removed
@@ -22,6 +22,7 @@ from core.utils import QuerySetDict
 # *******************************************************************************
 DEBUG = False
 LOGGER = logging.getLogger('django')
+DEPENDENCY_INDEXES = ('content.content_type',)
 
 # *******************************************************************************
 # Models
@@ -95,17 +96,31 @@ class SavedDependencies():
     saved_dependencies = None
     saved_flat_dependencies = None
 
+    @staticmethod
+    def dependencies_to_dict(dependencies=None):
+        """Convert a query set of dependencies to a QuerySetDict (keyed and indexed by content).
+
+        Args:
+            dependencies (QuerySet, optional): The dependencies. Defaults to None (empty).
+
+        Returns:
+            QuerySetDict: The dependencies.
+        """
+        if dependencies is not None:
+            dependencies = dependencies.select_related('content')
+        return QuerySetDict('content.pk', dependencies, indexes=DEPENDENCY_INDEXES)
+
     def save_dependencies(self, dependencies=None):
         # Grab and save entire query set.
         if dependencies is None:
-            dependencies = QuerySetDict('content.pk')
+            dependencies = self.dependencies_to_dict()
         list(dependencies)
         self.saved_dependencies = dependencies
 
     def save_flat_dependencies(self, flat_dependencies=None):
         # Grab and save entire query set.
         if flat_dependencies is None:
-            flat_dependencies = QuerySetDict('content.pk')
+            flat_dependencies = self.dependencies_to_dict()
         list(flat_dependencies)
         self.saved_flat_dependencies = flat_dependencies
 
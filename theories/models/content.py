@@ -31,7 +31,7 @@ from model_utils import Choices
 from notifications.signals import notify
 from reversion.models import Version
 
-from core.utils import notify_if_unique, stream_if_unique
+from core.utils import clear_identity_map, notify_if_unique, stream_if_unique
 from theories.models.abstract import SavedDependencies, SavedOpinions
 from users.models import User, Violation
 
@@ -732,10 +732,15 @@ class Content(SavedOpinions, SavedDependencies, models.Model):
         return Version.objects.get_for_object(self)
 
     def get_utilization(self, user=None):
-        return 0  # TODO
-        if user is None:
-            return self.users.exclude(user=user).count()
-        return self.users.count()
+        """Return the number of users (other than user) that utilize this content.
+
+        The count is maintained by theories.model_utils.update_utilization.
+        """
+        if user is None or not user.is_authenticated:
+            return self.utilization
+        if self.users.filter(pk=user.pk).exists():
+            return self.utilization - 1
+        return self.utilization
 
     def update_hits(self, request):
         hit_count = HitCount.objects.get_for_object(self)
@@ -744,7 +749,9 @@ class Content(SavedOpinions, SavedDependencies, models.Model):
             hit_count.refresh_from_db()
             self.rank = 100 * self.get_opinions().count() + 10 * \
                 self.opinion_dependencies.count() + hit_count.hits
-            self.save()
+            # Only the rank, a hit does not modify the content (see get_versioned_key).
+            Content.objects.filter(pk=self.pk).update(rank=self.rank)
+            clear_identity_map(Content)
 
     def update_activity_logs(self, user, verb, action_object=None, path=None):
         """Update activity log."""
@@ -18,12 +18,14 @@ import logging
 
 from actstream.models import followers
 from django.db import models
-from django.db.models import Q
+from django.db.models import ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from hitcount.models import HitCount
 from hitcount.views import HitCountMixin
 
-from core.utils import QuerySetDict, get_or_none, notify_if_unique, stream_if_unique
+from core.utils import (QuerySetDict, bump_versions, clear_identity_map, get_or_none,
+                        notify_if_unique, stream_if_unique)
 from theories.models.content import Content
 from theories.models.abstract import ContentPointer, SavedDependencies, SavedPoints
 from users.models import User
@@ -106,7 +108,7 @@ class OpinionBase(ContentPointer, SavedDependencies, SavedPoints):
                 if isinstance(saved_dependencies, QuerySetDict):
                     saved_dependencies.add(dependency)
                 else:
-                    self.save_dependencies(self.dependencies.all())
+                    self.save_dependencies(self.dependencies_to_dict(self.dependencies.all()))
         return dependency
 
     def get_dependencies(self, cache=False):
@@ -117,6 +119,7 @@ class OpinionBase(ContentPointer, SavedDependencies, SavedPoints):
             if self.dependencies is not None:
                 dependencies = self.dependencies.all()
             if cache:
+                dependencies = self.dependencies_to_dict(dependencies)
                 self.save_dependencies(dependencies)
         return dependencies
 
@@ -140,7 +143,8 @@ class OpinionBase(ContentPointer, SavedDependencies, SavedPoints):
                 if isinstance(saved_flat_dependencies, QuerySetDict):
                     saved_flat_dependencies.add(dependency)
                 else:
-                    self.save_flat_dependencies(self.flat_dependencies.all())
+                    self.save_flat_dependencies(
+                        self.dependencies_to_dict(self.flat_dependencies.all()))
         return dependency
 
     def get_flat_dependencies(self, cache=False, verbose_level=0):
@@ -150,6 +154,7 @@ class OpinionBase(ContentPointer, SavedDependencies, SavedPoints):
         if flat_dependencies is None and self.flat_dependencies is not None:
             flat_dependencies = self.flat_dependencies.all()
             if cache:
+                flat_dependencies = self.dependencies_to_dict(flat_dependencies)
                 self.save_flat_dependencies(flat_dependencies)
         if verbose_level >= 999:
             print('get_flat_dependencies:', flat_dependencies)
@@ -172,7 +177,7 @@ class OpinionBase(ContentPointer, SavedDependencies, SavedPoints):
             'false_facts': 0.0,
             'false_other': 0.0
         }
-        for evidence in self.get_flat_dependencies():
+        for evidence in self.get_flat_dependencies(cache=True):
             if evidence.is_verifiable():
                 distribution['true_facts'] += evidence.true_points()
                 distribution['false_facts'] += evidence.false_points()
@@ -203,6 +208,10 @@ class Opinion(OpinionBase, models.Model):
     Todo:
         * Remove all auto_now and auto_now_add.
     """
+    # Variables
+    saved_deleted = None
+
+    # Model Variables
     user = models.ForeignKey(User, related_name='opinions', on_delete=models.CASCADE)
     content = models.ForeignKey(Content, related_name='opinions', on_delete=models.CASCADE)
     pub_date = models.DateField(auto_now_add=True)
@@ -234,6 +243,14 @@ class Opinion(OpinionBase, models.Model):
         verbose_name_plural = 'Opinions'
         unique_together = (('content', 'user'),)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the deleted flag as loaded (see summary_opinion_signal_handler)."""
+        instance = super().from_db(db, field_names, values)
+        if 'deleted' in field_names:
+            instance.saved_deleted = instance.deleted
+        return instance
+
     def __str__(self):
         """String method for Opinion."""
         if self.is_true():
@@ -298,7 +315,7 @@ class Opinion(OpinionBase, models.Model):
 
     def cache(self):
         """Save opinion dependencies."""
-        self.save_dependencies(self.get_dependencies())
+        self.get_dependencies(cache=True)
 
     def get_flat_dependencies(self, cache=True, verbose_level=0):
         """Return a list of non-db objects representing the flattened opinion.
@@ -317,7 +334,7 @@ class Opinion(OpinionBase, models.Model):
         if flat_dependencies is None:
 
             # Initialize a set of flattened opinion_dependencies
-            flat_dependencies = QuerySetDict('content.pk')
+            flat_dependencies = self.dependencies_to_dict()
             self.save_flat_dependencies(flat_dependencies)
 
             # Get the intuition node.
@@ -452,23 +469,20 @@ class Opinion(OpinionBase, models.Model):
         if verbose_level > 0:
             print("update_points()")
 
-        # count total points
-        self.true_total = 0.0
-        self.false_total = 0.0
+        # count total points (one aggregate)
+        totals = self.dependencies.aggregate(
+            true_total=Coalesce(Sum(F('tt_input') + F('ft_input')), 0),
+            false_total=Coalesce(Sum(F('tf_input') + F('ff_input')), 0),
+        )
+        self.true_total = totals['true_total']
+        self.false_total = totals['false_total']
         self.deleted = False
-        for dependency in self.get_dependencies():
-            true_input = dependency.tt_input + dependency.ft_input
-            false_input = dependency.tf_input + dependency.ff_input
-            self.true_total += true_input
-            self.false_total += false_input
-            if true_input == 0 and false_input == 0:
-                dependency.delete()
-                # Debug
-                if verbose_level >= 10:
-                    print("  delete: %s" % dependency)
-            elif verbose_level >= 10:
-                print("  %s: true_input = %d, false_input = %d" %
-                      (dependency, true_input, false_input))
+
+        # delete the empty dependencies (one query, intuition is re-used below)
+        intuition_content = self.content.get_intuition()
+        empty_dependencies = self.dependencies.filter(tt_input=0, tf_input=0, ft_input=0,
+                                                      ff_input=0)
+        empty_dependencies.exclude(content=intuition_content).delete()
 
         # Debug
         if verbose_level > 0:
@@ -477,7 +491,7 @@ class Opinion(OpinionBase, models.Model):
 
         # intuition
         save_intuition = False
-        intuition = self.get_intuition()
+        intuition, _created = self.dependencies.get_or_create(content=intuition_content)
         if self.true_input > 0 and self.true_total == 0:
             intuition.tt_input = self.true_input
             self.true_total += self.true_input
@@ -487,10 +501,22 @@ class Opinion(OpinionBase, models.Model):
             self.false_total += self.false_input
             save_intuition = True
         if save_intuition:
-            self.content.add_dependency(self.content.get_intuition())
+            self.content.add_dependency(intuition_content)
             intuition.save()
         self.save()
 
+        # update ranks (one query, see OpinionDependency.true_points)
+        true_factor = self.true_points() / self.true_total if self.true_total > 0 else 0.0
+        false_factor = self.false_points() / self.false_total if self.false_total > 0 else 0.0
+        self.dependencies.update(rank=ExpressionWrapper(
+            (F('tt_input') + F('ft_input')) * Value(true_factor) +
+            (F('tf_input') + F('ff_input')) * Value(false_factor),
+            output_field=models.FloatField()))
+
+        # reset cache
+        self.saved_dependencies = None
+        self.saved_flat_dependencies = None
+
     def true_points(self):
         """Return the total true points for opinion."""
         if self.force:
@@ -535,7 +561,9 @@ class Opinion(OpinionBase, models.Model):
         if hit_count_response.hit_counted:
             hit_count.refresh_from_db()
             self.rank = hit_count.hits
-            self.save()
+            # Only the rank, a hit does not modify the opinion (see get_versioned_key).
+            Opinion.objects.filter(pk=self.pk).update(rank=self.rank)
+            clear_identity_map(Opinion)
 
     # ToDo: activate when opinion is modified by system
     def update_activity_logs(self, user, verb='Modified', action_object=None):
@@ -633,6 +661,8 @@ class OpinionDependency(OpinionDependencyBase, models.Model):
     ff_input = models.SmallIntegerField(default=0)
     rank = models.FloatField(default=0.0)
 
+    INPUT_FIELDS = ('tt_input', 'tf_input', 'ft_input', 'ff_input')
+
     # Cache attributes
     saved_root_opinion = None
 
@@ -657,6 +687,27 @@ class OpinionDependency(OpinionDependencyBase, models.Model):
         self.rank = self.total_points()
         return super().save(*args, **kwargs)
 
+    @classmethod
+    def bulk_save(cls, dependencies):
+        """Insert and update the opinion dependencies (at most two queries).
+
+        The ranks are not updated, follow up with Opinion.update_points.
+
+        Args:
+            dependencies (list[OpinionDependency]): The new and modified dependencies.
+        """
+        for dependency in dependencies:
+            # Refresh parent_id (the parent may have been saved after the assignment).
+            dependency.parent = dependency.parent
+        created = [x for x in dependencies if x.pk is None]
+        updated = [x for x in dependencies if x.pk is not None]
+        if len(created) > 0:
+            cls.objects.bulk_create(created)
+        if len(updated) > 0:
+            cls.objects.bulk_update(updated, cls.INPUT_FIELDS)
+        bump_versions(Opinion, [x.parent_id for x in dependencies])
+        clear_identity_map(Opinion)
+
     def get_absolute_url(self):
         """Return a url pointing to the user's opinion of content (not opinion_dependency)."""
         opinion_root = self.get_root()
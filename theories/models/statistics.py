@@ -15,7 +15,11 @@ LICENSE.md file in the root directory of this source tree.
 # *******************************************************************************
 import logging
 
-from django.db import models
+from django.apps import apps as global_apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import DEFAULT_DB_ALIAS, models
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce
 from django.urls import reverse
 from model_utils import Choices
 
@@ -230,8 +234,8 @@ class Stats(OpinionBase, models.Model):
             self.save_dependencies()
             self.save_flat_dependencies()
         else:
-            self.save_dependencies(self.get_dependencies())
-            self.save_flat_dependencies(self.get_flat_dependencies())
+            self.get_dependencies(cache=True)
+            self.get_flat_dependencies(cache=True)
 
     def get_slug(self):
         """Return the slug used for urls to reference this object."""
@@ -586,3 +590,223 @@ class StatsFlatDependency(StatsDependencyBase):
         db_table = 'theories_stats_flat_dependency'
         verbose_name = 'Stats Flat Dependency'
         verbose_name_plural = 'Stats Flat Dependencys'
+
+
+class TheorySummary(models.Model):
+    """A denormalized summary of a theory for the index listings (one row per theory).
+
+    The summary is kept up to date by signals (see theories.apps), the bulk paths (e.g.,
+    generate_dataset and import_data) that bypass the signals call refresh_summaries.
+    """
+
+    # Defines
+    POINTS_FIELDS = {
+        stats_type: (f'{slug}_true_points', f'{slug}_false_points')
+        for stats_type, slug in ((Stats.TYPE.ALL, 'all'), (Stats.TYPE.SUPPORTERS, 'supporters'),
+                                 (Stats.TYPE.MODERATES, 'moderates'),
+                                 (Stats.TYPE.OPPOSERS, 'opposers'))
+    }
+
+    # Model Variables
+    content = models.OneToOneField(Content,
+                                   related_name='summary',
+                                   on_delete=models.CASCADE,
+                                   primary_key=True)
+    num_opinions = models.IntegerField(default=0)
+    num_followers = models.IntegerField(default=0)
+    all_true_points = models.FloatField(default=0.0)
+    all_false_points = models.FloatField(default=0.0)
+    supporters_true_points = models.FloatField(default=0.0)
+    supporters_false_points = models.FloatField(default=0.0)
+    moderates_true_points = models.FloatField(default=0.0)
+    moderates_false_points = models.FloatField(default=0.0)
+    opposers_true_points = models.FloatField(default=0.0)
+    opposers_false_points = models.FloatField(default=0.0)
+    last_activity = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        """Where the model options are defined.
+
+        Model metadata is “anything that’s not a field”, such as ordering options (ordering),
+        database table name (db_table), or human-readable singular and plural names
+        (verbose_name and verbose_name_plural). None are required, and adding class Meta to a
+        model is completely optional.
+
+        For more, see: https://docs.djangoproject.com/en/3.0/ref/models/options/
+        """
+        db_table = 'theories_summary'
+        verbose_name = 'Theory Summary'
+        verbose_name_plural = 'Theory Summaries'
+
+    def __str__(self):
+        """Return the theory's title."""
+        return self.content.__str__()
+
+
+# *******************************************************************************
+# Methods
+# *******************************************************************************
+
+
+def get_summary_expressions(fields=None, apps=global_apps):
+    """The (correlated subquery) expressions that recompute the summary fields.
+
+    Args:
+        fields (list[str], optional): The summary fields (default all).
+        apps (Apps, optional): The app registry (the historical registry for migrations).
+
+    Returns:
+        dict: The field -> expression (for TheorySummary.objects.update).
+    """
+    content_type = apps.get_model('contenttypes', 'ContentType').objects.get_for_model(
+        apps.get_model('theories', 'Content'))
+    object_id = Cast(OuterRef('pk'), output_field=models.CharField())
+    expressions = {}
+
+    # Opinions
+    opinions = apps.get_model('theories', 'Opinion').objects.filter(content_id=OuterRef('pk'),
+                                                                    deleted=False)
+    opinions = opinions.order_by().values('content_id').annotate(count=Count('pk'))
+    expressions['num_opinions'] = Coalesce(Subquery(opinions.values('count')), 0)
+
+    # Followers
+    follows = apps.get_model('actstream', 'Follow').objects.filter(content_type=content_type,
+                                                                  object_id=object_id)
+    follows = follows.order_by().values('object_id').annotate(count=Count('pk'))
+    expressions['num_followers'] = Coalesce(Subquery(follows.values('count')), 0)
+
+    # Points (a percentage of the total, see Stats.true_points)
+    for stats_type, (true_field, false_field) in TheorySummary.POINTS_FIELDS.items():
+        stats = apps.get_model('theories', 'Stats').objects.filter(content_id=OuterRef('pk'),
+                                                                  stats_type=stats_type)
+        stats = stats.annotate(total=F('total_true_points') + F('total_false_points'))
+        for field, points in ((true_field, 'total_true_points'),
+                              (false_field, 'total_false_points')):
+            percent = Case(When(total__gt=0, then=F(points) / F('total')),
+                           default=Value(0.0),
+                           output_field=models.FloatField())
+            subquery = Subquery(stats.annotate(percent=percent).values('percent')[:1])
+            expressions[field] = Coalesce(subquery, Value(0.0))
+
+    # Activity
+    actions = apps.get_model('actstream', 'Action').objects.filter(
+        target_content_type=content_type, target_object_id=object_id)
+    expressions['last_activity'] = Subquery(
+        actions.order_by('-timestamp').values('timestamp')[:1])
+
+    if fields is None:
+        return expressions
+    return {field: expressions[field] for field in fields}
+
+
+def update_summaries(pks, fields=None, using=DEFAULT_DB_ALIAS):
+    """Recompute the summaries of theories (one query, missing summaries are skipped).
+
+    Args:
+        pks (list[int]): The theory pks.
+        fields (list[str], optional): The summary fields (default all).
+        using (str, optional): The database alias. Defaults to DEFAULT_DB_ALIAS.
+
+    Returns:
+        int: The number of summaries updated.
+    """
+    queryset = TheorySummary.objects.db_manager(using).filter(pk__in=pks)
+    return queryset.update(**get_summary_expressions(fields))
+
+
+def refresh_summaries(theories=None, apps=global_apps, using=DEFAULT_DB_ALIAS):
+    """Create the missing summaries and recompute them (e.g., after a bulk insert).
+
+    Args:
+        theories (QuerySet, optional): The theories (default all).
+        apps (Apps, optional): The app registry (the historical registry for migrations).
+        using (str, optional): The database alias. Defaults to DEFAULT_DB_ALIAS.
+    """
+    summary_model = apps.get_model('theories', 'TheorySummary')
+    if theories is None:
+        theories = apps.get_model('theories', 'Content').objects.db_manager(using).all()
+    theories = theories.filter(
+        content_type__in=[Content.TYPE.THEORY, Content.TYPE.DELETED_THEORY])
+    missing = theories.filter(summary__isnull=True).values_list('pk', flat=True)
+    summary_model.objects.db_manager(using).bulk_create(
+        [summary_model(content_id=pk) for pk in missing])
+    summary_model.objects.db_manager(using).filter(content__in=theories).update(
+        **get_summary_expressions(apps=apps))
+
+
+def summary_content_signal_handler(sender, instance, created, using, **kwargs):
+    """Create the summary of a new theory (Content post_save).
+
+    Args:
+        sender (Model): The model class.
+        instance (Content): The saved content.
+        created (bool): True if the content is new.
+        using (str): The database alias.
+    """
+    if created and instance.is_theory():
+        TheorySummary.objects.db_manager(using).create(content=instance)
+
+
+def summary_opinion_signal_handler(sender, instance, using, **kwargs):
+    """Update the number of opinions (Opinion post_save and post_delete).
+
+    Args:
+        sender (Model): The model class.
+        instance (Opinion): The saved or deleted opinion.
+        using (str): The database alias.
+    """
+    # The number only changes if the opinion is new, (un)deleted or removed.
+    if 'created' in kwargs and not kwargs['created'] and instance.saved_deleted == instance.deleted:
+        return
+    instance.saved_deleted = instance.deleted
+    if update_summaries([instance.content_id], fields=['num_opinions'], using=using) == 0:
+        refresh_summaries(Content.objects.filter(pk=instance.content_id), using=using)
+
+
+def summary_stats_signal_handler(sender, instance, using, **kwargs):
+    """Update the points of a stats type (Stats post_save).
+
+    Args:
+        sender (Model): The model class.
+        instance (Stats): The saved stats.
+        using (str): The database alias.
+    """
+    true_field, false_field = TheorySummary.POINTS_FIELDS[instance.stats_type]
+    queryset = TheorySummary.objects.db_manager(using).filter(pk=instance.content_id)
+    if queryset.update(**{
+            true_field: instance.true_points(),
+            false_field: instance.false_points()
+    }) == 0:
+        refresh_summaries(Content.objects.filter(pk=instance.content_id), using=using)
+
+
+def summary_follow_signal_handler(sender, instance, using, **kwargs):
+    """Update the number of followers (Follow post_save and post_delete).
+
+    Args:
+        sender (Model): The model class.
+        instance (Follow): The saved or deleted follow.
+        using (str): The database alias.
+    """
+    if instance.content_type_id == ContentType.objects.get_for_model(Content).id:
+        update_summaries([instance.object_id], fields=['num_followers'], using=using)
+
+
+def summary_action_signal_handler(sender, instance, using, **kwargs):
+    """Update the last activity (Action post_save and post_delete).
+
+    Args:
+        sender (Model): The model class.
+        instance (Action): The saved or deleted action.
+        using (str): The database alias.
+    """
+    if instance.target_content_type_id != ContentType.objects.get_for_model(Content).id:
+        return
+    if kwargs.get('created'):
+        # A new action is the last activity unless it is back dated.
+        queryset = TheorySummary.objects.db_manager(using).filter(pk=instance.target_object_id)
+        queryset = queryset.filter(
+            Q(last_activity__isnull=True) | Q(last_activity__lt=instance.timestamp))
+        queryset.update(last_activity=instance.timestamp)
+    else:
+        update_summaries([instance.target_object_id], fields=['last_activity'], using=using)
@@ -18,6 +18,7 @@ from reversion.models import Version
 
 from theories.models.content import Content
 from theories.models.opinions import Opinion
+from users.utils import has_level
 
 # *******************************************************************************
 # Predicates
@@ -25,11 +26,11 @@ from theories.models.opinions import Opinion
 #   https://cheat.readthedocs.io/en/latest/django/permissions.html
 #   https://stackoverflow.com/questions/41821921/model-field-level-permission-and-field-value-level-permission-in-django-and-drf
 # *******************************************************************************
-has_level00 = rules.is_group_member('user level: 0')
-has_level01 = rules.is_group_member('user level: 1')
-has_level02 = rules.is_group_member('user level: 2')
-has_level03 = rules.is_group_member('user level: 3')
-has_level04 = rules.is_group_member('user level: 4')
+has_level00 = has_level(0)
+has_level01 = has_level(1)
+has_level02 = has_level(2)
+has_level03 = has_level(3)
+has_level04 = has_level(4)
 
 
 @rules.predicate
@@ -0,0 +1,397 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+import collections
+import functools
+import re
+
+from django.apps import apps as global_apps
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+
+from theories.models.content import Content
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+SEARCH_TABLE = 'theories_search'
+SEARCH_CONFIG = 'english'
+RE_SEARCH_TERM = re.compile(r'\w+')
+
+# The maximum number of (ranked) results for a search.
+MAX_RESULTS = 250
+
+# The kinds of indexed objects (theories and evidence are both Content).
+KIND_THEORY = 0
+KIND_CATEGORY = 1
+KIND_EVIDENCE = 2
+
+THEORY_TYPES = (Content.TYPE.THEORY, Content.TYPE.DELETED_THEORY)
+EVIDENCE_TYPES = (Content.TYPE.EVIDENCE, Content.TYPE.FACT, Content.TYPE.DELETED_EVIDENCE,
+                  Content.TYPE.DELETED_FACT)
+
+# An indexed kind: the model (label), the title and details fields (the title fields are ranked
+# higher than the details) and the content types of the kind (None for all the rows).
+SearchKind = collections.namedtuple('SearchKind',
+                                    ['label', 'title_fields', 'details_fields', 'content_types'])
+
+SEARCH_KINDS = {
+    KIND_THEORY: SearchKind('theories.Content', ('title01', 'title00'), ('details',), THEORY_TYPES),
+    KIND_CATEGORY: SearchKind('theories.Category', ('title',), (), None),
+    KIND_EVIDENCE: SearchKind('theories.Content', ('title01', 'title00'), ('details',),
+                              EVIDENCE_TYPES),
+}
+
+# *******************************************************************************
+# Backends
+# *******************************************************************************
+
+
+class SearchBackend():
+    """The fallback search backend (no index, the fields are filtered with icontains).
+
+    Attributes:
+        connection (DatabaseWrapper): The database connection.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def create_index(self):
+        """Create the index table (if it does not exist)."""
+
+    def drop_index(self):
+        """Drop the index table (if it exists)."""
+
+    def rebuild(self, apps=global_apps):
+        """Re-index all the rows of the indexed models (one statement per model).
+
+        Args:
+            apps (Apps, optional): The app registry (the historical registry for migrations).
+        """
+
+    def update(self, kind, pk, title, details, stale_kinds=()):
+        """Index (or re-index) a single object.
+
+        Args:
+            kind (int): The kind of object (see SEARCH_KINDS).
+            pk (int): The object's pk.
+            title (str): The title text.
+            details (str): The details text.
+            stale_kinds (list[int], optional): The other kinds the object may be indexed as
+                (e.g., a theory converted to evidence), they are removed.
+        """
+
+    def remove(self, kinds, pk):
+        """Remove a single object from the index.
+
+        Args:
+            kinds (list[int]): The kinds the object may be indexed as (see SEARCH_KINDS).
+            pk (int): The object's pk.
+        """
+
+    def search(self, kinds, terms, limit=MAX_RESULTS, restriction=None):
+        """Retrieve the primary keys of the best matches.
+
+        Args:
+            kinds (list[int]): The kinds of object (see SEARCH_KINDS).
+            terms (list[str]): The search terms (all must match, as a prefix).
+            limit (int, optional): The maximum number of results. Defaults to MAX_RESULTS.
+            restriction (tuple, optional): The (sql, params) of a subquery that selects the
+                allowed primary keys, it is applied before the limit. Defaults to None.
+
+        Returns:
+            list[int]: The ranked primary keys (None if the backend has no index).
+        """
+        return None
+
+    def select_text(self, fields):
+        """The sql that concatenates the fields of a row (for rebuild)."""
+        if len(fields) == 0:
+            return "''"
+        qn = self.connection.ops.quote_name
+        return " || ' ' || ".join(f"COALESCE({qn(field)}, '')" for field in fields)
+
+    def select_where(self, search_kind):
+        """The sql that selects the rows of a kind (for rebuild)."""
+        if search_kind.content_types is None:
+            return ''
+        content_types = ', '.join(str(int(x)) for x in search_kind.content_types)
+        return f' WHERE {self.connection.ops.quote_name("content_type")} IN ({content_types})'
+
+
+class PostgresSearchBackend(SearchBackend):
+    """A tsvector (with a GIN index) search backend for PostgreSQL."""
+    DOCUMENT = "setweight(to_tsvector('{config}', {title}), 'A') || " \
+               "setweight(to_tsvector('{config}', {details}), 'B')"
+
+    def get_document(self, title, details):
+        return self.DOCUMENT.format(config=SEARCH_CONFIG, title=title, details=details)
+
+    def create_index(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+                           'kind smallint NOT NULL, '
+                           'object_id integer NOT NULL, '
+                           'document tsvector NOT NULL, '
+                           'PRIMARY KEY (kind, object_id))')
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document '
+                           f'ON {SEARCH_TABLE} USING gin (document)')
+
+    def drop_index(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def rebuild(self, apps=global_apps):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            for kind, search_kind in SEARCH_KINDS.items():
+                model = apps.get_model(search_kind.label)
+                document = self.get_document(self.select_text(search_kind.title_fields),
+                                             self.select_text(search_kind.details_fields))
+                cursor.execute(
+                    f'INSERT INTO {SEARCH_TABLE} (kind, object_id, document) '
+                    f'SELECT %s, {self.connection.ops.quote_name(model._meta.pk.column)}, '
+                    f'{document} FROM {self.connection.ops.quote_name(model._meta.db_table)}'
+                    f'{self.select_where(search_kind)}', [kind])
+
+    def update(self, kind, pk, title, details, stale_kinds=()):
+        # The stale kinds are removed by the same statement.
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'WITH stale AS (DELETE FROM {SEARCH_TABLE} '
+                'WHERE object_id = %s AND kind = ANY(%s)) '
+                f'INSERT INTO {SEARCH_TABLE} (kind, object_id, document) '
+                f'VALUES (%s, %s, {self.get_document("%s", "%s")}) '
+                'ON CONFLICT (kind, object_id) DO UPDATE SET document = EXCLUDED.document',
+                [pk, list(stale_kinds), kind, pk, title, details])
+
+    def remove(self, kinds, pk):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE object_id = %s AND kind = ANY(%s)',
+                [pk, list(kinds)])
+
+    def search(self, kinds, terms, limit=MAX_RESULTS, restriction=None):
+        query = ' & '.join(f'{term}:*' for term in terms)
+        sql, params = '', []
+        if restriction is not None:
+            sql, params = f' AND object_id IN ({restriction[0]})', list(restriction[1])
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT object_id FROM {SEARCH_TABLE}, to_tsquery('{SEARCH_CONFIG}', %s) query "
+                f'WHERE kind = ANY(%s) AND document @@ query{sql} '
+                'ORDER BY ts_rank(document, query) DESC, object_id LIMIT %s',
+                [query, list(kinds)] + params + [limit])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class SqliteSearchBackend(SearchBackend):
+    """An FTS5 search backend for SQLite (the rowid encodes the kind and pk)."""
+    # The bm25 weights of the columns (kind, title and details).
+    WEIGHTS = '0.0, 10.0, 1.0'
+
+    def create_index(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING '
+                           "fts5(kind UNINDEXED, title, details, tokenize='porter unicode61')")
+
+    def drop_index(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def rebuild(self, apps=global_apps):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            for kind, search_kind in SEARCH_KINDS.items():
+                model = apps.get_model(search_kind.label)
+                pk = self.connection.ops.quote_name(model._meta.pk.column)
+                cursor.execute(
+                    f'INSERT INTO {SEARCH_TABLE} (rowid, kind, title, details) '
+                    f'SELECT {pk} * %s + %s, %s, {self.select_text(search_kind.title_fields)}, '
+                    f'{self.select_text(search_kind.details_fields)} '
+                    f'FROM {self.connection.ops.quote_name(model._meta.db_table)}'
+                    f'{self.select_where(search_kind)}', [len(SEARCH_KINDS), kind, kind])
+
+    def update(self, kind, pk, title, details, stale_kinds=()):
+        self.remove([kind] + list(stale_kinds), pk)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, kind, title, details) '
+                'VALUES (%s, %s, %s, %s)',
+                [pk * len(SEARCH_KINDS) + kind, kind, title, details])
+
+    def remove(self, kinds, pk):
+        rowids = [pk * len(SEARCH_KINDS) + kind for kind in kinds]
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(rowids))})',
+                rowids)
+
+    def search(self, kinds, terms, limit=MAX_RESULTS, restriction=None):
+        query = ' '.join(f'"{term}"*' for term in terms)
+        sql, params = '', []
+        if restriction is not None:
+            sql = f' AND rowid / {len(SEARCH_KINDS)} IN ({restriction[0]})'
+            params = list(restriction[1])
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+                f'AND kind IN ({", ".join(["%s"] * len(kinds))}){sql} '
+                f'ORDER BY bm25({SEARCH_TABLE}, {self.WEIGHTS}), rowid LIMIT %s',
+                [query] + list(kinds) + params + [limit])
+            return [row[0] // len(SEARCH_KINDS) for row in cursor.fetchall()]
+
+
+# *******************************************************************************
+# Methods
+# *******************************************************************************
+
+
+@functools.lru_cache(maxsize=None)
+def has_fts5(alias):
+    """Return True if the (sqlite) database was compiled with FTS5."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in [row[0] for row in cursor.fetchall()]
+
+
+def get_search_backend(using=DEFAULT_DB_ALIAS):
+    """Return the search backend for the database.
+
+    Args:
+        using (str or DatabaseWrapper, optional): The database alias (or connection).
+
+    Returns:
+        SearchBackend: The backend (the fallback has no index).
+    """
+    connection = connections[using] if isinstance(using, str) else using
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend(connection)
+    if connection.vendor == 'sqlite' and has_fts5(connection.alias):
+        return SqliteSearchBackend(connection)
+    return SearchBackend(connection)
+
+
+def get_search_text(instance, fields):
+    """Concatenate the (non-empty) fields of an object."""
+    return ' '.join(getattr(instance, field) for field in fields if getattr(instance, field))
+
+
+def get_search_kinds(model):
+    """Return the kinds of a model (see SEARCH_KINDS).
+
+    Args:
+        model (Model): The model class.
+
+    Returns:
+        list[int]: The kinds.
+    """
+    return [kind for kind, x in SEARCH_KINDS.items() if x.label == model._meta.label]
+
+
+def get_search_kind(instance):
+    """Return the kind of an object (see SEARCH_KINDS).
+
+    Args:
+        instance (Model): The object.
+
+    Returns:
+        int: The kind.
+    """
+    for kind in get_search_kinds(type(instance)):
+        content_types = SEARCH_KINDS[kind].content_types
+        if content_types is None or instance.content_type in content_types:
+            return kind
+    raise ValueError(f'{instance} is not indexed.')
+
+
+def rebuild_search_index(using=DEFAULT_DB_ALIAS):
+    """Re-index all theories, evidence and categories (e.g., after a bulk insert).
+
+    Args:
+        using (str, optional): The database alias. Defaults to DEFAULT_DB_ALIAS.
+    """
+    get_search_backend(using).rebuild()
+
+
+def search(queryset, search_term, limit=MAX_RESULTS):
+    """Filter a Content or Category queryset by a search term (ranked by relevance).
+
+    Each word of the search term must match (as a prefix) one of the indexed fields. The queryset
+    is applied (as a subquery) before the limit. Without an index (see get_search_backend) the
+    fields are filtered with icontains and the queryset's order is kept.
+
+    Args:
+        queryset (QuerySet): The Content or Category queryset.
+        search_term (str): The search term.
+        limit (int, optional): The maximum number of results. Defaults to MAX_RESULTS.
+
+    Returns:
+        list[Model]: The matches, most relevant first.
+    """
+    kinds = get_search_kinds(queryset.model)
+    search_kind = SEARCH_KINDS[kinds[0]]
+    terms = RE_SEARCH_TERM.findall(search_term.lower())
+    if len(terms) == 0:
+        return []
+    restriction = queryset.order_by().values('pk').query.get_compiler(queryset.db).as_sql()
+    pks = get_search_backend(queryset.db).search(kinds, terms, limit=limit,
+                                                 restriction=restriction)
+    if pks is None:
+        for term in terms:
+            q = Q()
+            for field in search_kind.title_fields + search_kind.details_fields:
+                q |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(q)
+        return list(queryset[:limit])
+    # The rank is applied in python (ordering by a case expression is slower).
+    order = {pk: i for i, pk in enumerate(pks)}
+    return sorted(queryset.filter(pk__in=pks), key=lambda x: order[x.pk])
+
+
+def search_index_signal_handler(sender, instance, using, **kwargs):
+    """Index a saved theory, evidence or category (post_save).
+
+    Args:
+        sender (Model): The model class.
+        instance (Model): The saved object.
+        using (str): The database alias.
+    """
+    kind = get_search_kind(instance)
+    search_kind = SEARCH_KINDS[kind]
+    fields = search_kind.title_fields + search_kind.details_fields
+    if search_kind.content_types is not None:
+        fields += ('content_type',)
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not set(update_fields) & set(fields):
+        return
+    stale_kinds = [x for x in get_search_kinds(sender) if x != kind]
+    get_search_backend(using).update(kind,
+                                     instance.pk,
+                                     get_search_text(instance, search_kind.title_fields),
+                                     get_search_text(instance, search_kind.details_fields),
+                                     stale_kinds=stale_kinds)
+
+
+def search_remove_signal_handler(sender, instance, using, **kwargs):
+    """Remove a deleted theory, evidence or category from the index (post_delete).
+
+    Args:
+        sender (Model): The model class.
+        instance (Model): The deleted object.
+        using (str): The database alias.
+    """
+    get_search_backend(using).remove(get_search_kinds(sender), instance.pk)
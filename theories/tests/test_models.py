@@ -15,17 +15,20 @@ LICENSE.md file in the root directory of this source tree.
 # *******************************************************************************
 import datetime
 import random
+from io import StringIO
 
 from actstream.actions import follow
+from django.core.management import call_command
 from django.test import TestCase
 from django.urls import reverse
 from hitcount.models import HitCount
 
-from core.utils import get_or_none
+from core.utils import get_or_none, identity_map
 from theories.model_utils import (convert_content_type, copy_opinion, get_compare_url,
-                                  merge_content, swap_true_false)
+                                  merge_content, swap_true_false, update_utilization)
 from theories.models.categories import Category
 from theories.models.content import Content, DeleteMode
+from theories.models.opinions import OpinionDependency
 from theories.models.statistics import Stats
 from theories.tests.utils import (create_test_evidence, create_test_opinion, create_test_subtheory,
                                   create_test_theory, get_or_create_evidence,
@@ -777,6 +780,27 @@ class ContentTests(TestCase):
         self.assertEqual(self.user.notifications.count(), 1)
         # ToDo: test that points were reversed
 
+    def test_swap_titles02(self):
+        self.content.title00 = 'False'
+        self.opinion.update_points()
+        dependency = self.opinion.dependencies.get(content=self.fact)
+        stats = Stats.get(self.content, Stats.TYPE.ALL)
+        stats_dependency = stats.dependencies.get(content=self.fact)
+        swap_true_false(self.content, user=self.bob)
+        opinion = self.content.opinions.get(pk=self.opinion.pk)
+        self.assertEqual(opinion.true_total, self.opinion.false_total)
+        self.assertEqual(opinion.false_total, self.opinion.true_total)
+        swapped_dependency = opinion.dependencies.get(content=self.fact)
+        self.assertEqual(swapped_dependency.tt_input, dependency.tf_input)
+        self.assertEqual(swapped_dependency.ff_input, dependency.ft_input)
+        self.assertEqual(opinion.true_points(), self.opinion.false_points())
+        swapped_stats_dependency = stats.dependencies.get(content=self.fact)
+        self.assertEqual(swapped_stats_dependency.total_true_points,
+                         stats_dependency.total_false_points)
+        notification = self.user.notifications.get()
+        self.assertEqual(notification.actor, self.bob)
+        self.assertEqual(notification.target, opinion)
+
     def test_convert00(self):
         success = convert_content_type(self.content)
         self.assertTrue(self.content.is_theory())
@@ -803,6 +827,24 @@ class ContentTests(TestCase):
         self.assertFalse(result)
         # todo lots more
 
+    def test_merge02(self):
+        other = create_test_evidence(parent_theory=self.content, title='Other Fiction',
+                                     created_by=self.user)
+        self.opinion.dependencies.create(content=other, tt_input=10)
+        bobs_opinion = create_test_opinion(content=self.content, user=self.bob)
+        bobs_opinion.dependencies.create(content=other, tt_input=10)
+        bobs_opinion.update_points()
+        Stats.add(bobs_opinion)
+        self.assertTrue(merge_content(self.fiction, other, user=self.bob))
+        # Moved (no conflict).
+        self.assertTrue(bobs_opinion.dependencies.filter(content=self.fiction).exists())
+        self.assertFalse(bobs_opinion.dependencies.filter(content=other).exists())
+        stats = Stats.get(self.content, Stats.TYPE.ALL)
+        self.assertGreater(stats.get_dependency(self.fiction).total_true_points, 0.0)
+        # Conflict (the owner is notified).
+        self.assertTrue(self.opinion.dependencies.filter(content=other).exists())
+        self.assertEqual(self.user.notifications.filter(verb__contains='merge').count(), 1)
+
     def test_merge01(self):
         new = get_or_create_subtheory(self.content, true_title='new')
         assert new in self.content.get_dependencies()
@@ -1598,6 +1640,55 @@ class OpinionTests(TestCase):
         self.assertEqual(copied_dependency.ff_input, opinion_dependency.ff_input)
         self.assertEqual(copied_child.true_points(), child_opinion.true_points())
 
+    def test_copy_recursive_deep(self):
+        # A chain of sub-theories.
+        theories = [self.content]
+        for i in range(4):
+            theories.append(create_test_subtheory(theories[-1], title='Level %d' % i,
+                                                  created_by=self.user))
+        opinions = []
+        for parent, child in zip(theories, theories[1:] + [self.evidence]):
+            opinion = parent.opinions.create(user=self.bob, true_input=70, false_input=30)
+            opinion.dependencies.create(content=child, tt_input=70, ff_input=30)
+            opinion.update_points()
+            opinions.append(opinion)
+
+        copied_opinion = copy_opinion(opinions[0], self.user, recursive=True)
+        self.assertEqual(copied_opinion.content, self.content)
+        for theory, opinion in zip(theories, opinions):
+            copied = theory.opinions.get(user=self.user)
+            self.assertEqual(copied.true_points(), opinion.true_points())
+            self.assertEqual(copied.dependencies.count(), opinion.dependencies.count())
+            stats = Stats.get(theory, Stats.TYPE.ALL)
+            self.assertTrue(stats.opinions.filter(pk=copied.pk).exists())
+
+        # Copying again overwrites (and does not duplicate) the copies.
+        copy_opinion(opinions[0], self.user, recursive=True)
+        for theory in theories:
+            self.assertEqual(theory.opinions.filter(user=self.user).count(), 1)
+            self.assertEqual(theory.opinions.get(user=self.user).dependencies.count(), 2)
+
+    def test_copy_recursive_identity_map(self):
+        # The user has a root opinion (but no sub-theory opinion) before the copy.
+        Stats.initialize(self.content)
+        Stats.initialize(self.subtheory)
+        user_opinion = self.content.opinions.create(user=self.user, true_input=10)
+        user_opinion.dependencies.create(content=self.subtheory, tt_input=10)
+        user_opinion.update_points()
+        Stats.add(user_opinion)
+        opinion = self.content.opinions.create(user=self.bob, true_input=44, false_input=55)
+        opinion.dependencies.create(content=self.subtheory, tt_input=66, ff_input=33)
+        child_opinion = self.subtheory.opinions.create(user=self.bob, true_input=99, force=True)
+        child_opinion.dependencies.create(content=self.evidence, ff_input=100)
+        opinion.update_points()
+        child_opinion.update_points()
+
+        # The bulk writes must not leave stale entries in the identity map.
+        with identity_map():
+            copy_opinion(opinion, self.user, recursive=True)
+        stats = Stats.get(self.content, Stats.TYPE.ALL)
+        self.assertTrue(stats.flat_dependencies.filter(content=self.evidence).exists())
+
     def test_true_points(self):
         # setup
         opinion = self.content.opinions.create(user=self.user,)
@@ -1704,6 +1795,57 @@ class OpinionTests(TestCase):
 
         # ToDo: Much more
 
+    def test_bulk_save_dependencies(self):
+        theory = create_test_theory(title='Big Theory', created_by=self.user)
+        evidence = [
+            create_test_evidence(theory, title='Evidence %d' % i, created_by=self.user)
+            for i in range(50)
+        ]
+        opinion = theory.opinions.create(user=self.bob, true_input=100)
+        opinion.dependencies.create(content=evidence[0], tt_input=10)
+        dependencies = [opinion.dependencies.get()]
+        dependencies[0].tt_input = 0
+        for i, x in enumerate(evidence[1:]):
+            dependencies.append(OpinionDependency(parent=opinion, content=x, tt_input=i % 2))
+        with self.assertNumQueries(12):
+            OpinionDependency.bulk_save(dependencies)
+            opinion.update_points()
+        # The empty dependencies are removed (the intuition is kept).
+        self.assertEqual(opinion.dependencies.count(), 25)
+        self.assertEqual(opinion.true_total, 24)
+        self.assertEqual(opinion.false_total, 0)
+        dependency = opinion.dependencies.get(content=evidence[2])
+        self.assertEqual(dependency.rank, dependency.total_points())
+
+    def test_update_utilization(self):
+        opinion = create_test_opinion(content=self.content, user=self.bob, dependencies=True)
+        touched = [self.content] + list(self.content.get_dependencies())
+        with self.assertNumQueries(5):
+            added, removed = update_utilization(self.bob, touched)
+        self.assertEqual(added, set(x.pk for x in touched))
+        self.assertEqual(removed, set())
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.utilization, 1)
+        self.assertEqual(self.content.get_utilization(self.bob), 0)
+        self.assertEqual(self.content.get_utilization(self.user), 1)
+        # Nothing changed.
+        with self.assertNumQueries(2):
+            update_utilization(self.bob, touched)
+        # Remove the opinion.
+        opinion.delete()
+        added, removed = update_utilization(self.bob, touched)
+        self.assertEqual(removed, set(x.pk for x in touched))
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.utilization, 0)
+        self.assertEqual(self.bob.utilized.count(), 0)
+
+    def test_recalculate_utilization(self):
+        self.bob.utilized.add(self.content)
+        Content.objects.filter(pk=self.content.pk).update(utilization=5)
+        call_command('recalculate', self.content.pk, stdout=StringIO())
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.utilization, 1)
+
 
 # ************************************************************
 # OpinionDependencyTests
@@ -0,0 +1,149 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from theories.models.categories import Category
+from theories.models.content import Content, DeleteMode
+from theories.search import (KIND_CATEGORY, KIND_EVIDENCE, KIND_THEORY, SEARCH_TABLE,
+                              SearchBackend, get_search_kind, rebuild_search_index, search)
+from theories.utils import create_categories, create_reserved_dependencies
+from users.maintence import create_groups_and_permissions
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+
+
+# ************************************************************
+# SearchTests
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class SearchTests(TestCase):
+
+    def setUp(self):
+        create_groups_and_permissions()
+        create_reserved_dependencies()
+        create_categories()
+        self.category = Category.get('All')
+        self.gravity = self.create_theory('Gravity bends light', 'Observed during eclipses.')
+        self.moon = self.create_theory('The moon landing was staged',
+                                       'A theory about light and shadows.',
+                                       title00='The moon landing happened')
+        self.evidence = Content.objects.create(content_type=Content.TYPE.EVIDENCE,
+                                               title01='Eclipse photographs')
+
+    def create_theory(self, title01, details, title00=None):
+        theory = Content.objects.create(content_type=Content.TYPE.THEORY,
+                                        title01=title01,
+                                        title00=title00,
+                                        details=details)
+        self.category.theories.add(theory)
+        return theory
+
+    def test_search(self):
+        theories = Content.objects.filter(content_type=Content.TYPE.THEORY)
+        self.assertEqual(search(theories, 'gravity'), [self.gravity])
+        # prefix, stemming and case
+        self.assertEqual(search(theories, 'GRAV'), [self.gravity])
+        self.assertEqual(search(theories, 'bending'), [self.gravity])
+        # the false title and details are indexed
+        self.assertEqual(search(theories, 'happened'), [self.moon])
+        self.assertEqual(search(theories, 'eclipse'), [self.gravity])
+        # all the terms must match
+        self.assertEqual(search(theories, 'moon light'), [self.moon])
+        self.assertEqual(search(theories, 'moon gravity'), [])
+        self.assertEqual(search(theories, '!?'), [])
+        # the queryset is filtered
+        self.assertEqual(search(Content.objects.all(), 'eclipse'), [self.evidence, self.gravity])
+
+    def test_ranking(self):
+        # The titles are ranked above the details.
+        self.assertEqual(search(Content.objects.all(), 'light'), [self.gravity, self.moon])
+        self.assertEqual(search(Content.objects.all(), 'light', limit=1), [self.gravity])
+
+    def test_restriction(self):
+        # The queryset is applied before the limit (the evidence ranks above the theory).
+        for i in range(3):
+            Content.objects.create(content_type=Content.TYPE.EVIDENCE,
+                                   title01=f'Eclipse evidence {i}')
+        theories = self.category.get_theories()
+        self.assertEqual(search(theories, 'eclipse', limit=2), [self.gravity])
+        self.assertEqual(len(search(Content.objects.all(), 'eclipse', limit=2)), 2)
+
+    def test_kinds(self):
+        self.assertEqual(get_search_kind(self.gravity), KIND_THEORY)
+        self.assertEqual(get_search_kind(self.evidence), KIND_EVIDENCE)
+        self.assertEqual(get_search_kind(self.category), KIND_CATEGORY)
+        # A converted theory is re-indexed as evidence (once).
+        self.gravity.content_type = Content.TYPE.EVIDENCE
+        self.gravity.save()
+        self.assertEqual(search(Content.objects.all(), 'gravity'), [self.gravity])
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT kind FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+                           ['gravity'])
+            self.assertEqual([row[0] for row in cursor.fetchall()], [KIND_EVIDENCE])
+
+    def test_incremental(self):
+        self.gravity.title01 = 'Gravity is a force'
+        self.gravity.save()
+        self.assertEqual(search(Content.objects.all(), 'bends'), [])
+        self.assertEqual(search(Content.objects.all(), 'force'), [self.gravity])
+        self.gravity.delete(mode=DeleteMode.HARD)
+        self.assertEqual(search(Content.objects.all(), 'gravity'), [])
+
+    def test_categories(self):
+        self.assertEqual(search(Category.objects.all(), 'sci'), [Category.get('Science')])
+        category = Category.objects.create(title='Astronomy', slug='astronomy')
+        self.assertEqual(search(Category.objects.all(), 'astro'), [category])
+
+    def test_rebuild(self):
+        Content.objects.bulk_create(
+            [Content(content_type=Content.TYPE.EVIDENCE, title01='Bulk evidence')])
+        self.assertEqual(search(Content.objects.all(), 'bulk'), [])
+        rebuild_search_index()
+        self.assertEqual([x.title01 for x in search(Content.objects.all(), 'bulk')],
+                         ['Bulk evidence'])
+        self.assertEqual(search(Content.objects.all(), 'gravity'), [self.gravity])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Rebuilt the search index', out.getvalue())
+        self.assertEqual(search(Content.objects.all(), 'gravity'), [self.gravity])
+
+    def test_fallback(self):
+        with mock.patch('theories.search.get_search_backend',
+                        return_value=SearchBackend(connection)):
+            self.assertEqual(search(Content.objects.all(), 'grav light'), [self.gravity])
+            self.assertEqual(search(Category.objects.all(), 'sci'), [Category.get('Science')])
+
+    def test_views(self):
+        response = self.client.get(reverse('theories:index') + '?search=staged')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['theories']), [self.moon])
+        response = self.client.get(reverse('theories:categories') + '?search=pol')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['categories']), [Category.get('Politics')])
@@ -0,0 +1,164 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+from actstream import action
+from actstream.actions import follow, unfollow
+from django.test import TestCase
+from django.urls import reverse
+
+from core.utils import QueryCapture
+from theories.model_utils import swap_true_false
+from theories.models.statistics import Stats, TheorySummary, refresh_summaries
+from theories.tests.utils import create_test_opinion, create_test_theory
+from theories.utils import create_categories, create_reserved_dependencies
+from users.maintence import create_groups_and_permissions, create_test_user
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+
+# The summary fields that are compared between the signals and a refresh.
+SUMMARY_FIELDS = [
+    field.name for field in TheorySummary._meta.get_fields() if field.name != 'content'
+]
+
+
+# ************************************************************
+# TheorySummaryTests
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class TheorySummaryTests(TestCase):
+
+    def setUp(self):
+        create_groups_and_permissions()
+        create_reserved_dependencies()
+        create_categories()
+        self.bob = create_test_user(username='bob', password='1234')
+        self.theory = create_test_theory(title='Theory', created_by=self.bob)
+        Stats.initialize(self.theory)
+
+    def get_summary(self):
+        return TheorySummary.objects.get(content=self.theory)
+
+    def add_opinions(self, theory, num_opinions):
+        for i in range(num_opinions):
+            user = create_test_user(username=f'{theory.pk}_user{i:02d}', password='1234')
+            create_test_opinion(content=theory,
+                                user=user,
+                                true_input=10 + i,
+                                false_input=10,
+                                force=True)
+
+    def test_created(self):
+        summary = self.get_summary()
+        self.assertEqual(summary.num_opinions, 0)
+        self.assertEqual(summary.num_followers, 0)
+        self.assertEqual(summary.all_true_points, 0.0)
+        # evidence does not have a summary
+        evidence = self.theory.dependencies.create(content_type=self.theory.TYPE.EVIDENCE,
+                                                   title01='Evidence')
+        self.assertFalse(TheorySummary.objects.filter(content=evidence).exists())
+
+    def test_opinions(self):
+        opinion = create_test_opinion(content=self.theory,
+                                      user=self.bob,
+                                      true_input=90,
+                                      false_input=10,
+                                      force=True)
+        summary = self.get_summary()
+        self.assertEqual(summary.num_opinions, 1)
+        for stats in Stats.get(self.theory):
+            true_field, false_field = TheorySummary.POINTS_FIELDS[stats.stats_type]
+            self.assertAlmostEqual(getattr(summary, true_field), stats.true_points())
+            self.assertAlmostEqual(getattr(summary, false_field), stats.false_points())
+        self.assertAlmostEqual(summary.all_true_points, 0.9)
+
+        # swap
+        Stats.get(self.theory, Stats.TYPE.ALL).swap_true_false()
+        self.assertAlmostEqual(self.get_summary().all_true_points, 0.1)
+
+        # delete
+        Stats.remove(opinion)
+        opinion.delete()
+        summary = self.get_summary()
+        self.assertEqual(summary.num_opinions, 0)
+        self.assertEqual(summary.all_true_points, 0.0)
+
+    def test_swap_true_false(self):
+        create_test_opinion(content=self.theory,
+                            user=self.bob,
+                            true_input=80,
+                            false_input=20,
+                            force=True)
+        self.assertAlmostEqual(self.get_summary().all_true_points, 0.8)
+        # The stats are swapped with a bulk update (no signals).
+        self.theory.title00 = 'False'
+        self.assertTrue(swap_true_false(self.theory))
+        summary = self.get_summary()
+        for stats in Stats.get(self.theory):
+            true_field, false_field = TheorySummary.POINTS_FIELDS[stats.stats_type]
+            self.assertAlmostEqual(getattr(summary, true_field), stats.true_points())
+            self.assertAlmostEqual(getattr(summary, false_field), stats.false_points())
+        self.assertAlmostEqual(summary.all_true_points, 0.2)
+        self.assertAlmostEqual(summary.all_false_points, 0.8)
+
+    def test_followers_and_activity(self):
+        follow(self.bob, self.theory, send_action=False)
+        self.assertEqual(self.get_summary().num_followers, 1)
+        unfollow(self.bob, self.theory, send_action=False)
+        self.assertEqual(self.get_summary().num_followers, 0)
+
+        self.assertIsNone(self.get_summary().last_activity)
+        action.send(self.bob, verb='Modified.', target=self.theory)
+        last_action = self.theory.target_actions.first()
+        self.assertEqual(self.get_summary().last_activity, last_action.timestamp)
+        last_action.delete()
+        self.assertIsNone(self.get_summary().last_activity)
+
+    def test_refresh(self):
+        self.add_opinions(self.theory, 3)
+        follow(self.bob, self.theory)
+        action.send(self.bob, verb='Modified.', target=self.theory)
+        expected = TheorySummary.objects.values(*SUMMARY_FIELDS).get(content=self.theory)
+
+        TheorySummary.objects.all().delete()
+        refresh_summaries()
+        summary = TheorySummary.objects.values(*SUMMARY_FIELDS).get(content=self.theory)
+        for field in SUMMARY_FIELDS:
+            self.assertAlmostEqual(summary[field], expected[field])
+
+    def test_index_queries(self):
+        url = reverse('theories:index')
+        self.add_opinions(self.theory, 2)
+        self.client.get(url)
+        with QueryCapture() as capture:
+            response = self.client.get(url)
+        self.assertContains(response, '2 opinions')
+
+        # The number of queries does not grow with the theories.
+        for i in range(5):
+            theory = create_test_theory(title=f'Theory {i:02d}', created_by=self.bob)
+            Stats.initialize(theory)
+            self.add_opinions(theory, i)
+        with QueryCapture() as capture02:
+            response = self.client.get(url)
+        self.assertEqual(capture02.count, capture.count)
+        self.assertEqual(len(response.context['theories']), 6)
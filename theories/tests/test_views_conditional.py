@@ -0,0 +1,236 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+from actstream.actions import follow, unfollow
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from notifications.signals import notify
+
+from core.utils import QueryCapture
+from theories.models.statistics import Stats
+from theories.tests.test_views_base import ViewsTestBase
+from theories.tests.utils import create_test_opinion
+from theories.views import get_content_etag
+from users.maintence import create_test_user
+from users.models import User
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+
+# Two workers, each with its own (per process) object cache.
+WORKER_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'worker01',
+    },
+    'worker02': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'worker02',
+    },
+}
+
+
+# ************************************************************
+# ConditionalViews
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class ConditionalViews(TestCase):
+    fixtures = ['groups.json']
+
+    # ******************************
+    # Setup - ConditionalViews
+    # ******************************
+    def setUp(self):
+        # Only the data of ViewsTestBase is used (not its tests).
+        ViewsTestBase.create_data(self)
+        Stats.initialize(self.content)
+        Stats.recalculate(self.content)
+        self.urls = [
+            reverse('theories:theory-detail', kwargs={'content_pk': self.content.pk}),
+            reverse('theories:evidence-detail', kwargs={'content_pk': self.fact.pk}),
+            reverse('theories:opinion-index',
+                    kwargs={
+                        'content_pk': self.content.pk,
+                        'opinion_slug': 'all'
+                    }),
+            reverse('theories:opinion-analysis',
+                    kwargs={
+                        'content_pk': self.content.pk,
+                        'opinion_pk': self.bobs_opinion.pk
+                    }),
+            reverse('theories:opinion-analysis',
+                    kwargs={
+                        'content_pk': self.content.pk,
+                        'opinion_slug': 'all'
+                    }),
+        ]
+
+    def get_etags(self):
+        """Request each page and return the ETags."""
+        # The first visit sets the CSRF cookie (which is part of the ETag).
+        for url in self.urls:
+            self.client.get(url)
+        etags = []
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.has_header('ETag'))
+            etags.append(response['ETag'])
+        return etags
+
+    def verify_not_modified(self, etags):
+        """Verify each page responds with 304 (not modified)."""
+        for url, etag in zip(self.urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+
+    def verify_modified(self, etags, indices=None):
+        """Verify the pages (by index) are rendered again."""
+        if indices is None:
+            indices = range(len(self.urls))
+        for i in indices:
+            response = self.client.get(self.urls[i], HTTP_IF_NONE_MATCH=etags[i])
+            self.assertEqual(response.status_code, 200)
+
+    # ******************************
+    # Tests - ConditionalViews
+    # ******************************
+    def test_not_modified(self):
+        etags = self.get_etags()
+        self.verify_not_modified(etags)
+        self.assertEqual(self.get_etags(), etags)
+
+    def test_user(self):
+        anonymous_etags = self.get_etags()
+        self.client.login(username='bob', password='1234')
+        etags = self.get_etags()
+        self.verify_modified(anonymous_etags)
+        self.verify_not_modified(etags)
+        # A new notification changes the navbar.
+        notify.send(sender=self.bob, recipient=self.bob, verb='test', target=self.content)
+        self.verify_modified(etags)
+
+    def test_content_modified(self):
+        etags = self.get_etags()
+        self.content.title01 = 'A new title'
+        self.content.save(user=self.bob)
+        self.verify_modified(etags)
+
+    def test_dependency_modified(self):
+        etags = self.get_etags()
+        self.fact.title01 = 'A new fact'
+        self.fact.save(user=self.bob)
+        self.verify_modified(etags, indices=[0, 1])
+
+    def test_opinion_modified(self):
+        etags = self.get_etags()
+        dependency = self.bobs_opinion.dependencies.first()
+        dependency.tt_input += 10
+        dependency.save()
+        self.verify_modified(etags, indices=[3])
+
+    def test_stats_modified(self):
+        etags = self.get_etags()
+        user = create_test_user(username='alice', password='1234')
+        opinion = create_test_opinion(content=self.content, user=user, dependencies=True)
+        opinion.update_points()
+        Stats.add(opinion)
+        self.verify_modified(etags, indices=[0, 2, 4])
+
+    @override_settings(CACHES=WORKER_CACHES, OBJECT_CACHE='default')
+    def test_other_worker(self):
+        # Another worker handles the changes, the versions of this worker are not bumped.
+        etags = self.get_etags()
+        with override_settings(OBJECT_CACHE='worker02'):
+            dependency = self.bobs_opinion.dependencies.first()
+            dependency.tt_input += 10
+            dependency.save()
+            self.bobs_opinion.update_points()
+        self.verify_modified(etags, indices=[3])
+        etags = self.get_etags()
+        with override_settings(OBJECT_CACHE='worker02'):
+            user = create_test_user(username='alice', password='1234')
+            opinion = create_test_opinion(content=self.content, user=user, dependencies=True)
+            opinion.update_points()
+            Stats.add(opinion)
+        self.verify_modified(etags, indices=[0, 2, 4])
+
+    def test_follow(self):
+        # Another user's opinion page (the follow link).
+        create_test_user(username='alice', password='1234')
+        self.client.login(username='alice', password='1234')
+        etags = self.get_etags()
+        alice = User.objects.get(username='alice')
+        follow(alice, self.bobs_opinion, send_action=False)
+        self.verify_modified(etags, indices=[3])
+        etags = self.get_etags()
+        self.assertTrue(self.client.get(self.urls[3]).context['subscribed'])
+        unfollow(alice, self.bobs_opinion, send_action=False)
+        self.verify_modified(etags, indices=[3])
+
+    def test_user_opinion_modified(self):
+        # The user's own opinion (points) is listed on the opinion pages.
+        alice = create_test_user(username='alice', password='1234')
+        self.client.login(username='alice', password='1234')
+        etags = self.get_etags()
+        opinion = create_test_opinion(content=self.content, user=alice, dependencies=True)
+        self.verify_modified(etags, indices=[3, 4])
+        etags = self.get_etags()
+        opinion.true_input += 10
+        opinion.save()
+        self.verify_modified(etags, indices=[3, 4])
+
+    def test_parent_opinion_modified(self):
+        # The opinion page of the sub-theory lists the owner's opinion of the parent theory.
+        opinion = create_test_opinion(content=self.subtheory, user=self.bob)
+        self.urls = [
+            reverse('theories:opinion-analysis',
+                    kwargs={
+                        'content_pk': self.subtheory.pk,
+                        'opinion_pk': opinion.pk
+                    }),
+        ]
+        etags = self.get_etags()
+        self.bobs_opinion.anonymous = True
+        self.bobs_opinion.save()
+        self.verify_modified(etags)
+        etags = self.get_etags()
+        self.bobs_opinion.delete()
+        self.verify_modified(etags)
+
+    def test_one_query(self):
+        request = RequestFactory().get(self.urls[0])
+        request.user = AnonymousUser()
+        get_content_etag(request, self.content.pk)
+        with QueryCapture() as capture:
+            etag = get_content_etag(request, self.content.pk)
+        self.assertIsNotNone(etag)
+        self.assertEqual(capture.count, 1)
+        self.assertIsNone(get_content_etag(request, 0))
+        # The parent opinions of the opinion pages take a second query.
+        with QueryCapture() as capture:
+            get_content_etag(request,
+                             self.content.pk,
+                             opinion_pk=self.bobs_opinion.pk,
+                             opinion_page=True)
+        self.assertEqual(capture.count, 2)
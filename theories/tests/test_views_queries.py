@@ -0,0 +1,179 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+from actstream import action
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.urls import reverse
+from notifications.signals import notify
+
+from core.utils import QueryCapture
+from theories.models.categories import Category
+from theories.models.opinions import Opinion
+from theories.models.statistics import Stats
+from theories.tests.test_views_base import ViewsTestBase
+from theories.tests.utils import create_test_evidence, create_test_opinion
+from users.maintence import create_test_user
+
+# *******************************************************************************
+# Defines
+# *******************************************************************************
+
+# The maximum number of queries per view (url name -> budget). Besides the budget, the number of
+# queries must not grow with the data, so a query per row (N+1) fails the tests. The budgets
+# include the ETag query of the conditional views and the parent opinions query of the opinion
+# pages (see get_content_etag).
+QUERY_BUDGETS = {
+    'theories:theory-detail': 33,
+    'theories:opinion-analysis': 34,
+    'theories:opinion-compare': 33,
+    'theories:opinion-index': 17,
+    'theories:activity': 11,
+    'users:notifications': 12,
+}
+
+# The number of rows (opinions, evidence, actions and notifications) added to grow the data.
+NUM_ROWS = 5
+
+
+# ************************************************************
+# QueryBudgetViews
+#
+#
+#
+#
+#
+#
+#
+# ************************************************************
+class QueryBudgetViews(TestCase):
+    fixtures = ['groups.json']
+
+    # ******************************
+    # Setup - QueryBudgetViews
+    # ******************************
+    def setUp(self):
+        # Only the data of ViewsTestBase is used (not its tests).
+        ViewsTestBase.create_data(self)
+        self.client.login(username='bob', password='1234')
+        Stats.initialize(self.content)
+        Stats.recalculate(self.content)
+        self.urls = {
+            'theories:theory-detail':
+                reverse('theories:theory-detail', kwargs={'content_pk': self.content.pk}),
+            'theories:opinion-analysis':
+                reverse('theories:opinion-analysis',
+                        kwargs={
+                            'content_pk': self.content.pk,
+                            'opinion_pk': self.bobs_opinion.pk
+                        }),
+            'theories:opinion-compare':
+                reverse('theories:opinion-compare',
+                        kwargs={
+                            'content_pk': self.content.pk,
+                            'opinion_pk01': self.bobs_opinion.pk,
+                            'opinion_slug02': 'all'
+                        }),
+            'theories:opinion-index':
+                reverse('theories:opinion-index',
+                        kwargs={
+                            'content_pk': self.content.pk,
+                            'opinion_slug': 'all'
+                        }),
+            'theories:activity':
+                reverse('theories:activity', kwargs={'category_slug': 'all'}),
+            'users:notifications':
+                reverse('users:notifications'),
+        }
+
+    def grow_data(self, prefix, num_rows=NUM_ROWS):
+        """Add opinions, evidence, activity and notifications."""
+        category = Category.get('All')
+        for i in range(num_rows):
+            user = create_test_user(username=f'{prefix}_user{i:02d}', password='1234')
+            evidence = create_test_evidence(parent_theory=self.content,
+                                            title=f'{prefix} Evidence {i:02d}',
+                                            created_by=user)
+            opinion = create_test_opinion(content=self.content, user=user, dependencies=True)
+            opinion.update_points()
+            Stats.add(opinion)
+            action.send(user, verb='created', action_object=evidence, target=category)
+            notify.send(sender=user,
+                        recipient=self.bob,
+                        verb='<# object.url {{ object }} has been added. #>',
+                        action_object=evidence,
+                        target=opinion)
+
+    def get_num_queries(self, url_name):
+        """Request the view and return the number of queries."""
+        with QueryCapture() as capture:
+            response = self.client.get(self.urls[url_name])
+        self.assertEqual(response.status_code, 200)
+        return capture.count
+
+    def verify_budget(self, url_name):
+        """Verify the view is within budget and the queries do not grow with the data."""
+        budget = QUERY_BUDGETS[url_name]
+        self.assertLessEqual(self.get_num_queries(url_name), budget)
+        self.grow_data(prefix='a')
+        num_queries = self.get_num_queries(url_name)
+        self.assertLessEqual(num_queries, budget)
+        self.grow_data(prefix='b')
+        self.assertEqual(self.get_num_queries(url_name), num_queries)
+
+    # ******************************
+    # Budgets - QueryBudgetViews
+    # ******************************
+    def test_theory_detail(self):
+        self.verify_budget('theories:theory-detail')
+
+    def test_opinion_analysis(self):
+        self.verify_budget('theories:opinion-analysis')
+
+    def test_opinion_compare(self):
+        self.verify_budget('theories:opinion-compare')
+
+    def test_opinion_index(self):
+        self.verify_budget('theories:opinion-index')
+
+    def test_activity(self):
+        self.verify_budget('theories:activity')
+
+    def test_notifications(self):
+        self.verify_budget('users:notifications')
+
+    # ******************************
+    # Pagination - QueryBudgetViews
+    # ******************************
+    def test_opinion_index_order(self):
+        self.grow_data(prefix='a')
+        Opinion.objects.filter(user__username='a_user01').update(anonymous=True)
+        response = self.client.get(self.urls['theories:opinion-index'])
+        opinions = response.context['opinions']
+        # The page is sliced in the database (not a list of every opinion).
+        self.assertIsInstance(opinions.paginator.object_list, QuerySet)
+        opinions = list(opinions)
+        anonymous = [x for x in opinions if x.anonymous]
+        self.assertEqual(len(anonymous), 1)
+        self.assertEqual(opinions[:len(anonymous)], anonymous)
+        usernames = [x.user.username for x in opinions[len(anonymous):]]
+        self.assertEqual(usernames, sorted(usernames))
+
+    def test_category_index_page(self):
+        response = self.client.get(reverse('theories:categories'))
+        categories = response.context['categories']
+        self.assertIsInstance(categories.paginator.object_list, QuerySet)
+        titles = [x.title for x in categories]
+        self.assertEqual(titles, sorted(titles))
@@ -15,32 +15,41 @@ LICENSE.md file in the root directory of this source tree.
 # *******************************************************************************
 import reversion
 from actstream.actions import is_following
+from actstream.models import Follow
+from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import (Case, CharField, Count, Exists, F, FilteredRelation, IntegerField,
+                              OuterRef, Q, Subquery, Value, When)
 from django.forms import modelformset_factory
 from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils.http import unquote
+from django.views.decorators.http import condition
+from notifications.models import Notification
 from reversion.models import Version
 from rules.contrib.views import objectgetter as get_object
 from rules.contrib.views import permission_required
 
-from core.utils import Parameters, get_or_none, get_page_list
+from core.utils import (Parameters, get_keyset_page, get_or_none, get_page_etag,
+                        get_page_list)
 from theories.converters import CONTENT_PK_CYPHER
-from theories.forms import (EvidenceForm, EvidenceRevisionForm, OpinionDependencyForm, OpinionForm,
-                            SelectDependencyForm, TheoryForm, TheoryRevisionForm)
+from theories.forms import (EvidenceForm, EvidenceRevisionForm, OpinionDependencyBaseFormSet,
+                            OpinionDependencyForm, OpinionForm, SelectDependencyForm, TheoryForm,
+                            TheoryRevisionForm)
 from theories.graphs.bar_graphs import DemoBarGraph, OpinionBarGraph, OpinionComparisionBarGraph
 from theories.graphs.guage import DependencyGuage
 from theories.graphs.pie_charts import DemoPieChart, OpinionComparisionPieChart, OpinionPieChart
 from theories.graphs.venn_diagrams import (DemoVennDiagram, OpinionComparisionVennDiagram,
                                            OpinionVennDiagram)
 from theories.model_utils import (convert_content_type, copy_opinion, get_compare_url,
-                                  merge_content, swap_true_false)
+                                  merge_content, swap_true_false, update_utilization)
 from theories.models.categories import Category
 from theories.models.content import Content
 from theories.models.opinions import Opinion, OpinionDependency
 from theories.models.statistics import Stats
+from theories.search import search
 from theories.utils import get_category_suggestions, get_demo_opinion
 from users.forms import ReportViolationForm
 from users.models import User
@@ -51,6 +60,10 @@ from users.models import User
 MAX_NUM_PAGES = 5
 NUM_ITEMS_PER_PAGE = 25
 
+# The opinion fields that the pages display (the points), see get_content_etag.
+OPINION_ETAG_FIELDS = ('true_input', 'false_input', 'true_total', 'false_total', 'force',
+                       'anonymous', 'deleted', 'modified_date')
+
 # *******************************************************************************
 # Methods
 # *******************************************************************************
@@ -153,7 +166,8 @@ def get_compare_list(opinion01, current_user, exclude_list=None):
             compare_list.append(entry)
 
     # other opinions
-    for opinion02 in theory.opinions.exclude(user__in=exclude_users)[:10]:
+    for opinion02 in theory.opinions.exclude(user__in=exclude_users).select_related(
+            'user', 'content')[:10]:
         compare_list.append({
             'text': opinion02.get_owner(),
             'true_points': round(opinion02.true_points() * 100),
@@ -164,6 +178,100 @@ def get_compare_list(opinion01, current_user, exclude_list=None):
     return compare_list
 
 
+def get_content_etag(request, content_pk, opinion_pk=None, stats_type=None, opinion_page=False):
+    """Construct the ETag of a theory, evidence or opinion page (see get_page_etag).
+
+    A single query retrieves the content's stats (and their points), the number of opinions,
+    the modified dates of the content, its dependencies and its parents, the opinion's points
+    and modified date and (for users) the number of unread notifications. The versions of the
+    content, its stats and the opinion are retrieved from the object cache. The values from the
+    database keep the ETag consistent between the workers even if the object cache is per process
+    (the versions cover the rest). A page that is not modified is not rendered, so its hits are
+    not counted (repeat hits are ignored anyways).
+
+    The opinion pages (opinion_page) also depend on the user's opinion of the theory and whether
+    the user follows the opinion (same query) and on the parent opinions, i.e., the opinions of
+    the parent theories by the same owner (or of the same stats_type), which take a second query.
+
+    Args:
+        request (Request): The request.
+        content_pk (int): The content's pk.
+        opinion_pk (int, optional): The opinion's pk. Defaults to None.
+        stats_type (int, optional): The stats type (Stats.TYPE) of the page. Defaults to None.
+        opinion_page (bool, optional): If True, the per-user state of the opinion pages is
+            included. Defaults to False.
+
+    Returns:
+        str: The ETag or None if the content does not exist.
+    """
+    user = request.user
+    modified_date = F('modified_date').desc(nulls_last=True)
+    dependencies = Content.objects.filter(parents=OuterRef('pk')).order_by(modified_date)
+    parents = Content.objects.filter(dependencies=OuterRef('pk')).order_by(modified_date)
+    opinions = Opinion.objects.filter(content=OuterRef('pk'), deleted=False).order_by()
+    opinions = opinions.values('content').annotate(count=Count('pk')).values('count')
+    contents = Content.objects.filter(pk=content_pk).annotate(
+        dependencies_modified=Subquery(dependencies.values('modified_date')[:1]),
+        parents_modified=Subquery(parents.values('modified_date')[:1]),
+        num_opinions=Subquery(opinions, output_field=IntegerField()),
+    )
+    stats_fields = ['stats__pk', 'stats__total_true_points', 'stats__total_false_points']
+    fields = ['modified_date', 'dependencies_modified', 'parents_modified', 'num_opinions']
+    if opinion_pk is not None:
+        opinion_dependencies = OpinionDependency.objects.filter(parent=opinion_pk).order_by()
+        opinion_dependencies = opinion_dependencies.values('parent').annotate(
+            count=Count('pk')).values('count')
+        contents = contents.annotate(
+            opinion=FilteredRelation('opinions', condition=Q(opinions__pk=opinion_pk)),
+            num_opinion_dependencies=Subquery(opinion_dependencies, output_field=IntegerField()),
+        )
+        fields += ['opinion__' + x for x in OPINION_ETAG_FIELDS]
+        fields.append('num_opinion_dependencies')
+    if user.is_authenticated:
+        unread = Notification.objects.filter(recipient=user.pk, unread=True).order_by()
+        unread = unread.values('recipient').annotate(count=Count('pk')).values('count')
+        contents = contents.annotate(num_unread=Subquery(unread, output_field=IntegerField()))
+        fields.append('num_unread')
+        if opinion_page:
+            user_opinions = Opinion.objects.filter(content=OuterRef('pk'), user=user.pk)
+            contents = contents.annotate(user_opinion=Subquery(user_opinions.values('pk')[:1]))
+            fields.append('user_opinion')
+        if opinion_page and opinion_pk is not None:
+            follows = Follow.objects.filter(user=user.pk,
+                                            content_type=ContentType.objects.get_for_model(Opinion),
+                                            object_id=str(opinion_pk))
+            contents = contents.annotate(is_following=Exists(follows))
+            fields.append('is_following')
+    rows = list(contents.order_by('stats__pk').values_list(*stats_fields, *fields))
+    if len(rows) == 0:
+        return None
+    objs = [(Content, content_pk)] + [(Stats, row[0]) for row in rows if row[0] is not None]
+    if opinion_pk is not None:
+        objs.append((Opinion, opinion_pk))
+    extra = [x for row in rows for x in row[1:len(stats_fields)]]
+    values = dict(zip(fields, rows[0][len(stats_fields):]))
+    extra += list(values.values())
+    if values.get('user_opinion') is not None:
+        objs.append((Opinion, values['user_opinion']))
+
+    # Parent opinions
+    if opinion_page and opinion_pk is not None:
+        parent_opinions = Opinion.objects.filter(content__dependencies=content_pk,
+                                                 user__opinions=opinion_pk)
+        parent_opinions = list(
+            parent_opinions.order_by('pk').values_list('pk', *OPINION_ETAG_FIELDS))
+        objs += [(Opinion, row[0]) for row in parent_opinions]
+        extra += [x for row in parent_opinions for x in row[1:]]
+    elif opinion_page and stats_type is not None:
+        parent_stats = Stats.objects.filter(content__dependencies=content_pk,
+                                            stats_type=stats_type).order_by('pk')
+        parent_stats = list(
+            parent_stats.values_list('pk', 'total_true_points', 'total_false_points'))
+        objs += [(Stats, row[0]) for row in parent_stats]
+        extra += [x for row in parent_stats for x in row[1:]]
+    return get_page_etag(request, objs, *extra)
+
+
 # *******************************************************************************
 # Categories views
 # *******************************************************************************
@@ -185,18 +293,14 @@ def activity_view(request, category_slug=None):
 
     # Actions
     actions = category.target_actions.exclude(verb='started following')
+    actions = actions.prefetch_related('actor', 'action_object', 'target')
     if date is not None:
         date = unquote(date)
         actions = actions.filter(timestamp__gte=date)
 
     # Pagination
-    page = request.GET.get('page')
-    paginator = Paginator(actions, NUM_ITEMS_PER_PAGE)
-    actions = paginator.get_page(page)
-    actions.page_list = get_page_list(paginator.num_pages, page, MAX_NUM_PAGES)
-
-    # Navigation
     params = Parameters(request)
+    actions = get_keyset_page(actions, params, per_page=NUM_ITEMS_PER_PAGE)
 
     # Render
     context = {
@@ -227,10 +331,9 @@ def category_index_view(request):
     # Categories
     search_term = request.GET.get('search', '')
     if len(search_term) > 0:
-        categories = Category.objects.filter(title__icontains=search_term)
+        categories = search(Category.objects.all(), search_term)
     else:
         categories = Category.objects.all()
-    categories = list(categories)
 
     # Pagination
     page = request.GET.get('page')
@@ -264,12 +367,11 @@ def theory_index_view(request, category_slug=None):
         category = get_object_or_404(Category, slug=category_slug)
     categories = Category.get_all().exclude(pk=category.pk)[:6]
 
-    # Theories
+    # Theories (the summaries are joined, so the page is a single query)
+    theories = category.get_theories().select_related('summary')
     search_term = request.GET.get('search', '')
     if len(search_term) > 0:
-        theories = category.get_theories().filter(title01__icontains=search_term)
-    else:
-        theories = category.get_theories()
+        theories = search(theories, search_term)
 
     # Pagination
     page = request.GET.get('page')
@@ -294,6 +396,12 @@ def theory_index_view(request, category_slug=None):
     )
 
 
+def theory_detail_etag(request, content_pk, opinion_pk=None, opinion_slug=None):
+    """The ETag for theory_detail_view."""
+    return get_content_etag(request, content_pk, opinion_pk=opinion_pk)
+
+
+@condition(etag_func=theory_detail_etag)
 def theory_detail_view(request, content_pk, opinion_pk=None, opinion_slug=None):
     """A view for displaying theory details."""
     # Preconditions
@@ -692,7 +800,7 @@ def theory_inherit_view(request, content_pk01, content_pk02):
 
     # Setup cont'd
     search_term = request.GET.get('search', '')
-    path_content_pks = [CONTENT_PK_CYPHER.to_python(x) for x in params.path] + [theory.pk]
+    path_content_pks = CONTENT_PK_CYPHER.to_python_list(params.path) + [theory.pk]
     root_theory_dependencies = root_theory.get_nested_dependencies().exclude(
         pk=Content.INTUITION_PK)
     root_theory_dependencies = root_theory_dependencies | Content.objects.filter(pk=root_theory.pk)
@@ -953,13 +1061,10 @@ def theory_activity_view(request, content_pk):
         actions = actions.filter(timestamp__gte=date)
 
     # Pagination
-    page = request.GET.get('page')
-    paginator = Paginator(actions, NUM_ITEMS_PER_PAGE)
-    actions = paginator.get_page(page)
-    actions.page_list = get_page_list(paginator.num_pages, page, MAX_NUM_PAGES)
+    params = Parameters(request, pk=CONTENT_PK_CYPHER.to_url(content_pk))
+    actions = get_keyset_page(actions, params, per_page=NUM_ITEMS_PER_PAGE)
 
     # Navigation
-    params = Parameters(request, pk=CONTENT_PK_CYPHER.to_url(content_pk))
     prev_url = theory.url() + params
     next_url = theory.url() + params
 
@@ -992,6 +1097,12 @@ def theory_activity_view(request, content_pk):
 # *******************************************************************************
 
 
+def evidence_detail_etag(request, content_pk):
+    """The ETag for evidence_detail_view."""
+    return get_content_etag(request, content_pk)
+
+
+@condition(etag_func=evidence_detail_etag)
 def evidence_detail_view(request, content_pk):
     """A view for displaying evidence details."""
     # Setup
@@ -1246,13 +1357,10 @@ def evidence_activity_view(request, content_pk):
         actions = actions.filter(timestamp__gte=date)
 
     # Pagination
-    page = request.GET.get('page')
-    paginator = Paginator(actions, NUM_ITEMS_PER_PAGE)
-    actions = paginator.get_page(page)
-    actions.page_list = get_page_list(paginator.num_pages, page, MAX_NUM_PAGES)
+    params = Parameters(request, pk=CONTENT_PK_CYPHER.to_url(content_pk))
+    actions = get_keyset_page(actions, params, per_page=NUM_ITEMS_PER_PAGE)
 
     # Navigation
-    params = Parameters(request, pk=CONTENT_PK_CYPHER.to_url(content_pk))
     prev_url = evidence.url() + params
     next_url = evidence.url() + params
 
@@ -1453,6 +1561,12 @@ def content_swap_titles_redirect_view(request, content_pk):
 # *******************************************************************************
 
 
+def opinion_index_etag(request, content_pk, opinion_slug='all'):
+    """The ETag for opinion_index_view."""
+    return get_content_etag(request, content_pk)
+
+
+@condition(etag_func=opinion_index_etag)
 def opinion_index_view(request, content_pk, opinion_slug='all'):
     """Index view for opinions.
 
@@ -1469,8 +1583,12 @@ def opinion_index_view(request, content_pk, opinion_slug='all'):
     theory = get_object_or_404(Content, pk=content_pk)
     stats_type = Stats.slug_to_type(opinion_slug)
     stats = Stats.get(theory, stats_type)
-    opinions = list(stats.opinions.filter(anonymous=True))
-    opinions += list(stats.opinions.filter(anonymous=False).order_by('user__username'))
+    # The anonymous opinions first (by rank, their owners are hidden), then by username.
+    username = Case(When(anonymous=False, then=F('user__username')),
+                    default=Value(''),
+                    output_field=CharField())
+    opinions = stats.opinions.select_related('user', 'content').order_by(
+        F('anonymous').desc(), username, '-rank', 'pk')
 
     # Categories
     categories = {}
@@ -1536,6 +1654,19 @@ def retrieve_my_opinion_stats_redirect_view(request, content_pk):
     return redirect(opinion.stats_url() + params)
 
 
+def opinion_analysis_etag(request, content_pk, opinion_pk=None, opinion_slug=None):
+    """The ETag for opinion_analysis_view (the demo is always rendered)."""
+    if opinion_slug == 'debug':
+        return None
+    stats_type = None if opinion_slug is None else Stats.slug_to_type(opinion_slug)
+    return get_content_etag(request,
+                            content_pk,
+                            opinion_pk=opinion_pk,
+                            stats_type=stats_type,
+                            opinion_page=True)
+
+
+@condition(etag_func=opinion_analysis_etag)
 def opinion_analysis_view(request, content_pk, opinion_pk=None, opinion_slug=None):
     """The view for displaying opinion and statistical details.
 
@@ -1810,7 +1941,7 @@ def opinion_edit_view(request, content_pk, wizard=False):
         opinion_dependencies = OpinionDependency.objects.none()
         theory_dependencies = theory.get_dependencies()
     else:
-        opinion_dependencies = opinion.get_dependencies()
+        opinion_dependencies = opinion.get_dependencies().select_related('content')
         theory_dependencies = theory.get_dependencies().exclude(
             id__in=opinion_dependencies.values('content'))
 
@@ -1818,6 +1949,7 @@ def opinion_edit_view(request, content_pk, wizard=False):
     initial = [{'content': x, 'parent': opinion} for x in theory_dependencies]
     OpinionDependencyFormSet = modelformset_factory(OpinionDependency,
                                                     form=OpinionDependencyForm,
+                                                    formset=OpinionDependencyBaseFormSet,
                                                     extra=theory_dependencies.count())
 
     # Post request
@@ -1833,11 +1965,6 @@ def opinion_edit_view(request, content_pk, wizard=False):
                                                           'wizard': wizard
                                                       })
 
-        # utilization
-        utilization_before = {theory: user.is_using(theory)}
-        for content in theory_dependencies:
-            utilization_before[content] = user.is_using(content)
-
         # parse
         if opinion_form.is_valid() and dependency_formset.is_valid():
 
@@ -1849,10 +1976,8 @@ def opinion_edit_view(request, content_pk, wizard=False):
             if opinion_form.has_changed() or opinion.pk is None:
                 opinion = opinion_form.save()
 
-            # save altered dependencies
-            for opinion_dependency_form in dependency_formset:
-                if opinion_dependency_form.has_changed():
-                    opinion_dependency_form.save()
+            # save altered dependencies (bulk)
+            dependency_formset.save()
 
             # update points
             opinion.update_points()
@@ -1861,12 +1986,8 @@ def opinion_edit_view(request, content_pk, wizard=False):
             opinion.update_activity_logs(user, verb='Modified.')
 
             # update utilization
-            for content in utilization_before:
-                utilization_after = content.get_utilization(user)
-                if utilization_after and not utilization_before[content]:
-                    content.utilization += 1
-                elif utilization_before[content] and not utilization_after:
-                    content.utilization -= 1
+            update_utilization(user, [theory.pk] +
+                               list(theory.get_dependencies().values_list('pk', flat=True)))
 
             # done
             return redirect(opinion.url() + params)
@@ -1945,6 +2066,8 @@ def opinion_delete_redirect_view(request, opinion_pk):
     if request.method == 'POST':
         theory = opinion.content
         opinion.delete()
+        update_utilization(opinion.user, [theory.pk] +
+                           list(theory.get_dependencies().values_list('pk', flat=True)))
         return redirect(next_url)
 
     # Get request
@@ -0,0 +1,56 @@
+r""" __      __    __               ___
+    /  \    /  \__|  | _ __        /   \
+    \   \/\/   /  |  |/ /  |  __  |  |  |
+     \        /|  |    <|  | |__| |  |  |
+      \__/\__/ |__|__|__\__|       \___/
+
+Copyright (C) 2018 Wiki-O, Frank Imeson
+
+This source code is licensed under the GPL license found in the
+LICENSE.md file in the root directory of this source tree.
+"""
+
+# *******************************************************************************
+# Imports
+# *******************************************************************************
+from rules.permissions import ObjectPermissionBackend
+
+# *******************************************************************************
+# Backends
+# *******************************************************************************
+
+
+class CachedObjectPermissionBackend(ObjectPermissionBackend):
+    """The rules permission backend with a cache for the permission decisions.
+
+    The decisions are stored on the user instance (request.user lives for a single request)
+    and are cleared by User.clear_permission_cache (e.g., on promotion/demotion).
+    """
+
+    @staticmethod
+    def get_decision_key(perm, obj=None):
+        """Construct the cache key for the decision.
+
+        Args:
+            perm (str): The permission.
+            obj (Model, optional): The object the permission is tested against. Defaults to None.
+
+        Returns:
+            tuple or None: The key, None if the decision cannot be cached.
+        """
+        if obj is None:
+            return (perm, None, None)
+        if hasattr(obj, '_meta') and obj.pk is not None:
+            return (perm, obj._meta.label, obj.pk)
+        return None
+
+    def has_perm(self, user, perm, *args, **kwargs):
+        key = None
+        if len(args) <= 1 and not kwargs:
+            key = self.get_decision_key(perm, *args)
+        if key is None:
+            return super().has_perm(user, perm, *args, **kwargs)
+        decisions = user.__dict__.setdefault('_perm_decisions', {})
+        if key not in decisions:
+            decisions[key] = super().has_perm(user, perm, *args, **kwargs)
+        return decisions[key]
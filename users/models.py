@@ -22,6 +22,7 @@ from django.contrib.contenttypes.fields import (GenericForeignKey, GenericRelati
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
+from django.db.models import Count, Q
 from django.urls import reverse
 from django.utils import timezone
 
@@ -40,6 +41,7 @@ LEVEL02_CONTRIBUTIONS_REQUIREMENT = 10
 LEVEL03_CONTRIBUTIONS_REQUIREMENT = 100
 
 LOGGER = logging.getLogger('django')
+RE_LEVEL_GROUP = re.compile(r'^user level: (\d+)$')
 
 # *******************************************************************************
 # Classes
@@ -62,6 +64,9 @@ class User(AbstractUser):
             the system is brought up, the value is initialized to -1. On the first call to
             get_system_user(), the "constant" is updated.
 
+    Cache attributes:
+        saved_levels (list[int] or None): The cached user levels (see get_levels).
+
     Inheritied model attributes:
         username (CharField): The user's handle.
         date_joined (DateField): The date the user joined.
@@ -119,6 +124,9 @@ class User(AbstractUser):
                                            related_name='collaborators',
                                            blank=True)
 
+    # Cache attributes.
+    saved_levels = None
+
     @classmethod
     def get_system_user(cls, create=True):
         """Creates and returns the system user.
@@ -285,8 +293,8 @@ class User(AbstractUser):
             Bool: True, if the user has an opinion on the theory.
         """
         if refresh:
-            if (self.opinions.filter(content=self, deleted=False).exists() or
-                    self.opinions.filter(dependencies__content=self).exists()):
+            if (self.opinions.filter(content=content, deleted=False).exists() or
+                    self.opinions.filter(dependencies__content=content).exists()):
                 self.utilized.add(content)
                 return True
             self.utilized.remove(content)
@@ -371,6 +379,56 @@ class User(AbstractUser):
         """
         return self.count_reported(ignored=True, recent=recent, expired=expired)
 
+    def get_violation_counts(self):
+        """A getter for all of the user's violation counts (in a single query).
+
+        Returns:
+            dict: The counts, with the keys open, warnings, recent_warnings, expired_warnings,
+                strikes, recent_strikes, and expired_strikes.
+        """
+        now = timezone.now()
+        warning_expiry_date = now - datetime.timedelta(days=WARNING_EXPIRE_LENGTH)
+        strike_expiry_date = now - datetime.timedelta(days=STRIKE_EXPIRE_LENGTH)
+        is_warning = Q(status=Violation.STATUS.WARNING)
+        is_strike = Q(status=Violation.STATUS.STRIKE)
+        content_type = ContentType.objects.get_for_model(self.__class__)
+        return Violation.objects.filter(object_id=self.id, content_type=content_type).aggregate(
+            open=Count('pk', filter=Q(status__in=Violation.STATUS_OPEN.get_values())),
+            warnings=Count('pk', filter=is_warning),
+            recent_warnings=Count('pk', filter=is_warning &
+                                  Q(close_date__gte=warning_expiry_date)),
+            expired_warnings=Count('pk', filter=is_warning & Q(close_date__lt=warning_expiry_date)),
+            strikes=Count('pk', filter=is_strike),
+            recent_strikes=Count('pk', filter=is_strike & Q(close_date__gte=strike_expiry_date)),
+            expired_strikes=Count('pk', filter=is_strike & Q(close_date__lt=strike_expiry_date)),
+        )
+
+    @staticmethod
+    def select_violation_count(counts, name, recent=True, expired=False):
+        """Select the count (from get_violation_counts) for the recent/expired combination.
+
+        Args:
+            counts (dict): The output of get_violation_counts.
+            name (str): Either 'warnings' or 'strikes'.
+            recent (bool, optional): If true, include the set of recent violations.
+                Defaults to True.
+            expired (bool, optional): If true, include the expired set of violations.
+                Defaults to True.
+
+        Returns:
+            int: The count.
+
+        Raises:
+            RuntimeError: If both recent and expired are false.
+        """
+        if recent and expired:
+            return counts[name]
+        if recent:
+            return counts['recent_' + name]
+        if expired:
+            return counts['expired_' + name]
+        raise RuntimeError('at least recent or expired needs to be true')
+
     def count_warnings(self, recent=True, expired=False):
         """A getter for the number of warnings the user recieved.
 
@@ -383,8 +441,8 @@ class User(AbstractUser):
         Returns:
             int: The count.
         """
-        return self.get_violations(warnings=True, strikes=False, recent=recent,
-                                   expired=expired).count()
+        return self.select_violation_count(self.get_violation_counts(), 'warnings', recent,
+                                           expired)
 
     def count_strikes(self, recent=True, expired=False):
         """A getter for the number of strikes the user has recieved.
@@ -398,8 +456,8 @@ class User(AbstractUser):
         Returns:
             int: The count.
         """
-        return self.get_violations(warnings=False, strikes=True, recent=recent,
-                                   expired=expired).count()
+        return self.select_violation_count(self.get_violation_counts(), 'strikes', recent,
+                                           expired)
 
     def get_account_age(self):
         """A getter for the account's age.
@@ -424,24 +482,34 @@ class User(AbstractUser):
         Returns:
             int: The user's level.
         """
-        if len(self.get_levels()) > 0:
-            return self.get_levels()[-1]
+        levels = self.get_levels()
+        if len(levels) > 0:
+            return levels[-1]
         return -1
 
     def get_levels(self):
-        """A getter for the user's permission levels.
+        """A getter for the user's permission levels (cached, see clear_permission_cache).
 
         The user groups are named "user level: #".
 
         Returns:
             list: An ordered list of the user's levels.
         """
-        levels = []
-        for group in self.groups.values('name'):
-            group_name = group['name']
-            if re.match(r'^user level: \d+$', group_name):
-                levels.append(int(re.search(r'\d+', group_name).group()))
-        return sorted(levels)
+        if self.saved_levels is None:
+            levels = []
+            for group_name in self.groups.values_list('name', flat=True):
+                match = RE_LEVEL_GROUP.match(group_name)
+                if match:
+                    levels.append(int(match.group(1)))
+            self.saved_levels = sorted(levels)
+        return self.saved_levels
+
+    def clear_permission_cache(self):
+        """Clear the cached levels and permission decisions (e.g., after the groups change)."""
+        self.saved_levels = None
+        for attrib in ['_group_names_cache', '_perm_decisions', '_perm_cache',
+                       '_user_perm_cache', '_group_perm_cache']:
+            self.__dict__.pop(attrib, None)
 
     def is_up_for_promotion(self):
         """A getter for the user's promotion status.
@@ -449,8 +517,8 @@ class User(AbstractUser):
         Returns:
             bool: True, if the user is up for promotion.
         """
-        if self.count_warnings(recent=True, expired=False) > 0 or \
-                self.count_strikes(recent=True, expired=False) > 0:
+        counts = self.get_violation_counts()
+        if counts['recent_warnings'] > 0 or counts['recent_strikes'] > 0:
             return False
         if self.get_level() == 1 and self.get_account_age() >= LEVEL02_AGE_REQUIREMENT and \
                 self.get_num_contributions() >= LEVEL02_CONTRIBUTIONS_REQUIREMENT:
@@ -478,6 +546,7 @@ class User(AbstractUser):
             new_level = min(3, self.get_level() + 1)
         group = level_to_group(new_level)
         self.groups.add(group)
+        self.clear_permission_cache()
 
     def is_up_for_demotion(self):
         """A getter for the user's demotion status.
@@ -502,10 +571,12 @@ class User(AbstractUser):
         while current_level > new_level:
             group = level_to_group(current_level)
             self.groups.remove(group)
+            self.clear_permission_cache()
             current_level = self.get_level()
         if current_level < new_level:
             group = level_to_group(new_level)
             self.groups.add(group)
+            self.clear_permission_cache()
 
 
 class Violation(models.Model):
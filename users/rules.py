@@ -15,11 +15,12 @@ LICENSE.md file in the root directory of this source tree.
 # *******************************************************************************
 import rules
 from django.contrib.auth.models import Group
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save
 from django.dispatch import receiver
 
 from theories.models.content import Content
 from users.models import User, Violation
+from users.utils import has_level
 
 # *******************************************************************************
 # Promotions/Demotions
@@ -41,6 +42,19 @@ def post_save_user_signal_handler(sender, instance, created, **kwargs):
         instance.save()
 
 
+@receiver(m2m_changed, sender=User.groups.through)
+def m2m_changed_user_groups_signal_handler(sender, instance, action, **kwargs):
+    """Clear the user's cached levels and permission decisions when the groups change.
+
+    Args:
+        sender (Model): The through model for User.groups.
+        instance (User or Group): The instance whose relation changed.
+        action (str): The type of update.
+    """
+    if isinstance(instance, User) and action in ('post_add', 'post_remove', 'post_clear'):
+        instance.clear_permission_cache()
+
+
 # *******************************************************************************
 # Permissions
 # *******************************************************************************
@@ -51,11 +65,11 @@ def post_save_user_signal_handler(sender, instance, created, **kwargs):
 # https://cheat.readthedocs.io/en/latest/django/permissions.html
 # https://stackoverflow.com/questions/41821921/model-field-level-permission-and-field-value-level-permission-in-django-and-drf
 # *******************************************************************************
-HAS_LEVEL00 = rules.is_group_member('user level: 0')
-HAS_LEVEL01 = rules.is_group_member('user level: 1')
-HAS_LEVEL02 = rules.is_group_member('user level: 2')
-HAS_LEVEL03 = rules.is_group_member('user level: 3')
-HAS_LEVEL04 = rules.is_group_member('user level: 4')
+HAS_LEVEL00 = has_level(0)
+HAS_LEVEL01 = has_level(1)
+HAS_LEVEL02 = has_level(2)
+HAS_LEVEL03 = has_level(3)
+HAS_LEVEL04 = has_level(4)
 
 
 @rules.predicate
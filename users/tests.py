@@ -13,15 +13,23 @@ LICENSE.md file in the root directory of this source tree.
 # *******************************************************************************
 # Imports
 # *******************************************************************************
+import datetime
+from io import StringIO
+
 from django.contrib import auth
+from django.core.management import call_command
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 from notifications.signals import notify
 
 from core.utils import get_form_data, timezone_today
+from theories.tests.utils import create_test_theory
 from theories.utils import create_categories
-from users.maintence import create_test_user
-from users.models import Violation, ViolationFeedback, ViolationVote
+from users.maintence import create_groups_and_permissions, create_test_user
+from users.models import (LEVEL02_AGE_REQUIREMENT, STRIKE_EXPIRE_LENGTH, WARNING_EXPIRE_LENGTH,
+                          Violation, ViolationFeedback, ViolationVote)
+from users.utils import level_to_group
 
 # *******************************************************************************
 # Defines
@@ -269,3 +277,122 @@ class UserViolations(TestCase):
         self.assertEqual(ViolationFeedback.ACTION_FEEDBACK.IGNORED, Violation.STATUS.IGNORED)
         self.assertEqual(ViolationFeedback.ACTION_FEEDBACK.WARNING, Violation.STATUS.WARNING)
         self.assertEqual(ViolationFeedback.ACTION_FEEDBACK.STRIKE, Violation.STATUS.STRIKE)
+
+
+class UserViolationCounts(TestCase):
+    fixtures = ['groups.json']
+
+    def setUp(self):
+        self.bob = create_test_user(username='bob', password='1234')
+        self.user = create_test_user(username='testuser', password='1234')
+
+    def create_violation(self, status, days_ago=0):
+        violation = Violation.objects.create(offender=self.bob,
+                                             reporter=self.user,
+                                             content=self.bob,
+                                             status=status)
+        violation.close_date = timezone.now() - datetime.timedelta(days=days_ago)
+        violation.save()
+        return violation
+
+    def test_get_violation_counts(self):
+        self.create_violation(Violation.STATUS.REPORTED)
+        self.create_violation(Violation.STATUS.IGNORED)
+        self.create_violation(Violation.STATUS.WARNING)
+        self.create_violation(Violation.STATUS.WARNING, days_ago=WARNING_EXPIRE_LENGTH + 1)
+        self.create_violation(Violation.STATUS.STRIKE)
+        self.create_violation(Violation.STATUS.STRIKE, days_ago=STRIKE_EXPIRE_LENGTH + 1)
+        self.create_violation(Violation.STATUS.STRIKE, days_ago=STRIKE_EXPIRE_LENGTH + 2)
+        with self.assertNumQueries(1):
+            counts = self.bob.get_violation_counts()
+        self.assertEqual(
+            counts, {
+                'open': 1,
+                'warnings': 2,
+                'recent_warnings': 1,
+                'expired_warnings': 1,
+                'strikes': 3,
+                'recent_strikes': 1,
+                'expired_strikes': 2,
+            })
+        self.assertEqual(self.bob.count_strikes(recent=True, expired=False), 1)
+        self.assertEqual(self.bob.count_strikes(recent=False, expired=True), 2)
+        self.assertEqual(self.bob.count_warnings(recent=True, expired=True), 2)
+        self.assertEqual(self.user.get_violation_counts()['strikes'], 0)
+
+    def test_is_up_for_promotion(self):
+        self.bob.date_joined = timezone.now() - datetime.timedelta(days=LEVEL02_AGE_REQUIREMENT)
+        self.bob.save()
+        self.assertEqual(self.bob.get_level(), 1)
+        self.assertFalse(self.bob.is_up_for_promotion())
+        self.bob.contributions.add(*[create_test_theory(title=str(x)) for x in range(10)])
+        self.assertTrue(self.bob.is_up_for_promotion())
+        self.create_violation(Violation.STATUS.WARNING)
+        self.assertFalse(self.bob.is_up_for_promotion())
+
+
+class UserPermissionCache(TestCase):
+    fixtures = ['groups.json']
+
+    def setUp(self):
+        create_groups_and_permissions()
+        self.user = create_test_user(username='testuser', password='1234')
+        self.user = User.objects.get(pk=self.user.pk)
+
+    def test_levels_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.user.get_level(), 1)
+            self.assertEqual(self.user.get_levels(), [1])
+
+    def test_promote_and_demote(self):
+        self.assertEqual(self.user.get_level(), 1)
+        self.user.promote(new_level=3)
+        self.assertEqual(self.user.get_level(), 3)
+        self.user.demote(new_level=1)
+        self.assertEqual(self.user.get_level(), 1)
+        # Changing the groups directly also invalidates the cache.
+        self.user.groups.add(level_to_group(0))
+        self.assertEqual(self.user.get_levels(), [0, 1])
+
+    def test_permission_decisions_cached(self):
+        self.assertTrue(self.user.has_perm('theories.report'))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.user.has_perm('theories.report'))
+        self.user.demote(new_level=0)
+        self.assertFalse(self.user.has_perm('theories.report'))
+
+
+class UpdateUserLevelsCommand(TestCase):
+    fixtures = ['groups.json']
+
+    def setUp(self):
+        self.bob = create_test_user(username='bob', password='1234')
+        self.bob.date_joined = timezone.now() - datetime.timedelta(days=LEVEL02_AGE_REQUIREMENT)
+        self.bob.save()
+        self.bob.contributions.add(*[create_test_theory(title=str(x)) for x in range(10)])
+        self.user = create_test_user(username='testuser', password='1234', level=2)
+        for _ in range(3):
+            violation = Violation.objects.create(offender=self.user,
+                                                 reporter=self.bob,
+                                                 content=self.user,
+                                                 status=Violation.STATUS.STRIKE)
+            violation.close_date = timezone.now()
+            violation.save()
+        self.newbie = create_test_user(username='newbie', password='1234')
+
+    def test_dry_run(self):
+        out = StringIO()
+        call_command('update_user_levels', dry_run=True, stdout=out)
+        self.assertIn('promote  bob: 1 -> 2', out.getvalue())
+        self.assertIn('demote   testuser: 2 -> 1', out.getvalue())
+        self.assertIn('1 promoted, 1 demoted', out.getvalue())
+        self.assertEqual(User.objects.get(pk=self.bob.pk).get_level(), 1)
+        self.assertEqual(User.objects.get(pk=self.user.pk).get_level(), 2)
+
+    def test_apply(self):
+        self.assertTrue(self.bob.is_up_for_promotion())
+        self.assertTrue(self.user.is_up_for_demotion())
+        call_command('update_user_levels', stdout=StringIO())
+        self.assertEqual(User.objects.get(pk=self.bob.pk).get_level(), 2)
+        self.assertEqual(User.objects.get(pk=self.user.pk).get_levels(), [1])
+        self.assertEqual(User.objects.get(pk=self.newbie.pk).get_level(), 1)
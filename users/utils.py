@@ -13,6 +13,7 @@ LICENSE.md file in the root directory of this source tree.
 # *******************************************************************************
 # Imports
 # *******************************************************************************
+import rules
 from django.contrib.auth.models import Group
 
 # *******************************************************************************
@@ -30,3 +31,25 @@ def level_to_group(level):
         Group: The user group.
     """
     return Group.objects.get(name='user level: %d' % level)
+
+
+def has_level(level):
+    """Create a rules predicate that tests if the user has the level.
+
+    Unlike rules.is_group_member, the check uses the user's cached levels (User.get_levels),
+    which are invalidated when the user is promoted or demoted.
+
+    Args:
+        level (int): The level.
+
+    Returns:
+        Predicate: The predicate.
+    """
+
+    @rules.predicate('has_level%02d' % level)
+    def predicate(user):
+        if not hasattr(user, 'get_levels'):
+            return False
+        return level in user.get_levels()
+
+    return predicate
@@ -15,7 +15,7 @@ LICENSE.md file in the root directory of this source tree.
 # *******************************************************************************
 from actstream.models import following
 from allauth.account.views import PasswordChangeView
-from core.utils import Parameters, get_first_or_none, get_page_list
+from core.utils import Parameters, get_first_or_none, get_keyset_page, get_page_list
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.forms import modelformset_factory
@@ -72,6 +72,8 @@ def public_profile_view(request, pk):
         public_opinions = user.opinions.filter(anonymous=False)
         private_opinions = user.opinions.filter(anonymous=True)
 
+    violation_counts = user.get_violation_counts()
+
     # Navigation
     params = Parameters(request)
     prev_url = request.META.get('HTTP_REFERER', '/')
@@ -82,10 +84,10 @@ def public_profile_view(request, pk):
         'current_user': current_user,
         'public_opinions': public_opinions,
         'private_opinions': private_opinions,
-        'num_soft_strikes': user.count_strikes(recent=True, expired=False),
-        'num_hard_strikes': user.count_strikes(recent=True, expired=False),
-        'num_expired_strikes': user.count_strikes(recent=False, expired=True),
-        'num_total_strikes': user.count_strikes(recent=True, expired=True),
+        'num_soft_strikes': violation_counts['recent_strikes'],
+        'num_hard_strikes': violation_counts['recent_strikes'],
+        'num_expired_strikes': violation_counts['expired_strikes'],
+        'num_total_strikes': violation_counts['strikes'],
         'prev_url': prev_url,
         'params': params,
     }
@@ -154,16 +156,15 @@ def notifications_view(request):
     opinions = following(user, Opinion)
     theories = following(user, Content)
     categories = following(user, Category)
-    notifications = user.notifications.all()
+    notifications = user.notifications.prefetch_related('actor', 'action_object', 'target')
     user_violations = user.violations.all()
     NotificationFormset = modelformset_factory(Notification, form=SelectNotificationForm, extra=0)
     ViolationFormset = modelformset_factory(Violation, form=SelectViolationForm, extra=0)
 
     # Pagination01
-    page01 = request.GET.get('page01')
-    paginator01 = Paginator(notifications, NUM_ITEMS_PER_PAGE)
-    notifications = paginator01.get_page(page01)
-    notifications.page_list = get_page_list(paginator01.num_pages, page01, MAX_NUM_PAGES)
+    notifications = get_keyset_page(notifications,
+                                    Parameters(request),
+                                    per_page=NUM_ITEMS_PER_PAGE)
     # Pagination02
     page02 = request.GET.get('page02')
     paginator02 = Paginator(user_violations, NUM_ITEMS_PER_PAGE)
@@ -15,3 +15,4 @@ import os
 os.environ['PGUSER'] = "django"
 os.environ['PGPASSWORD'] = "password"
 os.environ['SECRET_KEY'] = "'nxz-mdsd^^w*+(yzz0o7_rw6_@5^pu()#youf$s7t(m1_o!k*0'"
+# os.environ['CACHE_DIR'] = "/var/tmp/wiki_o_cache"
@@ -68,19 +68,23 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django_hosts.middleware.HostsRequestMiddleware',
+    'core.middleware.QueryCountMiddleware',
+    'core.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.IdentityMapMiddleware',
     'django_hosts.middleware.HostsResponseMiddleware',
 ]
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -98,7 +102,7 @@ TEMPLATE_CONTEXT_PROCESSORS = ('url_tools.context_processors.current_url',)
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 AUTHENTICATION_BACKENDS = [
-    'rules.permissions.ObjectPermissionBackend',
+    'users.backends.CachedObjectPermissionBackend',
     'django.contrib.auth.backends.ModelBackend',
     'allauth.account.auth_backends.AuthenticationBackend',
 ]
@@ -143,7 +147,22 @@ ACCOUNT_ADAPTER = 'invitations.models.InvitationsAdapter'
 
 STATICFILES_DIRS = ()
 
-CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# Cache (pluggable). The default cache is per process, set CACHE_DIR to share the cache (and the
+# object versions, see core.utils.get_versioned_key) between the workers of a single host or
+# point CACHES at memcached/redis for multiple hosts (see core.checks).
+if os.environ.get('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['CACHE_DIR'],
+            'OPTIONS': {
+                'MAX_ENTRIES': 100000
+            },
+        }
+    }
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+OBJECT_CACHE = 'default'
 
 # Search Engine
 HAYSTACK_CONNECTIONS = {
@@ -192,6 +211,8 @@ if 'test' in sys.argv:
     }
     DEBUG = False
     TEMPLATE_DEBUG = False
+    # A single process, the local object cache is consistent.
+    SILENCED_SYSTEM_CHECKS = ['core.W001']
 
 # Use nose to run all tests
 TEST_RUNNER = 'django_nose.NoseTestSuiteRunner'